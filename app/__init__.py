@@ -1,5 +1,6 @@
 import logging
 import os
+import weakref
 from contextlib import contextmanager
 
 from flask import Flask, render_template, session
@@ -17,8 +18,14 @@ migrate = Migrate()
 
 
 # Database session management
+_session_factories = weakref.WeakKeyDictionary()  # engine -> sessionmaker
+
 def get_session():
-    return scoped_session(sessionmaker(bind=db.engine))
+    engine = db.engine
+    factory = _session_factories.get(engine)
+    if factory is None:
+        factory = _session_factories[engine] = sessionmaker(bind=engine)
+    return scoped_session(factory)
 
 @contextmanager
 def session_scope():
@@ -75,6 +82,10 @@ def create_app(config=None):
     from .blueprints import register_blueprints
     register_blueprints(app)
 
+    # CLI: `flask worker` runs queued jobs outside the web process
+    from .worker import worker_command
+    app.cli.add_command(worker_command)
+
     # Logging
     configure_logging(app)
 
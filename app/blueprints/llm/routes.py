@@ -14,12 +14,13 @@ from flask import (
     render_template,
     request,
     session,
+    stream_with_context,
     url_for,
 )
 
 from ... import db
 from ...models import Prompt
-from ...services import async_service, llm_service, prompt_service
+from ...services import async_service, job_events, llm_service, prompt_service, providers
 from . import llm_bp
 
 logger = logging.getLogger(__name__)
@@ -42,7 +43,7 @@ def select_model():
     previous_parameters = session.get('parameters')
 
     # Clear job/session data except parameters
-    for key in ['job_id', 'model_id', 'model', 'provider', 'response_ids']:
+    for key in ['job_id', 'model_id', 'model', 'provider', 'response_ids', 'compare_model_ids']:
         session.pop(key, None)
     if previous_parameters:
 
@@ -50,6 +51,20 @@ def select_model():
         flash("Your previous parameter settings have been loaded. You can adjust them below.", "info")
 
     if request.method == 'POST':
+        # Comparing models: one job sends every story to each of them, side by side
+        compare_ids = request.form.getlist('compare_model_ids') if 'compare' in request.form else []
+        models = [model for model in map(llm_service.get_model_by_id, compare_ids) if model]
+        if len(models) > 1:
+            session['compare_model_ids'] = [model['id'] for model in models]
+            # Parameters are shared, so the form is built from the first model's
+            session['model_id'] = models[0]['id']
+            session['model'] = ", ".join(model['name'] for model in models)
+            session['provider'] = models[0]['provider']
+            return redirect(url_for('llm.select_parameters'))
+        if 'compare' in request.form:
+            flash('Select at least two models to compare.', 'warning')
+            return redirect(url_for('llm.select_model'))
+
         model_id = request.form.get('model_id')
         model = llm_service.get_model_by_id(model_id)
         if model:
@@ -71,11 +86,27 @@ def select_parameters():
         return redirect(url_for('llm.select_model'))
     
     if request.method == 'POST':
-        # Store only actual parameters, not run_description
-        parameters = {param: request.form.get(param) for param in request.form if param != 'run_description'}
+        # Store only actual parameters, not run_description, sweep values or the cache/streaming/batch switches
+        parameters = {param: request.form.get(param) for param in request.form
+                      if param not in ('run_description', 'bypass_cache', 'stream_output', 'provider_batch')
+                      and not param.startswith('sweep_')}
+        sweep = {param[len('sweep_'):]: value.strip() for param, value in request.form.items()
+                 if param.startswith('sweep_') and value.strip()}
+        if sweep:
+            # Check the grid now, so mistakes are shown on the form rather than when the job starts
+            try:
+                llm_service.expand_parameter_sweep(session['model_id'], parameters, sweep,
+                                                   current_app.config.get("SWEEP_MAX_COMBINATIONS"))
+            except ValueError as e:
+                flash(str(e), 'danger')
+                return redirect(url_for('llm.select_parameters'))
         session['parameters'] = parameters
+        session['parameter_sweep'] = sweep
         # Store run_description separately if needed
         session['run_description'] = request.form.get('run_description', '')[:255]
+        session['bypass_cache'] = 'bypass_cache' in request.form
+        session['stream_output'] = 'stream_output' in request.form
+        session['provider_batch'] = 'provider_batch' in request.form
         print(f"Stored run description: {session['run_description']}")
         return redirect(url_for('llm.loading'))
         
@@ -90,7 +121,11 @@ def select_parameters():
     # Log parameter details for debugging
     for name, details in parameters.items():
         logger.info(f"PARAM DEBUG: {name} | type: {details.get('type')} | default: {details.get('default')} | min: {details.get('min_value')} | max: {details.get('max_value')}")
-    return render_template('select_parameters.html', parameters=parameters)
+    provider = providers.find_provider(session.get('provider'))
+    comparing = bool(session.get('compare_model_ids'))
+    return render_template('select_parameters.html', parameters=parameters,
+                           sweep=session.get('parameter_sweep') or {},
+                           batch_supported=bool(provider and provider.supports_batch_api) and not comparing)
 
 # Routes for the progress tracking system
 @llm_bp.route('/loading')
@@ -99,7 +134,7 @@ def loading():
     job_id = session.get('job_id')
     logger.info(f"In the laoding route, with job: {job_id}")
     # If no job ID in session (or it's invalid), generate a new one
-    if not job_id or job_id not in async_service.processing_jobs:
+    if not job_id or async_service.get_job(job_id) is None:
         # Extract necessary session data
         story_ids = [int(sid) for sid in session.get("story_ids", [])]
         question_id = int(session.get("question_id"))
@@ -108,20 +143,32 @@ def loading():
         #run_description = request.form.get('run_description', '')[:254]
         run_description = session.get('run_description')
         print(f"Run description in loading route: {run_description}")
+        compare_model_ids = session.get('compare_model_ids')
+        sweep = session.get('parameter_sweep')
+        variants = None
+        if compare_model_ids or sweep:
+            parameter_sets = llm_service.expand_parameter_sweep(
+                model_id, parameters, sweep, current_app.config.get("SWEEP_MAX_COMBINATIONS")
+            ) if sweep else None
+            variants = async_service.model_variants(compare_model_ids or [model_id], parameters, parameter_sets)
         # Use the service to create a new job
         job_id = async_service.create_job(
-            model_id=model_id, 
+            model_id=None if variants else model_id,
             story_ids=story_ids,
             question_id=question_id,
             parameters=parameters,
-            run_description=run_description
+            run_description=run_description,
+            bypass_cache=session.get('bypass_cache', False),
+            stream=session.get('stream_output', False),
+            batch=session.get('provider_batch', False) and not variants,
+            variants=variants
         )
         session['job_id'] = job_id
         logger.debug(f"Created new job: {job_id} with {len(story_ids)} stories to process")
     else:
-        # Job already exists (e.g., from rerun_prompts)
+        # Job already exists (e.g., from rerun_prompts or resume_run)
         # Just update the last activity timestamp
-        async_service.processing_jobs[job_id]["last_activity"] = time.time()
+        async_service.touch_job(job_id)
         logger.debug(f"Using existing job: {job_id} with params: {async_service.processing_jobs[job_id].get('params', {})}")
     
     # Clean up old jobs using the service
@@ -171,7 +218,9 @@ def rerun_prompts():
                 'top_p': first_prompt.top_p
             },
             prompts_data=prompts_data,
-            run_description=run_description
+            run_description=run_description,
+            bypass_cache='bypass_cache' in request.form,
+            stream='stream_output' in request.form
         )
         session['job_id'] = job_id
         async_service.cleanup_old_jobs()
@@ -186,20 +235,62 @@ def rerun_prompts():
 
 
 
+@llm_bp.route('/resume_run/<int:run_id>', methods=['POST'])
+def resume_run(run_id):
+    """Process only the items of a run that don't have a response yet (e.g. after a crash or cancel)"""
+    logger.info(f"In the resume_run route for run: {run_id}")
+    try:
+        job_id, remaining = async_service.resume_run(run_id)
+    except ValueError as e:
+        flash(str(e), 'warning')
+        return redirect(url_for('responses.list', run_id=run_id))
+
+    if job_id is None:
+        flash(f'Every item in run {run_id} already has a response.', 'info')
+        return redirect(url_for('responses.list', run_id=run_id))
+
+    job = async_service.get_job(job_id)
+    params = job["params"]
+    if params.get("variants"):
+        session['compare_model_ids'] = [variant["model_id"] for variant in params["variants"]]
+        session['question_id'] = params["question_id"]
+        session['story_ids'] = [str(sid) for sid in params["story_ids"]]
+    elif not params.get("is_rerun"):
+        model = llm_service.get_model_by_id(params["model_id"])
+        session['model_id'] = params["model_id"]
+        session['model'] = model['name'] if model else None
+        session['provider'] = model['provider'] if model else None
+        session['question_id'] = params["question_id"]
+        session['story_ids'] = [str(sid) for sid in params["story_ids"]]
+    session['job_id'] = job_id
+    flash(f'Resuming run {run_id}: {remaining} item(s) left to process.', 'info')
+    return redirect(url_for('llm.loading'))
+
+
 @llm_bp.route('/start_processing/<job_id>')
 def start_processing(job_id):
     logger.info(f"In the start processing route, Starting processing for job: {job_id}")
-    if job_id not in async_service.processing_jobs:
+    # Jobs created by another worker (or before a restart) are loaded from the job store
+    job = async_service.get_job(job_id)
+    if job is None:
         return jsonify({"status": "error", "message": "Invalid job ID"}), 404
     
-    job = async_service.processing_jobs[job_id]
     logger.info(f"Current job status: {job.get('status')}")
+
+    # With standalone workers the web process only queues the job (once: reloading the
+    # page reports on a job that's already queued, running or finished)
+    if current_app.config.get("JOB_EXECUTION_MODE") == "worker":
+        status = async_service.enqueue_job(job_id)
+        if status == "queued":
+            return jsonify({"status": "queued", "message": "Your job is queued for a worker"})
+        if status is not None:
+            return jsonify({"status": status, "message": f"The job is already {status}"})
     
-    # Check if we're overloaded
-    if not async_service.can_start_new_job():
-        job["status"] = "queued"
-        return jsonify({"status": "queued", "message": "Your job is queued due to high server load"})
-    
+    # Only start a job nobody is running yet (another web process may have it already)
+    status = async_service.claim_job(job_id)
+    if status is not None:
+        return jsonify({"status": status, "message": f"The job is already {status}"})
+
     params = job["params"]
     
     try:
@@ -211,15 +302,24 @@ def start_processing(job_id):
         app = current_app._get_current_object()
         
         
+        # Jobs are tagged with the browser session that started them so the
+        # scheduler can share slots fairly between users
+        if 'client_id' not in session:
+            session['client_id'] = uuid.uuid4().hex
+
+        # Set before handing over: the scheduler marks the job "queued" if it has to wait
+        async_service.set_job_status(job_id, "started")
+
         # Start processing in background G
         task = asyncio.run_coroutine_threadsafe(
-            async_service.process_llm_requests(
+            async_service.run_scheduled_job(
                 app,
                 job_id, 
                 params["model_id"], 
                 params["story_ids"], 
                 params["question_id"], 
-                params["parameters"]
+                params["parameters"],
+                owner=session['client_id'],
             ),
             loop
         )
@@ -227,7 +327,6 @@ def start_processing(job_id):
         
         # Store the task in the job
         job["task"] = task
-        job["status"] = "started"
         return jsonify({"status": "started"})
     except Exception as e:
         logger.error(f"Error starting processing: {str(e)}")
@@ -235,9 +334,7 @@ def start_processing(job_id):
         traceback.print_exc()
         
         # Update job with error info
-        if job_id in async_service.processing_jobs:
-            async_service.processing_jobs[job_id]["status"] = "error"
-            async_service.processing_jobs[job_id]["error"] = f"Failed to start processing: {str(e)}"
+        async_service.set_job_status(job_id, "error", error=f"Failed to start processing: {str(e)}")
         
         return jsonify({"status": "error", "message": str(e)}), 500
     
@@ -245,48 +342,69 @@ def start_processing(job_id):
 def progress_stream(job_id):
     print(f"SSE connection requested for job: {job_id}")
     logger.info(f"In the progress_stream route for : {job_id}")
-    if job_id not in async_service.processing_jobs:
+    if async_service.get_job_status(job_id, with_results=False) is None:
         print(f"Job ID not found: {job_id}")
         return jsonify({"status": "error", "message": "Invalid job ID"}), 404
     
+    config = current_app.config
+    heartbeat_sec = config.get("SSE_HEARTBEAT_SEC", 15)
+    store_poll_sec = config.get("SSE_STORE_POLL_SEC", 2.0)
+    reconnect_sec = config.get("SSE_RECONNECT_SEC", 60)
+
     def generate():
         print(f"Starting SSE generator for job: {job_id}")
         last_progress = -1
-        timeout = time.time() + 300  # 5 minute maximum wait
+        last_status = None
+        last_partials = {}
+        reconnect_at = time.time() + reconnect_sec
+        version = job_events.version(job_id)
         
         # Send an initial message to establish the connection
         initial_data = json.dumps({'status': 'connected', 'job_id': job_id})
         print(f"Sending initial SSE data: {initial_data}")
-        yield f"data: {initial_data}\n\n"
+        yield f"retry: 2000\ndata: {initial_data}\n\n"
+        last_sent = time.time()
         
         try:
-            while job_id in async_service.processing_jobs:
-                job = async_service.processing_jobs[job_id]
+            while True:
+                # Read from the job store where possible, so any worker can report on the job
+                job = async_service.get_job_status(job_id, with_results=False)
+                if job is None:
+                    break
                 current_progress = job.get("progress", 0)
                 status = job.get("status", "initializing")
                 
+                # Text streamed so far for in-flight items (streaming jobs only)
+                partials = async_service.get_partials(job_id)
+
                 # Update last activity timestamp
-                job["last_activity"] = time.time()
+                async_service.touch_job(job_id)
                 
                 # Only send updates when there's a change or status update
-                if current_progress != last_progress or status in ["completed", "error", "cancelled"]:
+                if (current_progress != last_progress or status != last_status or partials != last_partials
+                        or status in ["completed", "error", "cancelled"]):
                     last_progress = current_progress
+                    last_status = status
+                    last_partials = partials
                     
                     # Prepare the response data
                     response_data = {
                         "status": status,
                         "progress": current_progress,
                     }
+                    if partials:
+                        response_data["partials"] = partials
                     
                     # Add results if completed
                     if status == "completed":
+                        job = async_service.get_job_status(job_id)
                         results = job.get("results", {})
                         response_ids = [r.get('response_id') for r in results.values() 
                                       if r.get('response_id')]
                         response_data["response_ids"] = response_ids
                         
                         # Store response IDs in the job data instead of the session
-                        job["response_ids"] = response_ids
+                        async_service.set_job_response_ids(job_id, response_ids)
                         
                         # Try to store in session (might want to make this work later) but it will fail outside request context
                         try:
@@ -305,23 +423,27 @@ def progress_stream(job_id):
                     json_data = json.dumps(response_data)
                     print(f"Sending SSE update: {json_data}")
                     yield f"data: {json_data}\n\n"
+                    last_sent = time.time()
                     
                     # Break the loop after completion, error, or cancellation
                     if status in ["completed", "error", "cancelled"]:
                         break
-                else:
-                    # Send a keep-alive comment
-                    yield f": keepalive\n\n"  # Changed to just keepalive without timestamp
+                elif time.time() - last_sent >= heartbeat_sec:
+                    # Send a keep-alive comment so proxies don't drop an idle stream
+                    yield f": keepalive\n\n"
+                    last_sent = time.time()
                 
-                # Check for timeout
-                if time.time() > timeout:
-                    timeout_data = json.dumps({'status': 'timeout', 'progress': current_progress})
-                    print(f"SSE timeout: {timeout_data}")
-                    yield f"data: {timeout_data}\n\n"
+                # End the stream so the page reconnects rather than hold this thread for the whole job
+                if time.time() > reconnect_at:
+                    yield f"data: {json.dumps({'status': 'reconnect', 'progress': current_progress})}\n\n"
                     break
                     
-                # Wait a bit before next update
-                time.sleep(0.5)
+                # Sleep until the job publishes a change (or the next heartbeat or reconnect is due).
+                # A job running in another process can't notify us, so poll the job store for it.
+                wait = max(0.0, min(heartbeat_sec - (time.time() - last_sent), reconnect_at - time.time()))
+                if not async_service.is_running_here(job_id):
+                    wait = min(wait, store_poll_sec)
+                version = job_events.wait_for_change(job_id, version, timeout=wait)
         except Exception as e:
             print(f"Error in SSE stream: {str(e)}")
             import traceback
@@ -332,7 +454,8 @@ def progress_stream(job_id):
             yield f"data: {error_data}\n\n"
     
     # Set the appropriate headers for SSE
-    response = FlaskResponse(generate(), mimetype="text/event-stream")
+    # stream_with_context keeps the app context for the job store reads in generate()
+    response = FlaskResponse(stream_with_context(generate()), mimetype="text/event-stream")
     response.headers["Cache-Control"] = "no-cache"
     response.headers["Connection"] = "keep-alive"
     response.headers["X-Accel-Buffering"] = "no"
@@ -341,10 +464,8 @@ def progress_stream(job_id):
 
 @llm_bp.route('/cancel_processing/<job_id>')
 def cancel_processing(job_id):
-    if job_id in async_service.processing_jobs:
-        # Mark job as cancelled
-        async_service.processing_jobs[job_id]["status"] = "cancelled"
-        async_service.processing_jobs[job_id]["processing"] = False
+    # Mark job as cancelled (in the job store too, so whichever worker runs it stops)
+    if async_service.cancel_job(job_id):
         
         # Clean up after a short delay
         def delayed_cleanup():
@@ -34,9 +34,8 @@ def clear_session():
                     job["task"].cancel()
                     cleared_jobs += 1
                 
-                # Mark job as cancelled
-                job["status"] = "cancelled"
-                job["processing"] = False
+                # Mark job as cancelled (here and in the job store)
+                async_service.cancel_job(job_id)
             except Exception as e:
                 print(f"Error canceling job {job_id}: {str(e)}")
         
@@ -65,6 +64,7 @@ def clear_session():
         # Clear model and provider if requested
         if clear_model:
             model_keys = ['model', 'provider', 'model_id']
+            session.pop('compare_model_ids', None)
             cleared_any = False
             for key in model_keys:
                 if key in session:
@@ -78,6 +78,7 @@ def clear_session():
         
         if clear_parameters and 'parameters' in session:
             session.pop('parameters')
+            session.pop('parameter_sweep', None)
             items_cleared.append('parameters')
             
         if clear_stories and 'story_ids' in session:
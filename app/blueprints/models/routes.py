@@ -37,6 +37,12 @@ def add():
             provider_id = request.form['provider_id']
             endpoint = request.form.get('endpoint', '')
             request_delay = float(request.form.get('request_delay', 0))
+            max_concurrency = request.form.get('max_concurrency', '').strip()
+            max_concurrency = int(max_concurrency) if max_concurrency else None
+            requests_per_minute = request.form.get('requests_per_minute', '').strip()
+            requests_per_minute = float(requests_per_minute) if requests_per_minute else None
+            tokens_per_minute = request.form.get('tokens_per_minute', '').strip()
+            tokens_per_minute = int(tokens_per_minute) if tokens_per_minute else None
             
             # Process parameters from form data
             parameters = models_service.process_parameter_form_data(request.form)
@@ -47,7 +53,10 @@ def add():
                 provider_id=provider_id,
                 endpoint=endpoint,
                 request_delay=request_delay,
-                parameters=parameters
+                parameters=parameters,
+                max_concurrency=max_concurrency,
+                requests_per_minute=requests_per_minute,
+                tokens_per_minute=tokens_per_minute
             )
             
             flash(f'Model "{name}" added successfully.', 'success')
@@ -88,6 +97,12 @@ def edit(model_id):
             provider_id = request.form['provider_id']
             endpoint = request.form.get('endpoint', '')
             request_delay = float(request.form.get('request_delay', 0))
+            max_concurrency = request.form.get('max_concurrency', '').strip()
+            max_concurrency = int(max_concurrency) if max_concurrency else None
+            requests_per_minute = request.form.get('requests_per_minute', '').strip()
+            requests_per_minute = float(requests_per_minute) if requests_per_minute else None
+            tokens_per_minute = request.form.get('tokens_per_minute', '').strip()
+            tokens_per_minute = int(tokens_per_minute) if tokens_per_minute else None
             
             # Process parameters from form data
             parameters = models_service.process_parameter_form_data(request.form)
@@ -99,7 +114,10 @@ def edit(model_id):
                 provider_id=provider_id,
                 endpoint=endpoint,
                 request_delay=request_delay,
-                parameters=parameters
+                parameters=parameters,
+                max_concurrency=max_concurrency,
+                requests_per_minute=requests_per_minute,
+                tokens_per_minute=tokens_per_minute
             )
             
             flash(f'Model "{updated_model["name"]}" updated successfully.', 'success')
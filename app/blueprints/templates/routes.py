@@ -14,7 +14,7 @@ from sqlalchemy import select
 
 from ... import db
 from ...models import Field, Story, Template, Word
-from ...services import category_service, story_builder_service, story_service
+from ...services import category_service, story_builder_service
 from ...utils.pagination import Pagination
 from . import templates_bp
 
@@ -150,9 +150,20 @@ def generate_stories():
                         except Exception as e:
                             flash(f"Could not add category '{new_cat}': {str(e)}", "danger")                             
                 
-                # Pass the field data and category_ids to the generate_stories function
-                generated_story_ids = story_builder_service.generate_stories(template_id, field_data, category_ids)
-                session['generated_story_ids'] = generated_story_ids
+                # The run is tracked on the server (the page polls its progress while this
+                # request runs); the session only keeps its id
+                generation_id = story_builder_service.start_generation(template_id, request.form.get('generation_id'))
+                try:
+                    generated_story_ids = story_builder_service.generate_stories(
+                        template_id, field_data, category_ids, **_generation_options(request.form),
+                        on_progress=lambda saved, total: story_builder_service.update_generation(
+                            generation_id, saved=saved, total=total),
+                    )
+                except Exception as e:
+                    story_builder_service.update_generation(generation_id, status="error", error=str(e))
+                    raise
+                story_builder_service.finish_generation(generation_id, generated_story_ids)
+                session['generation_id'] = generation_id
                 
                 if category_ids:
                     flash(f'Stories generated successfully with {len(category_ids)} categories!', 'success')
@@ -206,15 +217,63 @@ def generate_stories():
         categories=categories  
     )
 
+def _generation_options(data):
+    """
+    The generation mode and sample size chosen on the form (or in a preview request)
+
+    Raises:
+        ValueError: If the sample size or seed isn't a whole number
+    """
+    options = {'mode': data.get('generation_mode') or 'all'}
+    for name, label in (('sample_size', 'Sample size'), ('seed', 'Seed')):
+        value = str(data.get(name) or '').strip()
+        if value and not value.isdigit():
+            raise ValueError(f"{label} must be a whole number, not '{value}'")
+        options[name] = int(value) if value else None
+    return options
+
+@templates_bp.route('/preview_generation', methods=['POST'])
+def preview_generation():
+    """How many stories the selected words and generation mode would create, before any are written"""
+    data = request.get_json() or {}
+    template_id = data.get('template_id') or session.get('template_id')
+    if not template_id:
+        return jsonify({'success': False, 'message': 'No template selected'}), 400
+    try:
+        options = _generation_options(data)
+        options.pop('seed')
+        preview = story_builder_service.preview_generation(template_id, data.get('field_data') or {}, **options)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    return jsonify({'success': True, **preview})
+
+@templates_bp.route('/generation_progress/<generation_id>', methods=['GET'])
+def generation_progress(generation_id):
+    """How many stories a generation run has saved so far, for the generate page to poll"""
+    generation = story_builder_service.get_generation(generation_id)
+    if not generation:
+        return jsonify({'success': False, 'message': 'Unknown generation'}), 404
+    return jsonify({'success': True, **{key: generation[key] for key in ('status', 'saved', 'total', 'error')}})
+
 @templates_bp.route('/display_generated_stories', methods=['GET'])
 def display_generated_stories():
-    # Convert to strings for consistency
-    generated_story_ids = [str(story_id) for story_id in session.get('generated_story_ids', [])]
-    session['story_ids'] = generated_story_ids
-    
-    # When querying, convert back to integers
-    stories = [story_service.get_story_by_id(int(story_id)) for story_id in generated_story_ids]
-    return render_template('display_generated_stories.html', stories=stories)
+    """
+    A page of the stories the last generation run created. The run's stories are
+    looked up from its id ranges each time, rather than copied into the session.
+    """
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', current_app.config["PER_PAGE"], type=int)
+    pagination = story_builder_service.get_generated_stories(session.get('generation_id'), page, per_page)
+    if pagination is None:
+        flash('The generated stories are no longer available to show. Find them on the stories page.', 'warning')
+        return render_template('display_generated_stories.html', stories=[], pagination=None)
+
+    # Proceed to the stories page filtered to this template, where the new stories can be selected
+    generation = story_builder_service.get_generation(session['generation_id'])
+    session['template_ids'] = [str(generation['template_id'])]
+    session['stories_source'] = 'templates'
+    session['template_count'] = 1
+    return render_template('display_generated_stories.html', stories=pagination.items, pagination=pagination)
 
 @templates_bp.route('/add_word', methods=['POST'])
 def add_word():
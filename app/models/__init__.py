@@ -4,6 +4,9 @@ from .template import Template, Field, Word, word_field_association
 from .question import Question
 from .llm import Provider, Model
 from .run import Run
+from .response_cache import ResponseCache
+from .job import Job, JobItem
+from .generation import Generation
 
 __all__ = [
     # Story models
@@ -32,5 +35,15 @@ __all__ = [
     'Word', 
     'Field',
 
-    'Run' #added in migration
+    'Run', #added in migration
+
+    # LLM response cache
+    'ResponseCache',
+
+    # Persistent job store
+    'Job',
+    'JobItem',
+
+    # Story generation runs
+    'Generation'
 ]
\ No newline at end of file
@@ -0,0 +1,21 @@
+from app import db
+
+
+# A story generation run, kept in the database so the session only carries its id and
+# any web process can report its progress. Its stories are kept as ranges of consecutive
+# ids rather than a list of every id.
+class Generation(db.Model):
+    __tablename__ = 'generation'
+
+    generation_id = db.Column(db.String(32), primary_key=True)  # uuid4 hex, chosen by the generate page
+    template_id = db.Column(db.Integer, nullable=True)  # plain id: run history shouldn't block deleting a template
+    status = db.Column(db.String(20), nullable=False, default='running')
+    saved = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Integer, nullable=True)
+    story_ranges = db.Column(db.Text, nullable=False, default='[]')  # JSON: [[first_id, last_id], ...]
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, server_default=db.func.now())
+    updated_at = db.Column(db.DateTime, nullable=False, server_default=db.func.now(), onupdate=db.func.now())
+
+    def __repr__(self):
+        return f'<Generation {self.generation_id} - {self.status}>'
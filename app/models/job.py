@@ -0,0 +1,48 @@
+from app import db
+
+
+# A queued or running batch of LLM calls (one per JobItem). Mirrors the in-memory
+# async_service.processing_jobs entry so any process can report on or resume a job.
+class Job(db.Model):
+    __tablename__ = 'job'
+
+    job_id = db.Column(db.String(36), primary_key=True)  # uuid4 from async_service.create_job
+    run_id = db.Column(db.Integer, db.ForeignKey('run.run_id', ondelete='SET NULL'), nullable=True)
+    model_id = db.Column(db.Integer, nullable=True)  # plain ids: job history shouldn't block deleting a model/question
+    question_id = db.Column(db.Integer, nullable=True)
+    status = db.Column(db.String(20), nullable=False, default='initializing', index=True)
+    total = db.Column(db.Integer, nullable=False, default=0)
+    completed = db.Column(db.Integer, nullable=False, default=0)
+    progress = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.Text, nullable=True)
+    params = db.Column(db.Text, nullable=False)  # JSON: story_ids, parameters, prompts_data, is_rerun, bypass_cache
+    claimed_by = db.Column(db.String(255), nullable=True)  # id of the standalone worker running the job
+    heartbeat_at = db.Column(db.DateTime, nullable=True)  # last check-in from that worker
+    created_at = db.Column(db.DateTime, nullable=False, server_default=db.func.now())
+    updated_at = db.Column(db.DateTime, nullable=False, server_default=db.func.now(), onupdate=db.func.now())
+
+    items = db.relationship('JobItem', backref='job', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
+
+    def __repr__(self):
+        return f'<Job {self.job_id} - {self.status}>'
+
+
+# One LLM call within a job: a story for fresh jobs, a prompt for reruns
+class JobItem(db.Model):
+    __tablename__ = 'job_item'
+    __table_args__ = (
+        db.UniqueConstraint('job_id', 'item_key', name='uq_job_item_job_id_item_key'),
+    )
+
+    job_item_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    job_id = db.Column(db.String(36), db.ForeignKey('job.job_id', ondelete='CASCADE'), nullable=False, index=True)
+    position = db.Column(db.Integer, nullable=False)
+    item_key = db.Column(db.String(64), nullable=False)  # key used in the job's results (story_id or prompt_id)
+    story_id = db.Column(db.Integer, nullable=True)
+    prompt_id = db.Column(db.Integer, nullable=True)
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending / done / error
+    response_id = db.Column(db.Integer, db.ForeignKey('response.response_id', ondelete='SET NULL'), nullable=True)
+    error = db.Column(db.Text, nullable=True)
+
+    def __repr__(self):
+        return f'<JobItem {self.job_id}:{self.item_key} - {self.status}>'
@@ -23,6 +23,9 @@ class Model(db.Model):
     endpoint = db.Column(db.String(255), nullable=True)  # Line 76: Added endpoint column
     request_delay = db.Column(db.Float, nullable=False)  # Line 77: Added request_delay column
     parameters = db.Column(db.Text, nullable=False)  # Line 78: Added parameters column
+    max_concurrency = db.Column(db.Integer, nullable=True)  # In-flight calls allowed per job (falls back to Config.DEFAULT_MAX_CONCURRENCY)
+    requests_per_minute = db.Column(db.Float, nullable=True)  # Shared budget across all jobs (falls back to 60 / request_delay)
+    tokens_per_minute = db.Column(db.Integer, nullable=True)  # Shared token budget across all jobs (unlimited if not set)
 
     provider = db.relationship('Provider', backref=db.backref('models', lazy=True))
 
@@ -0,0 +1,19 @@
+from app import db
+
+
+# Cached provider completions, keyed by a hash of the exact request payload
+class ResponseCache(db.Model):
+    __tablename__ = 'response_cache'
+
+    cache_key = db.Column(db.String(64), primary_key=True)  # sha256 of provider + payload
+    provider_name = db.Column(db.String(255), nullable=False)
+    model_name = db.Column(db.String(255), nullable=False)
+    payload = db.Column(db.Text, nullable=False)
+    response_content = db.Column(db.Text, nullable=False)
+    full_response = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, server_default=db.func.now())
+    last_used_at = db.Column(db.DateTime, nullable=False, server_default=db.func.now(), index=True)
+    hit_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<ResponseCache {self.cache_key[:12]} - {self.model_name}>'
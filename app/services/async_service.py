@@ -1,12 +1,18 @@
 import asyncio
 import atexit
+import functools
 import logging
+import os
+import socket
 import threading
 import time
 import uuid
 from threading import Thread
 
 from app import db
+from app.services import job_events
+from app.services.job_scheduler import JobScheduler
+from app.services.metadata_cache import MetadataCache
 
 #New imports to enable run_id to be created and added as required
 from app.models import Run
@@ -22,7 +28,6 @@ _atexit_registered = False
 processing_jobs_lock = threading.Lock()
 
 #consider moving these to config later?
-MAX_CONCURRENT_JOBS = 5
 COMPLETED_EXPIRY_SEC = 1800
 STALLED_EXPIRY_SEC = 7200
 
@@ -79,12 +84,19 @@ def create_run_for_job(description=None):
     db.session.commit()
     return run.run_id
 
-def create_job(model_id, story_ids, question_id, parameters, prompts_data=None, run_description=None):
+def create_job(model_id, story_ids, question_id, parameters, prompts_data=None, run_description=None, bypass_cache=False,
+               run_id=None, resumed_from=None, stream=False, batch=False, variants=None):
+    """
+    Create a job (and, unless run_id is given, its Run). A job either reruns
+    prompts_data, asks question_id of every story with one model, or - given
+    variants (see model_variants) - asks it of every story once per variant.
+    """
     job_id = str(uuid.uuid4())
     print(f"In create_job: {run_description}")
     with processing_jobs_lock:
         if prompts_data:
             processing_jobs[job_id] = {
+                "job_id": job_id,
                 "status": "initializing",
                 "progress": 0,
                 "total": len(prompts_data),
@@ -99,14 +111,17 @@ def create_job(model_id, story_ids, question_id, parameters, prompts_data=None,
                     "question_id": question_id,
                     "parameters": parameters,
                     "prompts_data": prompts_data,
-                    "is_rerun": True
+                    "is_rerun": True,
+                    "bypass_cache": bypass_cache,
+                    "stream": stream
                 }
             }
         else:
             processing_jobs[job_id] = {
+                "job_id": job_id,
                 "status": "initializing",
                 "progress": 0,
-                "total": len(story_ids),
+                "total": len(story_ids) if not variants else sum(len(_variant_story_ids(story_ids, v)) for v in variants),
                 "completed": 0,
                 "results": {},
                 "response_ids": [],
@@ -116,33 +131,390 @@ def create_job(model_id, story_ids, question_id, parameters, prompts_data=None,
                     "model_id": model_id,
                     "story_ids": story_ids,
                     "question_id": question_id,
-                    "parameters": parameters
+                    "parameters": parameters,
+                    "bypass_cache": bypass_cache,
+                    "stream": stream,
+                    "batch": batch
                 }
             }
-    if run_description is None or run_description.strip() == "":
-        run_description = f"Test for model {model_id} with stories {story_ids}"
-    run_id = create_run_for_job(run_description)
+            if variants:
+                processing_jobs[job_id]["params"]["variants"] = variants
+    if resumed_from:
+        processing_jobs[job_id]["params"]["resumed_from"] = resumed_from
+    if run_id is None:
+        if (run_description is None or run_description.strip() == "") and variants:
+            variant_models = list(dict.fromkeys(v["model_id"] for v in variants))
+            run_description = f"Comparison of models {variant_models} over {len(variants)} variants with stories {story_ids}"
+        elif run_description is None or run_description.strip() == "":
+            run_description = f"Test for model {model_id} with stories {story_ids}"
+        run_id = create_run_for_job(run_description)
     processing_jobs[job_id]["run_id"] = run_id
+    _persist_job(job_id, processing_jobs[job_id])
     return job_id
 
 
+def model_variants(model_ids, parameters, parameter_sets=None):
+    """
+    The variants of a multi-model or sweep job: every model in model_ids with
+    parameters, or with each of parameter_sets (see llm_service.expand_parameter_sweep).
+    """
+    return [
+        {"model_id": int(model_id), "parameters": dict(variant_parameters)}
+        for model_id in model_ids
+        for variant_parameters in (parameter_sets or [parameters or {}])
+    ]
 
-def can_start_new_job():
-    """Check if we can start a new job based on current load"""
-    # Count active jobs (those with processing=True and recent activity)
-    current_time = time.time()
-    active_jobs = 0
+
+def _variant_story_ids(story_ids, variant):
+    """A variant's stories: the job's, unless the variant only has some of them left (after a resume)"""
+    return variant["story_ids"] if "story_ids" in variant else list(story_ids or [])
+
+
+def _filter_variants(params, keep):
+    """Narrow each variant of a multi-model job to the stories whose item key is in keep"""
+    from app.services.job_store import variant_item_key
+    story_ids = params.get("story_ids") or []
+    params["variants"] = [
+        dict(variant, story_ids=[sid for sid in _variant_story_ids(story_ids, variant)
+                                 if variant_item_key(index, sid) in keep])
+        for index, variant in enumerate(params["variants"])
+    ]
+    remaining = sum(len(variant["story_ids"]) for variant in params["variants"])
+    # Stories no variant still needs needn't be prefetched again
+    needed = {sid for variant in params["variants"] for sid in variant["story_ids"]}
+    params["story_ids"] = [sid for sid in story_ids if sid in needed]
+    return remaining
+
+
+def resume_run(run_id, bypass_cache=None):
+    """
+    Create a job for the items of run_id's original job that don't have a Response
+    in the run yet, writing into the same run. Works for story jobs and prompt reruns.
+
+    Args:
+        run_id: The run to resume
+        bypass_cache: Override the original job's cache setting (None keeps it)
+
+    Returns:
+        (job_id, remaining): job_id is None when every item already has a response
+
+    Raises:
+        ValueError: If no job was recorded for the run
+    """
+    from app.services import job_store
+    original = job_store.original_job_for_run(run_id)
+    if original is None:
+        raise ValueError(f"Run {run_id} has no recorded job to resume")
+
+    params = original["params"]
+    answered = job_store.answered_item_keys(run_id, params)
+    if bypass_cache is None:
+        bypass_cache = params.get("bypass_cache", False)
+
+    prompts_data = None
+    variants = None
+    story_ids = params.get("story_ids") or []
+    if params.get("is_rerun"):
+        prompts_data = [pd for pd in params.get("prompts_data") or [] if str(pd["prompt_id"]) not in answered]
+        remaining = len(prompts_data)
+    elif params.get("variants"):
+        unanswered = {
+            job_store.variant_item_key(index, sid)
+            for index, variant in enumerate(params["variants"])
+            for sid in _variant_story_ids(story_ids, variant)
+        } - answered
+        remaining = _filter_variants(params, unanswered)
+        story_ids, variants = params["story_ids"], params["variants"]
+    else:
+        story_ids = [sid for sid in story_ids if str(sid) not in answered]
+        remaining = len(story_ids)
+
+    logger.info(f"Run {run_id}: {len(answered)} items answered, {remaining} left")
+    if not remaining:
+        return None, 0
+
+    job_id = create_job(
+        params.get("model_id"), story_ids, params.get("question_id"), params.get("parameters") or {},
+        prompts_data=prompts_data, bypass_cache=bypass_cache, run_id=run_id, resumed_from=original["job_id"],
+        stream=params.get("stream", False), batch=params.get("batch", False), variants=variants
+    )
+    return job_id, remaining
+
+
+def _job_items(params):
+    """The job store items for a job's params: one per rerun prompt, per story and variant, else per story"""
+    if params.get("is_rerun"):
+        return [
+            {"item_key": pd["prompt_id"], "prompt_id": int(pd["prompt_id"]), "story_id": pd.get("story_id")}
+            for pd in params.get("prompts_data") or []
+        ]
+    if params.get("variants"):
+        from app.services.job_store import variant_item_key
+        return [
+            {"item_key": variant_item_key(index, story_id), "story_id": int(story_id)}
+            for index, variant in enumerate(params["variants"])
+            for story_id in _variant_story_ids(params.get("story_ids"), variant)
+        ]
+    return [{"item_key": story_id, "story_id": int(story_id)} for story_id in params.get("story_ids") or []]
+
+
+def _persist_job(job_id, job):
+    """Write a new job to the job store. The job still runs from memory if this fails."""
+    from app.services import job_store
+    params = job["params"]
+    try:
+        job_store.create_job(
+            job_id, job.get("run_id"), params.get("model_id"), params.get("question_id"),
+            params, _job_items(params)
+        )
+        job["persisted"] = True
+    except Exception as e:
+        logger.error(f"Could not persist job {job_id}; it will only be visible to this process: {e}")
+        job["persisted"] = False
+
+
+def get_job(job_id):
+    """
+    The in-memory job, loading it from the job store if this process hasn't seen it
+    (e.g. it was created by another worker or before a restart). A loaded job only
+    dispatches its items that haven't finished yet.
+    """
+    from app.services import job_store
     with processing_jobs_lock:
-        for job in processing_jobs.values():
-            if job.get("processing", False) and current_time - job.get("last_activity", 0) < 60:
-                active_jobs += 1
-        
-    # Limit to 5 concurrent jobs (adjust based on your server capacity)
-    return active_jobs < 5
+        job = processing_jobs.get(job_id)
+    if job is not None:
+        return job
 
-async def process_llm_requests(app, job_id, model_id=None, story_ids=None, question_id=None, parameters=None):
-    """Process all LLM requests for the given job"""
-    from app.services import llm_service  # Import here to avoid circular imports
+    stored = job_store.get_job(job_id)
+    if stored is None:
+        return None
+
+    params = stored["params"]
+    pending = set(job_store.pending_item_keys(job_id))
+    if params.get("is_rerun"):
+        params["prompts_data"] = [pd for pd in params.get("prompts_data") or [] if str(pd["prompt_id"]) in pending]
+    elif params.get("variants"):
+        _filter_variants(params, pending)
+    else:
+        params["story_ids"] = [sid for sid in params.get("story_ids") or [] if str(sid) in pending]
+
+    job = {
+        "job_id": job_id,
+        "status": stored["status"],
+        "progress": stored["progress"],
+        "total": stored["total"],
+        "completed": stored["completed"],
+        "results": stored["results"],
+        "response_ids": stored["response_ids"],
+        "processing": True,
+        "last_activity": time.time(),
+        "params": params,
+        "run_id": stored["run_id"],
+        "persisted": True,
+        "resumed": True,
+    }
+    with processing_jobs_lock:
+        job = processing_jobs.setdefault(job_id, job)
+    logger.info(f"Loaded job {job_id} from the job store with {len(pending)} items left")
+    return job
+
+
+def get_job_status(job_id, with_results=True):
+    """
+    Latest view of a job for progress reporting. Persisted jobs are read from the job
+    store, since any process may be running them; otherwise the in-memory entry.
+    """
+    from app.services import job_store
+    with processing_jobs_lock:
+        job = processing_jobs.get(job_id)
+    if job is None or job.get("persisted"):
+        try:
+            stored = job_store.get_job(job_id, with_results=with_results)
+        except Exception as e:
+            logger.warning(f"Could not read job {job_id} from the job store: {e}")
+            stored = None
+        if stored is not None:
+            return stored
+    return job
+
+
+def enqueue_job(job_id):
+    """
+    Queue a persisted job for a standalone worker (JOB_EXECUTION_MODE = "worker").
+    Only a job nobody has started yet is queued; asking again (e.g. the loading page
+    being reloaded) leaves a queued, running or finished job alone.
+
+    Returns:
+        The job's status afterwards ("queued" if it was queued), or None if the job
+        isn't in the job store, so it has to run in this process
+    """
+    from app.services import job_store
+    with processing_jobs_lock:
+        job = processing_jobs.get(job_id)
+    if job is not None and not job.get("persisted"):
+        return None
+    status = job_store.queue_job(job_id)
+    if status == "queued":
+        with processing_jobs_lock:
+            if job is not None and job.get("status") != "cancelled":
+                job["status"] = "queued"
+        job_events.publish(job_id)
+    return status
+
+
+def claim_job(job_id):
+    """
+    Claim a job for this process to run inline (JOB_EXECUTION_MODE = "inline"). With
+    several web processes sharing the job store, a job another process (or an earlier
+    request) has already started, paused or finished is left alone.
+
+    Returns:
+        None if this process should run the job, else the job's current status
+    """
+    from app.services import job_store
+    with processing_jobs_lock:
+        job = processing_jobs.get(job_id)
+    if job is not None and not job.get("persisted"):
+        status = job.get("status")
+        return None if status in job_store.UNSTARTED_STATUSES else status
+    if job_store.claim_job(job_id, f"web:{socket.gethostname()}:{os.getpid()}"):
+        return None
+    return job_store.get_status(job_id)
+
+
+def forget_job(job_id):
+    """Drop a job from this process's memory (it stays in the job store)"""
+    with processing_jobs_lock:
+        processing_jobs.pop(job_id, None)
+    job_events.forget(job_id)
+
+
+def touch_job(job_id):
+    """Record activity on an in-memory job so cleanup_old_jobs leaves it alone"""
+    with processing_jobs_lock:
+        job = processing_jobs.get(job_id)
+        if job is not None:
+            job["last_activity"] = time.time()
+
+
+def is_running_here(job_id):
+    """Whether this process started the job, so its in-memory progress notifications are live"""
+    with processing_jobs_lock:
+        job = processing_jobs.get(job_id)
+        return job is not None and job.get("task") is not None
+
+
+def set_job_response_ids(job_id, response_ids):
+    with processing_jobs_lock:
+        job = processing_jobs.get(job_id)
+        if job is not None:
+            job["response_ids"] = response_ids
+
+
+def set_job_status(job_id, status, error=None):
+    """Update a job's status in memory and in the job store. A cancelled job stays cancelled."""
+    from app.services import job_store
+    with processing_jobs_lock:
+        job = processing_jobs.get(job_id)
+        if job is not None and job.get("status") != "cancelled":
+            job["status"] = status
+            if error is not None:
+                job["error"] = error
+    if job is None or job.get("persisted"):
+        try:
+            job_store.set_status(job_id, status, error=error)
+        except Exception as e:
+            logger.error(f"Could not store status {status} for job {job_id}: {e}")
+    job_events.publish(job_id)
+
+
+def cancel_job(job_id):
+    """
+    Cancel a job wherever it is running: running workers stop picking up items and
+    the cancel is visible to other processes through the job store.
+
+    Returns:
+        True if the job was found
+    """
+    from app.services import job_store
+    with processing_jobs_lock:
+        job = processing_jobs.get(job_id)
+        if job is not None:
+            job["status"] = "cancelled"
+            job["processing"] = False
+    try:
+        stored = job_store.set_status(job_id, "cancelled")
+    except Exception as e:
+        logger.error(f"Could not store cancel for job {job_id}: {e}")
+        stored = False
+    job_events.publish(job_id)
+    return job is not None or stored
+
+
+_scheduler = None
+
+
+def get_scheduler(app=None):
+    """The JobScheduler that admits jobs onto the event loop, configured from app.config"""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = JobScheduler()
+    if app is not None:
+        config = app.config
+        _scheduler.configure(
+            max_jobs=config.get("MAX_CONCURRENT_JOBS", 5),
+            max_jobs_per_model=config.get("MAX_CONCURRENT_JOBS_PER_MODEL"),
+            interactive_max_items=config.get("SCHEDULER_INTERACTIVE_MAX_ITEMS", 20),
+            aging_sec=config.get("SCHEDULER_AGING_SEC", 300),
+        )
+    return _scheduler
+
+
+def can_start_new_job():
+    """Whether a new job would start straight away rather than wait in the scheduler's queue"""
+    return get_scheduler().has_capacity()
+
+
+async def run_scheduled_job(app, job_id, model_id=None, story_ids=None, question_id=None, parameters=None,
+                            owner=None, priority=None, keep_alive=300):
+    """
+    Wait for the scheduler to admit the job, then process it. The job shows as
+    "queued" while it waits; cancelling the returned task also gives up its place.
+
+    owner identifies who started the job (e.g. a browser session) so one user's
+    batch can't hold every slot while others wait.
+
+    The slot is released as soon as the job finishes; the task itself then stays
+    alive for keep_alive seconds without holding up queued jobs.
+    """
+    with app.app_context():
+        job = get_job(job_id)
+    total = job.get("total", 0) if job else 0
+
+    def on_queued():
+        with app.app_context():
+            set_job_status(job_id, "queued")
+
+    result = await get_scheduler(app).run(
+        job_id,
+        lambda: process_llm_requests(app, job_id, model_id, story_ids, question_id, parameters, keep_alive=0),
+        model_id=model_id,
+        owner=owner,
+        priority=priority,
+        total_items=total,
+        on_queued=on_queued,
+    )
+    if keep_alive:
+        await asyncio.sleep(keep_alive)
+    return result
+
+async def process_llm_requests(app, job_id, model_id=None, story_ids=None, question_id=None, parameters=None, keep_alive=300):
+    """Process all LLM requests for the given job
+
+    keep_alive is how long (seconds) the finished job stays marked as processing; the
+    standalone worker passes 0 so finished jobs free their slot straight away.
+    """
+    from app.services.response_writer import ResponseWriter
 
     logger.info(f"In async_service process_llm_requests (line116) START for job: {job_id}, check on model id: {model_id}")
     
@@ -154,23 +526,35 @@ async def process_llm_requests(app, job_id, model_id=None, story_ids=None, quest
                     logger.error(f"Job ID {job_id} not found in processing_jobs")
                     return
 
-                # Initialize job status
-                job["status"] = "running"
-                job["completed"] = 0
-                job["results"] = {}
-                job["progress"] = 0
+                # Initialize job status (a job loaded from the store keeps the items it already finished)
+                if not job.get("resumed"):
+                    job["completed"] = 0
+                    job["results"] = {}
+                    job["progress"] = 0
                 logger.info(f"Job initialized: {job}")
+            set_job_status(job_id, "running")
 
+            # Results are written in batches; every exit path below flushes what's queued
+            # (along with the job store's item statuses)
+            writer = ResponseWriter(app, job_id=job_id if job.get("persisted") else None)
             try:
                 is_rerun = job.get("params", {}).get("is_rerun", False)
                 prompts_data = job.get("params", {}).get("prompts_data", [])
 
                 if is_rerun and prompts_data:
                     logger.info("Detected rerun prompts. Processing...")
-                    await process_rerun_prompts(app, job_id, prompts_data)
+                    await process_rerun_prompts(app, job_id, prompts_data, writer=writer)
+                elif job.get("params", {}).get("variants"):
+                    variants = job["params"]["variants"]
+                    logger.info(f"Processing {len(story_ids)} stories across {len(variants)} model variants...")
+                    await process_variants(app, job_id, story_ids, question_id, variants, writer=writer)
+                elif job.get("params", {}).get("batch"):
+                    logger.info(f"Processing {len(story_ids)} stories as a provider batch...")
+                    await process_stories_as_batch(app, job_id, model_id, story_ids, question_id, parameters, writer=writer)
                 else:
                     logger.info(f"Processing {len(story_ids)} stories...")
-                    await process_stories(app, job_id, model_id, story_ids, question_id, parameters)
+                    await process_stories(app, job_id, model_id, story_ids, question_id, parameters, writer=writer)
+                await writer.close()
 
                 # Extract response IDs
                 response_ids = []
@@ -179,18 +563,23 @@ async def process_llm_requests(app, job_id, model_id=None, story_ids=None, quest
                         response_ids.append(str(result_data["response_id"]))
                 job["response_ids"] = response_ids
 
-                job["status"] = "completed"
-                job["progress"] = 100
+                if job["status"] != "cancelled":
+                    job["progress"] = 100
+                    set_job_status(job_id, "completed")
                 logger.info(f"Job {job_id} completed with {len(response_ids)} responses.")
 
-                await asyncio.sleep(300)  # 5 mins to keep job alive
+                if keep_alive:
+                    await asyncio.sleep(keep_alive)  # 5 mins to keep job alive
 
             except Exception as e:
                 logger.error(f"Error inside LLM processing block: {str(e)}", exc_info=True)
-                job["status"] = "error"
-                job["error"] = str(e)
+                set_job_status(job_id, "error", error=str(e))
 
             finally:
+                try:
+                    await writer.close()
+                except Exception:
+                    logger.exception(f"Could not flush queued responses for job {job_id}")
                 with processing_jobs_lock:
                     if job_id in processing_jobs:
                         job["processing"] = False
@@ -200,20 +589,273 @@ async def process_llm_requests(app, job_id, model_id=None, story_ids=None, quest
         logger.exception(f"Unhandled exception in process_llm_requests({job_id}): {outer_ex}")
 
 
-async def process_rerun_prompts(app, job_id, prompts_data):
+async def _wait_for_rate_limit(app, model_id, provider_name, limits, prompt_text, parameters):
+    """Block until the shared model (and provider) budgets allow another call.
+
+    Every job calling the same model draws from the same process-wide buckets, so
+    concurrent jobs share the provider quota instead of each assuming it owns it.
+    """
+    from app.services import providers, rate_limiter
+
+    max_tokens = (parameters or {}).get("max_tokens") or app.config["SYSTEM_DEFAULTS"]["max_tokens"]["default"]
+    tokens = rate_limiter.estimate_tokens(prompt_text, max_tokens)
+    limiters = rate_limiter.limiters_for_model(
+        model_id,
+        provider_name,
+        limits,
+        provider_limits=providers.rate_limit_budgets(app.config.get("PROVIDER_RATE_LIMITS")),
+        burst_seconds=app.config.get("RATE_LIMIT_BURST_SECONDS", 1.0),
+    )
+    for limiter in limiters:
+        await limiter.acquire(tokens)
+
+
+def _set_job_paused(app, job_id, paused):
+    """Flip a running job to "paused" (or back) so progress streams show why it stalled"""
+    with processing_jobs_lock:
+        job = processing_jobs.get(job_id)
+        current = job.get("status") if job else None
+    target = "paused" if paused else "running"
+    if current in ("running", "paused") and current != target:
+        logger.info(f"Job {job_id} {target}")
+        with app.app_context():
+            set_job_status(job_id, target)
+
+
+async def _wait_for_provider(app, job_id, provider_name):
+    """Hold an item back while its provider's circuit breaker is open.
+
+    The job shows as "paused" meanwhile. Once the breaker lets probes through the
+    item goes ahead (possibly as the probe); the job shows "running" again once the
+    breaker has closed.
+
+    Returns:
+        False if the job was cancelled while waiting
+    """
+    from app.services import circuit_breaker, llm_service
+
+    with app.app_context():
+        breaker = llm_service.get_provider_breaker(provider_name)
+    if breaker is None:
+        return _job_is_active(job_id)
+    while _job_is_active_in_store(app, job_id):
+        if breaker.state == circuit_breaker.CLOSED:
+            _set_job_paused(app, job_id, False)
+            return True
+        wait = breaker.retry_in()
+        if wait <= 0:
+            return True
+        _set_job_paused(app, job_id, True)
+        await asyncio.sleep(min(wait, 1.0))
+    return False
+
+
+def _circuit_was_open(response):
+    return isinstance(response, dict) and response.get("circuit_open")
+
+
+async def _run_bounded(items, worker, max_concurrency):
+    """Run worker(index, item) over items with at most max_concurrency calls in flight.
+
+    A fixed pool of consumer coroutines share one iterator, so memory stays flat
+    however many items the job has.
+    """
+    iterator = iter(enumerate(items))
+    max_concurrency = max(1, min(int(max_concurrency or 1), len(items) or 1))
+
+    async def consume():
+        for index, item in iterator:
+            await worker(index, item)
+
+    await asyncio.gather(*(consume() for _ in range(max_concurrency)))
+
+
+def _job_is_active(job_id):
+    """False once a job has been removed or cancelled, so workers stop picking up new items"""
+    with processing_jobs_lock:
+        job = processing_jobs.get(job_id)
+        return job is not None and job.get("status") != "cancelled"
+
+
+def _job_is_active_in_store(app, job_id, check_interval=1.0):
+    """
+    _job_is_active, also noticing a cancel made through the job store by another
+    process (a web process cancelling a job a standalone worker runs). For waits that
+    record no outcomes meanwhile - polling a provider batch, a paused job - so the
+    writer never sees the stored status. The store is read at most every check_interval
+    seconds per job.
+    """
+    from app.services import job_store
+
+    if not _job_is_active(job_id):
+        return False
+    with processing_jobs_lock:
+        job = processing_jobs.get(job_id)
+        if job is None or not job.get("persisted"):
+            return job is not None
+        now = time.monotonic()
+        if now - job.get("store_checked_at", 0.0) < check_interval:
+            return True
+        job["store_checked_at"] = now
+    try:
+        with app.app_context():
+            status = job_store.get_status(job_id)
+    except Exception as e:
+        logger.warning(f"Could not read job {job_id} status from the job store: {e}")
+        return True
+    if status == "cancelled":
+        logger.info(f"Job {job_id} was cancelled through the job store")
+        with processing_jobs_lock:
+            job["status"] = "cancelled"
+            job["processing"] = False
+        return False
+    return True
+
+
+def _stream_to_job(job, key, publish_interval):
+    """
+    on_token callback for a streamed call: keeps the item's text so far in job["partials"]
+    and wakes progress streams, at most once per publish_interval seconds per job.
+    """
+    def on_token(text):
+        with processing_jobs_lock:
+            job.setdefault("partials", {})[key] = text
+            now = time.time()
+            if now - job.get("partials_published_at", 0) < publish_interval:
+                return
+            job["partials_published_at"] = now
+        job_events.publish(job["job_id"])
+    return on_token
+
+
+def get_partials(job_id):
+    """Text streamed so far for each in-flight item of a job running in this process"""
+    with processing_jobs_lock:
+        job = processing_jobs.get(job_id)
+        return dict(job.get("partials") or {}) if job else {}
+
+
+def _record_result(job, key, response):
+    """Store the outcome of one LLM call in job["results"] and update progress"""
+    with processing_jobs_lock:
+        job.get("partials", {}).pop(key, None)
+        job["completed"] += 1
+        if response:
+            if isinstance(response, dict) and "response_id" in response:
+                job["results"][key] = {'response_id': response["response_id"]}
+            elif isinstance(response, dict) and "error" in response:
+                job["results"][key] = {'error': response["error"]}
+            elif hasattr(response, 'response_id'):
+                job["results"][key] = {'response_id': response.response_id}
+            else:
+                logger.warning(f"Unexpected response format: {type(response)}")
+                job["results"][key] = {'error': 'Invalid response format'}
+        else:
+            logger.warning(f"Empty response received for item {key}")
+            job["results"][key] = {'error': 'Empty response'}
+
+        # Calculate and update progress percentage
+        progress = int((job["completed"] / job["total"]) * 100)
+        job["progress"] = progress
+        job["last_activity"] = time.time()
+    if job.get("job_id"):
+        job_events.publish(job["job_id"])
+
+
+async def _handle_response(job, key, response, writer=None, linked_keys=()):
+    """Record a call's outcome, handing deferred prompt/response rows to the job's writer.
+
+    Deferred rows only count towards progress once their batch has been written, so
+    response_ids in job["results"] always refer to committed rows.
+
+    linked_keys are items deduplicated into this call that share its outcome (and,
+    for a deferred row, its single Response).
+    """
+    keys = [key, *linked_keys]
+    if writer is not None and isinstance(response, dict) and "record" in response:
+        await writer.submit(
+            response["record"],
+            on_saved=lambda response_id: [_record_result(job, k, {"response_id": response_id}) for k in keys],
+            on_error=lambda error: [_record_result(job, k, {"error": f"Could not save response: {error}"}) for k in keys],
+            item_key=keys if linked_keys else key,
+        )
+    else:
+        for k in keys:
+            _record_result(job, k, response)
+            if writer is not None:
+                outcome = job["results"].get(k, {})
+                await writer.submit_outcome(k, response_id=outcome.get("response_id"), error=outcome.get("error"))
+
+    # Notice a cancel made through the job store by another process
+    if writer is not None and writer.job_status == "cancelled" and job.get("status") != "cancelled":
+        with processing_jobs_lock:
+            job["status"] = "cancelled"
+        if job.get("job_id"):
+            job_events.publish(job["job_id"])
+
+
+def _dedup_enabled(app, parameters):
+    """Whether identical items in a job may share one call (JOB_DEDUP_PROMPTS)"""
+    mode = app.config.get("JOB_DEDUP_PROMPTS", "deterministic")
+    if mode == "always":
+        return True
+    if mode == "deterministic":
+        temperature = (parameters or {}).get("temperature", app.config["SYSTEM_DEFAULTS"]["temperature"]["default"])
+        try:
+            return float(temperature) == 0
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def _group_duplicate_stories(story_ids, metadata):
+    """
+    Collapse stories with identical text. In a story job the model, question and
+    parameters are shared, so identical text means an identical request.
+
+    Returns:
+        (representatives, duplicates): the story ids to send, in order, and
+        {representative: [story ids answered by its call]}
+    """
+    first_by_text = {}
+    duplicates = {}
+    representatives = []
+    for story_id in dict.fromkeys(story_ids):
+        text = metadata.story(story_id)
+        representative = first_by_text.setdefault(text, story_id) if text is not None else story_id
+        if representative == story_id:
+            representatives.append(story_id)
+        else:
+            duplicates.setdefault(representative, []).append(story_id)
+    return representatives, duplicates
+
+
+def _story_item_key(story_id):
+    return story_id
+
+
+async def _fan_out(app, job, story_id, response, duplicate_ids, writer, item_key=_story_item_key):
+    """
+    Record a representative's outcome for itself and its duplicates: a Response of
+    their own per story (JOB_DEDUP_FANOUT="copy"), or all pointing at the one
+    Response ("link").
+    """
+    if not duplicate_ids or app.config.get("JOB_DEDUP_FANOUT", "copy") == "link" \
+            or not (isinstance(response, dict) and "record" in response):
+        await _handle_response(job, item_key(story_id), response, writer,
+                               linked_keys=[item_key(sid) for sid in duplicate_ids])
+        return
+    await _handle_response(job, item_key(story_id), response, writer)
+    for duplicate_id in duplicate_ids:
+        copy = dict(response, record=dict(response["record"], story_id=duplicate_id))
+        await _handle_response(job, item_key(duplicate_id), copy, writer)
+
+
+async def process_rerun_prompts(app, job_id, prompts_data, writer=None):
     """Process a batch of prompts for rerunning"""
 
     logger.info(f"In async_service process_rerun_prompts (line 175) START for job: {job_id}")
-    from app.services import (
-        llm_service,
-        question_service,
-        story_service,
-    )
-    # Validate services are available
-    if not hasattr(story_service, 'get_story_by_id'):
-        raise RuntimeError("story_service.get_story_by_id function not found")
-    if not hasattr(question_service, 'get_question_by_id'):
-        raise RuntimeError("question_service.get_question_by_id function not found")
+    from app.services import llm_service
 
     if not prompts_data:
         logger.warning(f"No prompts data provided for job {job_id}")
@@ -222,109 +864,105 @@ async def process_rerun_prompts(app, job_id, prompts_data):
     with processing_jobs_lock:
         job = processing_jobs[job_id]
         run_id = job.get("run_id")
+        job_model_id = job.get("params", {}).get("model_id")
+        use_cache = not job.get("params", {}).get("bypass_cache", False)
+        stream = job.get("params", {}).get("stream", False)
         app.logger.info(f"async_service line 206 Job {job_id} run_id: {run_id}")
+    publish_interval = app.config.get("STREAM_PUBLISH_INTERVAL_SEC", 0.25)
 
-    for i, prompt_data in enumerate(prompts_data):
-        with processing_jobs_lock:
-            # Check if job is still processing
-            if job_id not in processing_jobs:
-                return
-
-            # Check if prompt data is valid
-            if not isinstance(prompt_data, dict):
-                logger.error(f"Invalid prompt data format for job {job_id}")
-                continue
+    # Job preparation: load every model, question and story text the prompts use up
+    # front, so dispatching doesn't touch the database
+    valid_prompts = [p for p in prompts_data if isinstance(p, dict)]
+    metadata = MetadataCache()
+    with app.app_context():
+        metadata.load(
+            model_ids=[job_model_id] + [p.get('model_id') for p in valid_prompts],
+            question_ids=[p.get('question_id') for p in valid_prompts],
+        )
+        metadata.load_stories([p.get('story_id') for p in valid_prompts],
+                              chunk_size=app.config.get("STORY_PREFETCH_CHUNK_SIZE", 500))
+        job_model = metadata.model(job_model_id)
+        max_concurrency = llm_service.resolve_max_concurrency(job_model.max_concurrency if job_model else None)
+    logger.info(f"Job {job_id} dispatching up to {max_concurrency} calls at once")
 
+    async def process_prompt(i, prompt_data):
         # Check if job has been cancelled
-        with processing_jobs_lock:
-            if job_id not in processing_jobs:
-                return
+        if not _job_is_active(job_id):
+            return
+
+        # Check if prompt data is valid
+        if not isinstance(prompt_data, dict):
+            logger.error(f"Invalid prompt data format for job {job_id}")
+            return
 
         # Get the prompt data
         prompt_id = prompt_data.get('prompt_id')
         if not prompt_id:
             logger.error(f"Missing prompt_id in prompt data for job {job_id}")
-            continue
+            return
         model_id = prompt_data['model_id']
-        story_id = prompt_data['story_id']
         question_id = prompt_data['question_id']
         parameters = prompt_data['parameters']
 
         try:
-            # Get the story, question, and model details
-            with app.app_context():
-                story = story_service.get_story_by_id(story_id)
-                question = question_service.get_question_by_id(question_id)
-                provider_name = llm_service.get_provider_name_by_model_id(model_id)
-                model_name = llm_service.get_model_name_by_id(model_id)
-                request_delay = llm_service.get_request_delay_by_model_id(model_id)
-                if not story or not question:
-                    logger.error(f"Story or question not found for prompt {prompt_id}")
-                    with processing_jobs_lock:
-                        job["results"][prompt_id] = {'error': 'Story or question not found'}
-                    continue
-
-            # Delay is outside app context since it's async
-            if i > 0 and request_delay > 0:
-                await asyncio.sleep(request_delay)
-
-            # Make the actual API call through the service layer
-            # response = await run_llm_call_in_executor(
-            #     provider_name=provider_name,  # these can be overridden inside call_llm
-            #     story=None,
-            #     question=None,
-            #     story_id=prompt_data["story_id"],
-            #     question_id=prompt_data["question_id"],
-            #     model_name=model_name,
-            #     model_id=model_id,
-            #     prompt_id=prompt_id,
-            #     **parameters  #suggested alternative is **{} unpacking syntax
-            # )
-
-            response = await run_llm_call_in_executor(
-                app,
-                provider_name,
-                story.content,
-                question.content,
-                prompt_data["story_id"],
-                prompt_data["question_id"],
-                model_name,
-                model_id,
-                prompt_id=prompt_id,
-                run_id = run_id,
-                **parameters
-            )
+            # Everything the call needs was loaded during job preparation
+            story_content = metadata.story(prompt_data['story_id'])
+            question = metadata.question(question_id)
+            model = metadata.model(model_id)
+            if story_content is None or not question or not model:
+                logger.error(f"Story, question or model not found for prompt {prompt_id}")
+                await _handle_response(job, prompt_id, {'error': 'Story, question or model not found'}, writer)
+                return
+            provider_name = model.provider_name
+            model_name = model.name
+            rate_limits = model.rate_limits
 
-            with processing_jobs_lock:
-                # Update job state
-                job["completed"] += 1
-                if response:
-                    if isinstance(response, dict) and "response_id" in response:
-                        job["results"][prompt_id] = {'response_id': response["response_id"]}
-                    elif hasattr(response, 'response_id'):
-                        job["results"][prompt_id] = {'response_id': response.response_id}
-                    else:
-                        logger.warning(f"Unexpected response format: {type(response)}")
-                        job["results"][prompt_id] = {'error': 'Invalid response format'}
-                else:
-                    logger.warning(f"Empty response received for prompt {prompt_id}")
-                    job["results"][prompt_id] = {'error': 'Empty response'}
+            # Items refused by an open circuit breaker wait for the provider and go again
+            while True:
+                if not await _wait_for_provider(app, job_id, provider_name):
+                    return
+
+                # Wait for the shared rate limiter outside the app context since it's async
+                await _wait_for_rate_limit(app, model_id, provider_name, rate_limits,
+                                           story_content + question.content, parameters)
 
-                # Calculate and update progress percentage
-                progress = int((job["completed"] / job["total"]) * 100)
-                job["progress"] = progress
-                job["last_activity"] = time.time()
+                response = await run_llm_call(
+                    app,
+                    provider_name,
+                    story_content,
+                    question.content,
+                    prompt_data["story_id"],
+                    prompt_data["question_id"],
+                    model_name,
+                    model_id,
+                    prompt_id=prompt_id,
+                    run_id = run_id,
+                    use_cache=use_cache,
+                    defer_save=writer is not None,
+                    on_token=_stream_to_job(job, prompt_id, publish_interval) if stream else None,
+                    endpoint=model.endpoint,
+                    **parameters
+                )
+                if not _circuit_was_open(response):
+                    break
+            await _handle_response(job, prompt_id, response, writer)
 
         except Exception as e:
             logger.error(f"Error processing prompt {prompt_id}: {str(e)}")
             import traceback
             traceback.print_exc()
-            with processing_jobs_lock:
-                job["results"][prompt_id] = {'error': str(e)}
+            await _handle_response(job, prompt_id, {'error': str(e)}, writer)
+
+    await _run_bounded(prompts_data, process_prompt, max_concurrency)
+
+async def process_stories(app, job_id, model_id, story_ids, question_id, parameters, writer=None,
+                          metadata=None, item_key=None):
+    """Process each story in the job, keeping up to the model's max_concurrency calls in flight
 
-async def process_stories(app, job_id, model_id, story_ids, question_id, parameters):
-    """Process each story in the job"""
-    from app.services import llm_service, question_service, story_service
+    A multi-model job passes the metadata it prefetched for every model, and item_key
+    to map a story_id to the job item it answers (the story_id itself by default).
+    """
+    from app.services import llm_service
     logger.info(f"In async_service process_stories (line 281) START for job: {job_id}")
     if not story_ids:
         logger.warning(f"No story IDs provided for job {job_id}")
@@ -334,95 +972,217 @@ async def process_stories(app, job_id, model_id, story_ids, question_id, paramet
         job = processing_jobs[job_id]
         run_id = job.get("run_id")
         app.logger.info(f"async_service line 317 Job {job_id} run_id: {run_id}")
+        use_cache = not job.get("params", {}).get("bypass_cache", False)
+        stream = job.get("params", {}).get("stream", False)
         total_stories = len(story_ids)
+    publish_interval = app.config.get("STREAM_PUBLISH_INTERVAL_SEC", 0.25)
 
-    for i, story_id in enumerate(story_ids):
-        with processing_jobs_lock: #move inside the loop as otherwise loop locks up
-            if job_id not in processing_jobs:
-                return
-            logger.info(f"Processing story {i+1}/{total_stories} — story_id: {story_id}")
+    if item_key is None:
+        item_key = _story_item_key
+
+    # Job preparation: the model and question are the same for every story, and every
+    # story's text is loaded up front, so dispatching doesn't touch the database
+    if metadata is None:
+        with app.app_context():
+            metadata = MetadataCache().load(model_ids=[model_id], question_ids=[question_id])
+            metadata.load_stories(story_ids, chunk_size=app.config.get("STORY_PREFETCH_CHUNK_SIZE", 500))
+    model = metadata.model(model_id)
+    question = metadata.question(question_id)
+    max_concurrency = llm_service.resolve_max_concurrency(model.max_concurrency if model else None)
+    logger.info(f"Job {job_id} dispatching up to {max_concurrency} calls at once")
+
+    duplicates = {}
+    if _dedup_enabled(app, parameters):
+        story_ids, duplicates = _group_duplicate_stories(story_ids, metadata)
+        if duplicates:
+            logger.info(f"Job {job_id}: {total_stories} stories collapse into {len(story_ids)} calls")
+
+    # Copies of a deduplicated result are saved from its record, so they need a writer
+    own_writer = writer is None and bool(duplicates)
+    if own_writer:
+        from app.services.response_writer import ResponseWriter
+        writer = ResponseWriter(app)
+
+    async def process_story(i, story_id):
+        if not _job_is_active(job_id):
+            return
+        logger.info(f"Processing story {i+1}/{total_stories} — story_id: {story_id}")
 
         try:
-            # Get all needed data within app context
-            with app.app_context():
-                story = story_service.get_story_by_id(story_id)
-                question = question_service.get_question_by_id(question_id)
-                provider_name = llm_service.get_provider_name_by_model_id(model_id)
-                model_name = llm_service.get_model_name_by_id(model_id)
-                request_delay = llm_service.get_request_delay_by_model_id(model_id)
-
-                if not story or not question:
-                    logger.error(f"Story or question not found for story_id {story_id}")
-                    with processing_jobs_lock:
-                        job["results"][story_id] = {'error': 'Story or question not found'}
-                    continue
-
-            # Rate limiting delay outside of context manager
-            if i > 0 and request_delay > 0:
-                await asyncio.sleep(request_delay)
-
-            # Make the actual API call through the service layer
-            logger.info(f"Calling LLM for story {story_id}")
-            response = await run_llm_call_in_executor(
-                app,
-                provider_name,
-                story.content,
-                question.content,
-                story_id,
-                question_id,
-                model_name,
-                model_id,
-                run_id=run_id,
-                **parameters
-            )
+            story_content = metadata.story(story_id)
+            if story_content is None or not question or not model:
+                logger.error(f"Story, question or model not found for story_id {story_id}")
+                await _handle_response(job, item_key(story_id), {'error': 'Story, question or model not found'}, writer)
+                return
+            provider_name = model.provider_name
+            model_name = model.name
+            rate_limits = model.rate_limits
 
-            with processing_jobs_lock:
-                job["completed"] += 1
-                if response:
-                    logger.info(f"In async_service process_stories (line 328) check on response_id: {response['response_id']}")
-                    if isinstance(response, dict) and "response_id" in response:
-                        job["results"][story_id] = {'response_id': response["response_id"]}
-                    elif hasattr(response, 'response_id'):
-                        job["results"][story_id] = {'response_id': response.response_id}
-                    else:
-                        logger.warning(f"Unexpected response format: {type(response)}")
-                        job["results"][story_id] = {'error': 'Invalid response format'}
-                else:
-                    logger.warning(f"Empty response received for story {story_id}")
-                    job["results"][story_id] = {'error': 'Empty response'}
+            # Items refused by an open circuit breaker wait for the provider and go again
+            while True:
+                if not await _wait_for_provider(app, job_id, provider_name):
+                    return
+
+                # Rate limiting outside of context manager
+                await _wait_for_rate_limit(app, model_id, provider_name, rate_limits,
+                                           story_content + question.content, parameters)
 
-                # Calculate and update progress percentage
-                progress = int((job["completed"] / job["total"]) * 100)
-                job["progress"] = progress
-                job["last_activity"] = time.time()
+                # Make the actual API call through the service layer
+                logger.info(f"Calling LLM for story {story_id}")
+                response = await run_llm_call(
+                    app,
+                    provider_name,
+                    story_content,
+                    question.content,
+                    story_id,
+                    question_id,
+                    model_name,
+                    model_id,
+                    run_id=run_id,
+                    use_cache=use_cache,
+                    defer_save=writer is not None,
+                    on_token=_stream_to_job(job, item_key(story_id), publish_interval) if stream else None,
+                    endpoint=model.endpoint,
+                    **parameters
+                )
+                if not _circuit_was_open(response):
+                    break
+            await _fan_out(app, job, story_id, response, duplicates.get(story_id, ()), writer, item_key)
 
         except Exception as e:
             logger.error(f"Error processing story {story_id}: {str(e)}")
             import traceback
             traceback.print_exc()
-            with processing_jobs_lock:
-                job["results"][story_id] = {'error': str(e)}
+            await _handle_response(job, item_key(story_id), {'error': str(e)}, writer,
+                                   linked_keys=[item_key(sid) for sid in duplicates.get(story_id, ())])
 
-async def run_llm_call_in_executor(app, provider_name, story_content, question_content, story_id, question_id, model_name, model_id, run_id=None, **parameters):
-    """Run a synchronous LLM call in an executor thread"""
-    from app.services import llm_service  # Import here to avoid circular imports
-    logger.info(f"In async_service run_llm_call_in_executor (line 353) check on model id: {model_id}")
-    def call_llm_with_context():
-        with app.app_context():
-            return llm_service.call_llm(
-                provider_name, 
-                story_content, 
-                question_content, 
-                story_id, 
-                question_id, 
-                model_name, 
-                model_id,
-                run_id=run_id,
-                **parameters
+    await _run_bounded(story_ids, process_story, max_concurrency)
+    if own_writer:
+        await writer.close()
+
+async def process_variants(app, job_id, story_ids, question_id, variants, writer=None):
+    """Process the stories once per variant, running different models side by side.
+
+    Models have separate quotas, so each model's variants run alongside the other
+    models' and the job takes about as long as its slowest model. A model's own
+    variants (e.g. the points of a parameter sweep) take turns, each with the model's
+    full max_concurrency, so the job never has more of a model's calls in flight
+    than the model allows. Stories, models and the question are loaded once for all
+    of them, and every variant shares the model's rate limits and the job's writer.
+    """
+    from app.services import job_store
+
+    with app.app_context():
+        metadata = MetadataCache().load(model_ids=[v["model_id"] for v in variants], question_ids=[question_id])
+        metadata.load_stories(story_ids, chunk_size=app.config.get("STORY_PREFETCH_CHUNK_SIZE", 500))
+
+    by_model = {}
+    for index, variant in enumerate(variants):
+        by_model.setdefault(variant["model_id"], []).append((index, variant))
+
+    async def run_model(model_group):
+        for index, variant in model_group:
+            if not _job_is_active(job_id):
+                return
+            await process_stories(
+                app, job_id, variant["model_id"], _variant_story_ids(story_ids, variant), question_id,
+                variant.get("parameters") or {}, writer=writer, metadata=metadata,
+                item_key=functools.partial(job_store.variant_item_key, index),
             )
-    
-    loop = asyncio.get_running_loop()
-    return await loop.run_in_executor(None, call_llm_with_context)
+
+    await asyncio.gather(*(run_model(model_group) for model_group in by_model.values()))
+
+async def process_stories_as_batch(app, job_id, model_id, story_ids, question_id, parameters, writer=None):
+    """Send every story in the job to the provider as one batch and record the results.
+
+    The batch id is saved with the job, so a job picked up again after its worker
+    stopped waits for the same batch rather than paying for a second one. Models whose
+    provider has no batch API are processed call by call instead.
+    """
+    from app.services import job_store, llm_service, providers
+    from app.services.response_writer import ResponseWriter
+
+    with processing_jobs_lock:
+        job = processing_jobs[job_id]
+        run_id = job.get("run_id")
+        use_cache = not job.get("params", {}).get("bypass_cache", False)
+        batch_id = job.get("params", {}).get("provider_batch_id")
+
+    with app.app_context():
+        metadata = MetadataCache().load(model_ids=[model_id], question_ids=[question_id])
+        metadata.load_stories(story_ids, chunk_size=app.config.get("STORY_PREFETCH_CHUNK_SIZE", 500))
+    model = metadata.model(model_id)
+    question = metadata.question(question_id)
+    provider = providers.find_provider(model.provider_name) if model else None
+    if provider is None or not provider.supports_batch_api:
+        logger.info(f"Job {job_id}: provider has no batch API, sending calls individually")
+        return await process_stories(app, job_id, model_id, story_ids, question_id, parameters, writer=writer)
+
+    duplicates = {}
+    if _dedup_enabled(app, parameters):
+        story_ids, duplicates = _group_duplicate_stories(story_ids, metadata)
+
+    items = {}
+    for story_id in story_ids:
+        story_content = metadata.story(story_id)
+        if story_content is None or not question:
+            await _handle_response(job, story_id, {'error': 'Story, question or model not found'}, writer,
+                                   linked_keys=duplicates.get(story_id, ()))
+        else:
+            items[story_id] = (story_id, question_id, story_content, question.content)
+
+    # Batch results always come back as records to save in bulk
+    own_writer = writer is None
+    if own_writer:
+        writer = ResponseWriter(app)
+
+    def on_submitted(new_batch_id):
+        with processing_jobs_lock:
+            job["params"]["provider_batch_id"] = new_batch_id
+            params = dict(job["params"])
+        if job.get("persisted"):
+            job_store.update_params(job_id, params)
+
+    with app.app_context():
+        results = await llm_service.call_llm_batch_async(
+            model.provider_name, items, model.name, model_id,
+            run_id=run_id,
+            use_cache=use_cache,
+            endpoint=model.endpoint,
+            batch_id=batch_id,
+            on_submitted=on_submitted,
+            is_active=lambda: _job_is_active_in_store(app, job_id),
+            poll_interval=app.config.get("PROVIDER_BATCH_POLL_INTERVAL_SEC", 30),
+            **parameters
+        )
+    for story_id, response in results.items():
+        await _fan_out(app, job, story_id, response, duplicates.get(story_id, ()), writer)
+    if own_writer:
+        await writer.close()
+
+async def run_llm_call(app, provider_name, story_content, question_content, story_id, question_id, model_name, model_id, run_id=None, use_cache=True, defer_save=False, on_token=None, endpoint=None, **parameters):
+    """Make an LLM call on the event loop through the model's registered provider.
+
+    Providers without an async client of their own run their blocking call in a
+    worker thread (see LLMProvider.complete_async).
+    """
+    from app.services import llm_service  # Import here to avoid circular imports
+    with app.app_context():
+        return await llm_service.call_llm_async(
+            provider_name,
+            story_content,
+            question_content,
+            story_id,
+            question_id,
+            model_name,
+            model_id,
+            run_id=run_id,
+            use_cache=use_cache,
+            defer_save=defer_save,
+            on_token=on_token,
+            endpoint=endpoint,
+            **parameters
+        )
 
 
 def cleanup_old_jobs():
@@ -445,11 +1205,23 @@ def cleanup_old_jobs():
             if job_id in processing_jobs:
                 logger.info(f"Cleaning up old job: {job_id}")
                 del processing_jobs[job_id]
+                job_events.forget(job_id)
+
+def _close_provider_clients(loop, timeout=2):
+    """Close the pooled provider connections before the loop goes away"""
+    from app.services import llm_service
+    if not loop.is_running():
+        return
+    try:
+        asyncio.run_coroutine_threadsafe(llm_service.close_async_clients(), loop).result(timeout)
+    except Exception as e:
+        logger.warning(f"Could not close provider clients cleanly: {e}")
 
 def shutdown_async_service():
     global _event_loop
     with _event_loop_lock:
         if _event_loop is not None and not _event_loop.is_closed():
+            _close_provider_clients(_event_loop)
             _event_loop.call_soon_threadsafe(_event_loop.stop)
             logger.info("Async event loop stopped")
 
@@ -0,0 +1,149 @@
+import logging
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+from app.services.retry_policy import ProviderError
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+class CircuitOpenError(ProviderError):
+    """A call refused because the provider's breaker is open"""
+
+    def __init__(self, provider, retry_in):
+        super().__init__(f"{provider} is unavailable (circuit open, retry in {retry_in:.0f}s)",
+                         provider=provider, retryable=False, retry_after=retry_in)
+
+
+class CircuitBreaker:
+    """
+    Stops calls to a provider that keeps failing.
+
+    Closed: calls go through and their outcomes are remembered (the last window_size).
+    Once at least min_calls are remembered and failure_rate of them failed, the breaker
+    opens. Open: calls are refused for open_sec. Half-open: up to half_open_probes calls
+    go through as probes; one success closes the breaker, one failure opens it again.
+    """
+
+    def __init__(self, name: str, failure_rate: float = 0.5, min_calls: int = 10,
+                 window_size: int = 20, open_sec: float = 30.0, half_open_probes: int = 1):
+        self.name = name
+        self._lock = threading.Lock()
+        self._outcomes = deque()
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._probe_started = 0.0
+        self.configure(failure_rate, min_calls, window_size, open_sec, half_open_probes)
+
+    def configure(self, failure_rate: float = 0.5, min_calls: int = 10, window_size: int = 20,
+                  open_sec: float = 30.0, half_open_probes: int = 1) -> None:
+        with self._lock:
+            self.failure_rate = float(failure_rate)
+            self.window_size = max(1, int(window_size))
+            self.min_calls = max(1, min(int(min_calls), self.window_size))
+            self.open_sec = float(open_sec)
+            self.half_open_probes = max(1, int(half_open_probes))
+            self._outcomes = deque(self._outcomes, maxlen=self.window_size)
+
+    def _refresh(self, now: float) -> None:
+        if self._state == OPEN and now - self._opened_at >= self.open_sec:
+            self._state = HALF_OPEN
+            self._probes_in_flight = 0
+            logger.info(f"Circuit {self.name} half-open: probing")
+        elif self._state == HALF_OPEN and self._probes_in_flight and now - self._probe_started >= self.open_sec:
+            # A probe that never reported back (e.g. its job was cancelled) frees its slot
+            self._probes_in_flight = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._refresh(time.monotonic())
+            return self._state
+
+    def retry_in(self) -> float:
+        """Seconds until a call could be let through (0 if it could be now)"""
+        with self._lock:
+            now = time.monotonic()
+            self._refresh(now)
+            if self._state == OPEN:
+                return max(0.0, self.open_sec - (now - self._opened_at))
+            if self._state == HALF_OPEN and self._probes_in_flight >= self.half_open_probes:
+                return 1.0  # wait for the probe's outcome
+            return 0.0
+
+    def allow(self) -> bool:
+        """Whether a call may go through now; in half-open it becomes a probe"""
+        with self._lock:
+            self._refresh(time.monotonic())
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and self._probes_in_flight < self.half_open_probes:
+                self._probes_in_flight += 1
+                self._probe_started = time.monotonic()
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state == HALF_OPEN:
+                logger.info(f"Circuit {self.name} closed: probe succeeded")
+                self._state = CLOSED
+                self._outcomes.clear()
+            self._outcomes.append(True)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            if self._state == HALF_OPEN:
+                self._open(now, "probe failed")
+                return
+            self._outcomes.append(False)
+            failures = self._outcomes.count(False)
+            if (self._state == CLOSED and len(self._outcomes) >= self.min_calls
+                    and failures / len(self._outcomes) >= self.failure_rate):
+                self._open(now, f"{failures}/{len(self._outcomes)} recent calls failed")
+
+    def _open(self, now: float, reason: str) -> None:
+        self._state = OPEN
+        self._opened_at = now
+        self._probes_in_flight = 0
+        self._outcomes.clear()
+        logger.warning(f"Circuit {self.name} open for {self.open_sec:.0f}s: {reason}")
+
+
+def get_breaker(name: str, config: Optional[dict] = None) -> CircuitBreaker:
+    """
+    Get the process-wide breaker for `name` (a provider), creating it on first use.
+    Settings from config (CIRCUIT_BREAKER_*) are applied each time.
+    """
+    config = config or {}
+    settings = dict(
+        failure_rate=config.get("CIRCUIT_BREAKER_FAILURE_RATE", 0.5),
+        min_calls=config.get("CIRCUIT_BREAKER_MIN_CALLS", 10),
+        window_size=config.get("CIRCUIT_BREAKER_WINDOW", 20),
+        open_sec=config.get("CIRCUIT_BREAKER_OPEN_SEC", 30.0),
+        half_open_probes=config.get("CIRCUIT_BREAKER_HALF_OPEN_PROBES", 1),
+    )
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = _breakers[name] = CircuitBreaker(name, **settings)
+            return breaker
+    breaker.configure(**settings)
+    return breaker
+
+
+def reset_breakers() -> None:
+    """Forget all breaker state (used by tests)"""
+    with _breakers_lock:
+        _breakers.clear()
@@ -0,0 +1,51 @@
+import threading
+
+# Process-local change notifications for jobs. async_service publishes whenever a
+# job's progress or status changes; progress streams block in wait_for_change until
+# then instead of polling. Every job's condition shares one lock, but publishing only
+# wakes the streams watching that job.
+
+_lock = threading.Lock()
+_conditions = {}  # job_id -> threading.Condition
+_versions = {}  # job_id -> number of changes published
+
+
+def _condition(job_id):
+    condition = _conditions.get(job_id)
+    if condition is None:
+        condition = _conditions[job_id] = threading.Condition(_lock)
+    return condition
+
+
+def publish(job_id):
+    """Signal that job_id has changed"""
+    with _lock:
+        _versions[job_id] = _versions.get(job_id, 0) + 1
+        _condition(job_id).notify_all()
+
+
+def version(job_id):
+    """Number of changes published for job_id so far"""
+    with _lock:
+        return _versions.get(job_id, 0)
+
+
+def wait_for_change(job_id, seen_version, timeout):
+    """
+    Block until job_id changes after seen_version, or timeout seconds pass.
+
+    Returns:
+        The current version (equal to seen_version on timeout)
+    """
+    with _lock:
+        _condition(job_id).wait_for(lambda: _versions.get(job_id, 0) != seen_version, timeout)
+        return _versions.get(job_id, 0)
+
+
+def forget(job_id):
+    """Drop a finished job's bookkeeping, waking anything still waiting on it"""
+    with _lock:
+        condition = _conditions.pop(job_id, None)
+        _versions.pop(job_id, None)
+        if condition is not None:
+            condition.notify_all()
@@ -0,0 +1,114 @@
+import asyncio
+import itertools
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 1
+
+
+class _Ticket:
+    """A job waiting for (or holding) a slot"""
+
+    def __init__(self, job_id, model_id, owner, priority, seq):
+        self.job_id = job_id
+        self.model_id = model_id
+        self.owner = owner
+        self.priority = priority
+        self.seq = seq
+        self.enqueued_at = time.monotonic()
+        self.granted = asyncio.get_running_loop().create_future()
+
+
+class JobScheduler:
+    """
+    Admission control for jobs on the background event loop.
+
+    At most max_jobs jobs run at once, and at most max_jobs_per_model on any one model.
+    When a slot frees, the waiting job picked is the one with:
+      1. the best priority class (small interactive jobs before big batch jobs; a waiting
+         job moves up a class every aging_sec so batch jobs are never starved),
+      2. then the owner with the fewest running jobs,
+      3. then the model with the fewest running jobs,
+      4. then the job that has waited longest.
+
+    Only use it from the event loop thread.
+    """
+
+    def __init__(self, max_jobs=5, max_jobs_per_model=None, interactive_max_items=20, aging_sec=300):
+        self._waiting = []
+        self._running = {}  # job_id -> _Ticket
+        self._seq = itertools.count()
+        self.configure(max_jobs, max_jobs_per_model, interactive_max_items, aging_sec)
+
+    def configure(self, max_jobs=5, max_jobs_per_model=None, interactive_max_items=20, aging_sec=300):
+        self.max_jobs = max(1, int(max_jobs))
+        self.max_jobs_per_model = int(max_jobs_per_model) if max_jobs_per_model else None
+        self.interactive_max_items = interactive_max_items
+        self.aging_sec = aging_sec
+
+    def priority_for(self, total_items):
+        """Default priority class for a job of total_items calls"""
+        return PRIORITY_INTERACTIVE if total_items <= self.interactive_max_items else PRIORITY_BATCH
+
+    async def run(self, job_id, start, model_id=None, owner=None, priority=None, total_items=0, on_queued=None):
+        """
+        Wait for a slot, then run and return `await start()`. The slot is released when
+        the job finishes, fails or is cancelled (also while still waiting).
+
+        on_queued() is called if the job has to wait.
+        """
+        if priority is None:
+            priority = self.priority_for(total_items)
+        ticket = _Ticket(job_id, model_id, owner, priority, next(self._seq))
+        self._waiting.append(ticket)
+        self._dispatch()
+        try:
+            if not ticket.granted.done():
+                logger.info(f"Job {job_id} queued behind {len(self._running)} running job(s)")
+                if on_queued:
+                    on_queued()
+                await ticket.granted
+            return await start()
+        finally:
+            if ticket in self._waiting:
+                self._waiting.remove(ticket)
+            self._running.pop(job_id, None)
+            self._dispatch()
+
+    def _running_count(self, attr, value):
+        return sum(1 for ticket in self._running.values() if getattr(ticket, attr) == value)
+
+    def _eligible(self, ticket):
+        if self.max_jobs_per_model is None:
+            return True
+        return self._running_count("model_id", ticket.model_id) < self.max_jobs_per_model
+
+    def _sort_key(self, ticket, now):
+        aged = int((now - ticket.enqueued_at) // self.aging_sec) if self.aging_sec else 0
+        return (
+            max(PRIORITY_INTERACTIVE, ticket.priority - aged),
+            self._running_count("owner", ticket.owner),
+            self._running_count("model_id", ticket.model_id),
+            ticket.seq,
+        )
+
+    def _dispatch(self):
+        now = time.monotonic()
+        while len(self._running) < self.max_jobs:
+            candidates = [ticket for ticket in self._waiting if self._eligible(ticket)]
+            if not candidates:
+                return
+            ticket = min(candidates, key=lambda t: self._sort_key(t, now))
+            self._waiting.remove(ticket)
+            self._running[ticket.job_id] = ticket
+            if not ticket.granted.done():
+                ticket.granted.set_result(True)
+
+    def has_capacity(self):
+        return len(self._running) < self.max_jobs
+
+    def stats(self):
+        return {"running": len(self._running), "waiting": len(self._waiting), "max_jobs": self.max_jobs}
@@ -0,0 +1,418 @@
+import datetime
+import json
+import logging
+
+from sqlalchemy import bindparam, case, func, select, update
+
+from app import session_scope
+from app.models import Job, JobItem, Prompt, Response
+
+logger = logging.getLogger(__name__)
+
+# Statuses of a job a worker is working on ("paused" while its provider is unavailable)
+CLAIMED_STATUSES = ("running", "paused")
+# Statuses of a job nobody has started yet
+UNSTARTED_STATUSES = ("initializing", "started")
+
+
+def create_job(job_id, run_id, model_id, question_id, params, items):
+    """
+    Persist a new job and its items.
+
+    Args:
+        job_id: The job's uuid
+        run_id: Run the job's responses belong to
+        model_id: Model the job calls
+        question_id: Question asked of every story
+        params: JSON-serialisable job parameters (as kept in processing_jobs[job_id]["params"])
+        items: Dicts with item_key and optional story_id / prompt_id, in dispatch order
+    """
+    with session_scope() as session:
+        session.add(Job(
+            job_id=job_id,
+            run_id=run_id,
+            model_id=model_id,
+            question_id=question_id,
+            status="initializing",
+            total=len(items),
+            params=json.dumps(params, default=str),
+        ))
+        session.add_all([
+            JobItem(
+                job_id=job_id,
+                position=position,
+                item_key=str(item["item_key"]),
+                story_id=item.get("story_id"),
+                prompt_id=item.get("prompt_id"),
+            )
+            for position, item in enumerate(items)
+        ])
+
+
+def get_status(job_id):
+    """The job's stored status, or None if the job isn't in the store"""
+    with session_scope() as session:
+        return session.execute(select(Job.status).where(Job.job_id == job_id)).scalar()
+
+
+def set_status(job_id, status, error=None):
+    """
+    Update a job's status (and error message). A cancelled job stays cancelled.
+
+    Returns:
+        True if the job exists in the store
+    """
+    with session_scope() as session:
+        job = session.get(Job, job_id)
+        if job is None:
+            return False
+        if job.status == "cancelled" and status != "cancelled":
+            return True
+        job.status = status
+        if error is not None:
+            job.error = error
+        if status == "completed":
+            job.progress = 100
+        return True
+
+
+def update_params(job_id, params):
+    """Replace a job's stored params (e.g. to remember the provider batch it submitted)"""
+    with session_scope() as session:
+        session.execute(update(Job).where(Job.job_id == job_id).values(params=json.dumps(params, default=str)))
+
+
+def record_outcomes(job_id, outcomes):
+    """
+    Mark a batch of items as finished and refresh the job's counters.
+
+    Args:
+        job_id: The job's uuid
+        outcomes: Dicts with item_key and either response_id or error
+
+    Returns:
+        The job's current status, so callers can notice a cancel made elsewhere
+    """
+    rows = [
+        {
+            "b_job_id": job_id,
+            "b_item_key": str(outcome["item_key"]),
+            "status": "error" if outcome.get("error") else "done",
+            "response_id": outcome.get("response_id"),
+            "error": outcome.get("error"),
+        }
+        for outcome in outcomes
+    ]
+    with session_scope() as session:
+        if rows:
+            # A single executemany UPDATE for the whole batch
+            table = JobItem.__table__
+            session.connection().execute(
+                update(table)
+                .where(table.c.job_id == bindparam("b_job_id"))
+                .where(table.c.item_key == bindparam("b_item_key")),
+                rows,
+            )
+        job = session.get(Job, job_id)
+        if job is None:
+            return None
+        job.completed = session.execute(
+            select(func.count()).select_from(JobItem)
+            .where(JobItem.job_id == job_id, JobItem.status != "pending")
+        ).scalar()
+        if job.total:
+            job.progress = int(job.completed / job.total * 100)
+        return job.status
+
+
+def get_job(job_id, with_results=True):
+    """
+    Snapshot of a stored job in the same shape as a processing_jobs entry, or None.
+    results are keyed by item_key (a string); with_results=False skips loading the
+    items, for cheap progress polling.
+    """
+    with session_scope() as session:
+        job = session.get(Job, job_id)
+        if job is None:
+            return None
+        items = []
+        if with_results:
+            items = session.execute(
+                select(JobItem).where(JobItem.job_id == job_id).order_by(JobItem.position)
+            ).scalars().all()
+
+        results = {}
+        for item in items:
+            if item.status == "done":
+                results[item.item_key] = {"response_id": item.response_id}
+            elif item.status == "error":
+                results[item.item_key] = {"error": item.error}
+
+        return {
+            "job_id": job.job_id,
+            "run_id": job.run_id,
+            "status": job.status,
+            "progress": job.progress,
+            "total": job.total,
+            "completed": job.completed,
+            "error": job.error,
+            "results": results,
+            "response_ids": [str(r["response_id"]) for r in results.values() if r.get("response_id")],
+            "params": json.loads(job.params),
+        }
+
+
+def pending_item_keys(job_id):
+    """item_keys of the job's items that haven't finished yet, in dispatch order"""
+    with session_scope() as session:
+        return session.execute(
+            select(JobItem.item_key)
+            .where(JobItem.job_id == job_id, JobItem.status == "pending")
+            .order_by(JobItem.position)
+        ).scalars().all()
+
+
+def original_job_for_run(run_id):
+    """
+    The job that first filled run_id (resumed jobs reuse their run), as a get_job
+    snapshot without results, or None if no job was recorded for the run.
+    """
+    with session_scope() as session:
+        jobs = session.execute(
+            select(Job.job_id, Job.params).where(Job.run_id == run_id).order_by(Job.created_at)
+        ).all()
+    if not jobs:
+        return None
+    original = next((job for job in jobs if "resumed_from" not in json.loads(job.params)), jobs[0])
+    return get_job(original.job_id, with_results=False)
+
+
+# Saved as Prompt columns (HuggingFace renames max_tokens in its payload)
+_SAMPLING_PARAMETERS = ("temperature", "max_tokens", "top_p")
+
+
+def _same_value(saved, wanted):
+    try:
+        return abs(float(saved) - float(wanted)) <= 1e-9
+    except (TypeError, ValueError):
+        return saved == wanted
+
+
+def _same_parameters(prompt, parameters):
+    """
+    Whether a saved prompt was sent with the parameters a job asked for: sampling
+    parameters against the Prompt's columns (unset ones match anything), every other
+    parameter (frequency_penalty, seed, ...) against the value in its saved payload.
+    """
+    for name in _SAMPLING_PARAMETERS:
+        try:
+            wanted = float(parameters[name])
+        except (KeyError, TypeError, ValueError):
+            continue
+        if getattr(prompt, name) is None or abs(float(getattr(prompt, name)) - wanted) > 1e-9:
+            return False
+
+    others = {name: value for name, value in parameters.items() if name not in _SAMPLING_PARAMETERS}
+    if not others:
+        return True
+    try:
+        payload = json.loads(prompt.payload or "{}")
+    except ValueError:
+        return False
+    # Groq-style payloads carry parameters at the top level, HuggingFace's under "parameters"
+    sent = dict(payload, **payload["parameters"]) if isinstance(payload.get("parameters"), dict) else payload
+    return all(name in sent and _same_value(sent[name], value) for name, value in others.items())
+
+
+def variant_item_key(index, story_id):
+    """Item key for story_id under the index-th variant of a multi-model job"""
+    return f"{index}:{story_id}"
+
+
+def answered_item_keys(run_id, params):
+    """
+    item_keys of a job's items that already have a Response in run_id: prompt_ids for
+    reruns; for story jobs, stories answered with the job's model, question and
+    parameters (for multi-model jobs, with each variant's), including
+    deduplicated stories that share another story's Response.
+    """
+    with session_scope() as session:
+        if params.get("is_rerun"):
+            prompt_ids = session.execute(
+                select(Prompt.prompt_id).join(Response, Response.prompt_id == Prompt.prompt_id)
+                .where(Response.run_id == run_id).distinct()
+            ).scalars().all()
+            return {str(prompt_id) for prompt_id in prompt_ids}
+
+        variants = params.get("variants") or [
+            {"model_id": params.get("model_id"), "parameters": params.get("parameters")}
+        ]
+        prompts = session.execute(
+            select(Response.response_id, Prompt.story_id, Prompt.model_id, Prompt.temperature, Prompt.max_tokens,
+                   Prompt.top_p, Prompt.payload)
+            .join(Response, Response.prompt_id == Prompt.prompt_id)
+            .where(
+                Response.run_id == run_id,
+                Prompt.model_id.in_({variant.get("model_id") for variant in variants}),
+                Prompt.question_id == params.get("question_id"),
+            )
+        ).all()
+        # Duplicate stories linked to another story's Response (JOB_DEDUP_FANOUT="link") have
+        # no prompt of their own; their job items point at the shared Response instead
+        linked = {}
+        for response_id, story_id in session.execute(
+            select(JobItem.response_id, JobItem.story_id)
+            .join(Job, Job.job_id == JobItem.job_id)
+            .where(Job.run_id == run_id, JobItem.response_id.in_({prompt.response_id for prompt in prompts}))
+        ).all():
+            linked.setdefault(response_id, set()).add(story_id)
+
+        def story_ids(prompt):
+            return {prompt.story_id, *linked.get(prompt.response_id, ())}
+
+        if not params.get("variants"):
+            parameters = params.get("parameters") or {}
+            return {
+                str(story_id)
+                for prompt in prompts if _same_parameters(prompt, parameters)
+                for story_id in story_ids(prompt)
+            }
+        return {
+            variant_item_key(index, story_id)
+            for index, variant in enumerate(variants)
+            for prompt in prompts
+            if prompt.model_id == variant.get("model_id") and _same_parameters(prompt, variant.get("parameters") or {})
+            for story_id in story_ids(prompt)
+        }
+
+
+# --- Standalone workers -------------------------------------------------------
+# A worker claims a queued job with a conditional UPDATE, so when several workers
+# poll the same store exactly one of them wins each job.
+
+def _now():
+    return datetime.datetime.utcnow()
+
+
+def claim_next_job(worker_id, interactive_max_items=None, aging_sec=300):
+    """
+    Claim the next queued job for worker_id and mark it running.
+
+    Jobs are claimed oldest first, except that with interactive_max_items set, jobs of
+    at most that many items go before bigger ones (unless those have waited aging_sec).
+
+    Returns:
+        The claimed job_id, or None if nothing is queued
+    """
+    order = [Job.created_at]
+    if interactive_max_items is not None:
+        aged_before = _now() - datetime.timedelta(seconds=aging_sec)
+        order.insert(0, case(
+            (Job.total <= interactive_max_items, 0),
+            (Job.created_at <= aged_before, 0),
+            else_=1,
+        ))
+    with session_scope() as session:
+        candidates = session.execute(
+            select(Job.job_id).where(Job.status == "queued").order_by(*order).limit(10)
+        ).scalars().all()
+        for job_id in candidates:
+            result = session.execute(
+                update(Job)
+                .where(Job.job_id == job_id, Job.status == "queued")
+                .values(status="running", claimed_by=worker_id, heartbeat_at=_now())
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount == 1:
+                logger.info(f"Worker {worker_id} claimed job {job_id}")
+                return job_id
+        return None
+
+
+def queue_job(job_id):
+    """
+    Queue a job for the workers if nobody has started it yet, with a conditional
+    UPDATE so a job already queued, running or finished is never queued twice.
+
+    Returns:
+        The job's status afterwards ("queued" if it was queued), or None if the job
+        isn't in the store
+    """
+    with session_scope() as session:
+        result = session.execute(
+            update(Job)
+            .where(Job.job_id == job_id, Job.status.in_(UNSTARTED_STATUSES), Job.claimed_by.is_(None))
+            .values(status="queued")
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 1:
+            return "queued"
+        return session.execute(select(Job.status).where(Job.job_id == job_id)).scalar()
+
+
+def claim_job(job_id, owner):
+    """
+    Claim a job nobody has started yet for owner (a web process running it inline)
+    and mark it "started". Like queue_job this is a conditional UPDATE, so when
+    several processes are asked to start the same job only one of them runs it.
+
+    Returns:
+        True if owner claimed the job
+    """
+    with session_scope() as session:
+        result = session.execute(
+            update(Job)
+            .where(Job.job_id == job_id, Job.status.in_(UNSTARTED_STATUSES), Job.claimed_by.is_(None))
+            .values(status="started", claimed_by=owner)
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount == 1
+
+
+def heartbeat(worker_id, job_ids):
+    """Record that worker_id is still running job_ids"""
+    if not job_ids:
+        return
+    with session_scope() as session:
+        session.execute(
+            update(Job)
+            .where(Job.job_id.in_(list(job_ids)), Job.claimed_by == worker_id)
+            .values(heartbeat_at=_now())
+            .execution_options(synchronize_session=False)
+        )
+
+
+def release_jobs(worker_id, job_ids):
+    """Put jobs a stopping worker didn't finish back on the queue (their finished items are kept)"""
+    if not job_ids:
+        return 0
+    with session_scope() as session:
+        result = session.execute(
+            update(Job)
+            .where(Job.job_id.in_(list(job_ids)), Job.claimed_by == worker_id, Job.status.in_(CLAIMED_STATUSES))
+            .values(status="queued", claimed_by=None, heartbeat_at=None)
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount
+
+
+def requeue_stale_jobs(stale_after_sec):
+    """
+    Requeue running jobs whose worker hasn't sent a heartbeat for stale_after_sec
+    (it crashed or was killed). Jobs run inline by a web process send no heartbeats,
+    so they're left alone.
+
+    Returns:
+        Number of jobs requeued
+    """
+    cutoff = _now() - datetime.timedelta(seconds=stale_after_sec)
+    with session_scope() as session:
+        result = session.execute(
+            update(Job)
+            .where(Job.status.in_(CLAIMED_STATUSES), Job.claimed_by.isnot(None), Job.heartbeat_at < cutoff)
+            .values(status="queued", claimed_by=None, heartbeat_at=None)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount:
+            logger.warning(f"Requeued {result.rowcount} job(s) from unresponsive workers")
+        return result.rowcount
@@ -1,24 +1,24 @@
+import asyncio
 import copy
+import itertools
 import json
 import logging
 import time
 from contextlib import contextmanager
 from typing import Any, Dict, Optional
 
-import requests
+from flask import current_app, has_app_context
 from flask_sse import sse
-from groq import APIError, Groq
 from sqlalchemy.orm import scoped_session, sessionmaker
 
 from app import session_scope
 from app.models import Model, Prompt, Provider, Question, Response, Story
+from app.services import circuit_breaker, providers, rate_limiter, response_cache_service, retry_policy
+from app.services.metadata_cache import rate_limits_for
 from config import Config
 
 logger = logging.getLogger(__name__)
 
-GROQ_API_KEY = Config.GROQ_API_KEY
-groq_client = Groq(api_key=GROQ_API_KEY)
-
 SYSTEM_DEFAULTS = Config.SYSTEM_DEFAULTS
 
 
@@ -86,35 +86,26 @@ def get_request_delay_by_model_id(model_id):
     with session_scope() as session:
         model = session.query(Model).get(model_id)
         return model.request_delay if model else 0
-    
-def _get_param(name: str, provided: dict) -> Any:
+
+def get_rate_limits_by_model_id(model_id):
     """
-    Hybrid parameter resolver that prioritizes caller-supplied values.    
-    Args:
-        name: Parameter name to retrieve
-        provided: Dictionary of provided parameters        
-    
-    Returns:
-        Parameter value from provided dict, or from defaults if missing
-        
-    Logs a warning when falling back to defaults.
+    Requests/tokens-per-minute budgets for a model. Models without an explicit
+    requests_per_minute fall back to the rate implied by their request_delay.
     """
-       
-    if name in provided:
-        return provided[name]
-    
-    # Check if we have a system default before trying to use it
-    if name not in SYSTEM_DEFAULTS:
-        logger.error(f"Parameter {name} not found in provided dict or SYSTEM_DEFAULTS")
-        raise KeyError(f"Parameter {name} not found")
-
-    # Loud but non-fatal signal.
-    logger.warning(
-        "Parameter %s missing from request; "
-        "falling back to SYSTEM_DEFAULTS[\"%s\"].default=%r",
-        name, name, SYSTEM_DEFAULTS[name]["default"],
-    )
-    return SYSTEM_DEFAULTS[name]["default"]
+    with session_scope() as session:
+        model = session.query(Model).get(model_id)
+        if not model:
+            return {"requests_per_minute": None, "tokens_per_minute": None}
+        return rate_limits_for(model.requests_per_minute, model.tokens_per_minute, model.request_delay)
+
+def get_max_concurrency_by_model_id(model_id):
+    with session_scope() as session:
+        model = session.query(Model).get(model_id)
+        return resolve_max_concurrency(model.max_concurrency if model else None)
+
+def resolve_max_concurrency(max_concurrency):
+    """A model's max_concurrency, or the configured default when it doesn't set one"""
+    return max(1, int(max_concurrency or Config.DEFAULT_MAX_CONCURRENCY))
 
 def apply_saved_parameters(model_parameters, saved_parameters):
     if not saved_parameters:
@@ -145,143 +136,440 @@ def apply_saved_parameters(model_parameters, saved_parameters):
                 logger.info(f"Failed to convert '{param_name}' value '{saved_parameters[param_name]}' to {param_details['type']}")
     return parameters
 
+def parse_sweep_values(spec, details):
+    """
+    Values to sweep one parameter over, from a comma separated list ("0, 0.5, 1") or
+    an inclusive range ("start:stop:step"), checked against the parameter's schema.
+
+    Raises:
+        ValueError: If the spec can't be parsed or a value is out of bounds
+    """
+    name = details.get("name", "parameter")
+    is_int = str(details.get("type")).lower() in ("int", "integer")
+    convert = int if is_int else float
+    try:
+        if ":" in spec:
+            start, stop, step = (convert(part) for part in spec.split(":"))
+            if step <= 0 or stop < start:
+                raise ValueError
+            count = int((stop - start) / step + 1e-9) + 1
+            values = [convert(round(start + i * step, 10)) for i in range(count)]
+        else:
+            values = [convert(part) for part in spec.split(",") if part.strip()]
+    except ValueError:
+        raise ValueError(f"Could not read sweep values for {name}: '{spec}'")
+    if not values:
+        raise ValueError(f"No sweep values given for {name}")
+    for value in values:
+        if not details["min_value"] <= value <= details["max_value"]:
+            raise ValueError(f"Sweep value {value} for {name} is outside {details['min_value']}–{details['max_value']}")
+    return list(dict.fromkeys(values))
+
+def expand_parameter_sweep(model_id, base_parameters, sweep, max_combinations=None):
+    """
+    Every combination of the swept parameters' values, each combined with
+    base_parameters for the parameters that aren't swept.
+
+    Args:
+        model_id: Model whose parameter schema the values are checked against
+        base_parameters: Parameter values shared by every combination
+        sweep: {parameter name: spec for parse_sweep_values}; blank specs are ignored
+        max_combinations: Largest grid allowed (default SWEEP_MAX_COMBINATIONS)
+
+    Returns:
+        A list of parameter dicts, one per grid point
+
+    Raises:
+        ValueError: For unknown parameters, bad specs or a grid that is too large
+    """
+    schema = get_model_parameters(model_id)
+    axes = {}
+    for name, spec in (sweep or {}).items():
+        if not str(spec).strip():
+            continue
+        if name not in schema:
+            raise ValueError(f"Model {model_id} has no parameter {name} to sweep")
+        axes[name] = parse_sweep_values(str(spec), dict(schema[name], name=name))
+
+    size = 1
+    for values in axes.values():
+        size *= len(values)
+    limit = max_combinations or Config.SWEEP_MAX_COMBINATIONS
+    if size > limit:
+        raise ValueError(f"The sweep has {size} combinations, more than the limit of {limit}")
+
+    return [
+        {**(base_parameters or {}), **dict(zip(axes, combination))}
+        for combination in itertools.product(*axes.values())
+    ]
+
 
 
 
-def call_llm(provider_name, story, question, story_id, question_id, model_name, model_id, prompt_id=None, run_id = None, **parameters):
+def _load_prompt_for_rerun(prompt_id):
+    """Story, question and the saved sampling parameters of an existing prompt"""
+    with session_scope() as session:
+        prompt_id = int(prompt_id) if not isinstance(prompt_id, int) else prompt_id
+        prompt = session.query(Prompt).filter_by(prompt_id=prompt_id).first()
+        if not prompt:
+            raise ValueError(f"Prompt ID {prompt_id} not found")
+
+        story = session.query(Story).get(prompt.story_id).content
+        question = session.query(Question).get(prompt.question_id).content
+        parameters = {
+            'temperature': prompt.temperature,
+            'max_tokens': prompt.max_tokens,
+            'top_p': prompt.top_p
+        }
+        return prompt_id, story, question, parameters
+
+def get_endpoint_by_model_id(model_id):
+    with session_scope() as session:
+        model = session.query(Model).get(model_id)
+        return model.endpoint if model else None
+
+def _resolve_endpoint(provider, model_id, endpoint):
+    """Providers that call the model's own endpoint look it up if the caller didn't pass it"""
+    if provider.requires_endpoint and not endpoint:
+        return get_endpoint_by_model_id(model_id)
+    return endpoint
+
+def call_llm(provider_name, story, question, story_id, question_id, model_name, model_id, prompt_id=None, run_id = None, use_cache=True, endpoint=None, **parameters):
     logger.info(f"LLM call: {provider_name}/{model_name} with story_id={story_id}, question_id={question_id}")
     logger.info(f"Parameters: {parameters}")
+    provider = providers.get_provider(provider_name)
 
-    if prompt_id:
-        with session_scope() as session:
-            prompt_id = int(prompt_id) if not isinstance(prompt_id, int) else prompt_id
-            prompt = session.query(Prompt).filter_by(prompt_id=prompt_id).first()
-            if not prompt:
-                raise ValueError(f"Prompt ID {prompt_id} not found")
-
-            story = session.query(Story).get(prompt.story_id).content
-            question = session.query(Question).get(prompt.question_id).content
-            parameters = {
-                'temperature': prompt.temperature,
-                'max_tokens': prompt.max_tokens,
-                'top_p': prompt.top_p
-            }
+    # Callers that prefetched the prompt's story and question pass them in; the
+    # response still belongs to the original prompt either way
+    if prompt_id and (story is None or question is None):
+        prompt_id, story, question, parameters = _load_prompt_for_rerun(prompt_id)
+
+    try:
+        payload, sampling = provider.build_payload(story, question, model_name, parameters)
+        endpoint = _resolve_endpoint(provider, model_id, endpoint)
 
-        if provider_name == "groq":
-            return call_LLM_GROQ(story, question, story_id, question_id, model_name, model_id, prompt_id=prompt_id, run_id=run_id, **parameters)
-        elif provider_name == "hf":
-            return call_LLM_HF(story, question, story_id, question_id, model_name, model_id, prompt_id=prompt_id, run_id=run_id, **parameters)
+        cache_key, cached = _lookup_cache(provider, payload, sampling, use_cache, endpoint)
+        if cached:
+            response_content = cached["response_content"]
+            full_response_json = cached["full_response"]
         else:
-            raise ValueError(f"Unknown provider: {provider_name}")
+            response_content, full_response_json = _call_with_retry(
+                provider.name, model_id, lambda: provider.complete(model_name, payload, endpoint)
+            )
+
+        return _complete_call(
+            provider.name, model_name, model_id, story_id, question_id, payload, sampling,
+            response_content, full_response_json, prompt_id, run_id,
+            cache_key=cache_key, cached=bool(cached)
+        )
+
+    except retry_policy.ProviderError as e:
+        return _provider_failure(e)
+    except Exception as e:
+        logger.exception(f"Unexpected error calling {provider.name}")
+        return None
+
+def _lookup_cache(provider, payload, sampling, use_cache, endpoint=None):
+    """
+    Returns (cache_key, cached_response). cache_key is None when the cache doesn't
+    apply to this call; cached_response is None on a miss.
+    """
+    if not response_cache_service.should_use_cache(sampling, use_cache):
+        return None, None
+    # The same model name on two servers is two different models
+    key_payload = dict(payload, endpoint=endpoint) if provider.requires_endpoint else payload
+    cache_key = response_cache_service.make_cache_key(provider.name, key_payload)
+    return cache_key, response_cache_service.get_cached_response(cache_key)
+
+def _config():
+    if has_app_context():
+        return current_app.config
+    return {name: getattr(Config, name) for name in dir(Config) if name.isupper()}
+
+def _retry_policy():
+    return retry_policy.RetryPolicy.from_config(_config())
+
+def get_provider_breaker(provider_name):
+    """The provider's circuit breaker, or None if breakers are turned off"""
+    config = _config()
+    if not config.get("CIRCUIT_BREAKER_ENABLED", True):
+        return None
+    return circuit_breaker.get_breaker(provider_name, config)
+
+def _check_breaker(breaker, provider_name):
+    if breaker is not None and not breaker.allow():
+        raise circuit_breaker.CircuitOpenError(provider_name, breaker.retry_in())
+
+def _record_health(breaker, error=None):
+    """Tell the breaker how a call went. Only signs the provider is down count as failures;
+    rejected requests and rate limits show it is up."""
+    if breaker is None:
+        return
+    if error is not None and error.retryable and not error.rate_limited:
+        breaker.record_failure()
     else:
-        if provider_name == "groq":
-            return call_LLM_GROQ(story, question, story_id, question_id, model_name, model_id, prompt_id=None, run_id = run_id, **parameters)
-        elif provider_name == "hf":
-            return call_LLM_HF(story, question, story_id, question_id, model_name, model_id, prompt_id=None, run_id = run_id, **parameters)
-        else:
-            raise ValueError(f"Unknown provider: {provider_name}")
+        breaker.record_success()
+
+def _on_retry(provider_name, model_id, attempt, error, delay):
+    """Log a retry; after a rate limit, hold back every caller of the model (and provider) too"""
+    logger.warning(f"{error} - retrying in {delay:.1f}s (attempt {attempt + 1})")
+    if not error.rate_limited:
+        return
+    config = _config()
+    limiters = rate_limiter.limiters_for_model(
+        model_id,
+        provider_name,
+        get_rate_limits_by_model_id(model_id),
+        provider_limits=providers.rate_limit_budgets(config.get("PROVIDER_RATE_LIMITS")),
+        burst_seconds=config.get("RATE_LIMIT_BURST_SECONDS", 1.0),
+    )
+    for limiter in limiters:
+        limiter.pause(delay)
 
-def call_LLM_GROQ(story, question, story_id, question_id, model_name, model_id, prompt_id=None, run_id = None, **parameters):
-    try:
-        logger.info(f"In llm_service, call_llm_GROQ (line 280) check on model_id:{model_id}")
-        temperature = float(_get_param("temperature", parameters))
-        max_tokens  = int(_get_param("max_tokens",  parameters))
-        top_p       = float(_get_param("top_p",      parameters))
-
-        payload = {
-            "model": model_name,
-            "messages": [
-                {"role": "user", "content": f"Read my story: {story} now respond to these queries about it: {question}"}
-            ],
-            "temperature": temperature,
-            "max_tokens": max_tokens,
-            "top_p": top_p,
-            "stream": False,
-            "stop": None
-        }
+def _call_with_retry(provider_name, model_id, send):
+    """
+    Return send(), retrying retryable failures per the retry policy.
 
-        for key, value in parameters.items():
-            if key not in payload:
-                payload[key] = value
-
-        completion = groq_client.chat.completions.create(**payload)
-        response_content = completion.choices[0].message.content
-        full_response_json = json.dumps(completion, default=lambda o: o.__dict__)
-        payload_json = json.dumps(payload)
-
-        response_id = save_prompt_and_response(
-            model_id=model_id,
-            temperature=temperature,
-            max_tokens=max_tokens,
-            top_p=top_p,
-            story_id=story_id,
-            question_id=question_id,
-            payload_json=payload_json,
-            response_content=response_content,
-            full_response_json=full_response_json,
-            prompt_id=prompt_id,
-            run_id=run_id
+    Raises:
+        retry_policy.ProviderError: once the call fails for good
+        circuit_breaker.CircuitOpenError: if the provider's breaker refuses the call
+    """
+    policy = _retry_policy()
+    breaker = get_provider_breaker(provider_name)
+    attempt = 1
+    while True:
+        _check_breaker(breaker, provider_name)
+        try:
+            result = send()
+        except Exception as e:
+            error = retry_policy.from_exception(provider_name, e)
+            _record_health(breaker, error)
+            if not policy.should_retry(attempt, error):
+                error.attempts = attempt
+                raise error from e
+            delay = policy.delay(attempt, error)
+            _on_retry(provider_name, model_id, attempt, error, delay)
+            time.sleep(delay)
+            attempt += 1
+        else:
+            _record_health(breaker)
+            return result
+
+async def _call_with_retry_async(provider_name, model_id, send):
+    """Async counterpart of _call_with_retry; send() returns an awaitable"""
+    policy = _retry_policy()
+    breaker = get_provider_breaker(provider_name)
+    attempt = 1
+    while True:
+        _check_breaker(breaker, provider_name)
+        try:
+            result = await send()
+        except Exception as e:
+            error = retry_policy.from_exception(provider_name, e)
+            _record_health(breaker, error)
+            if not policy.should_retry(attempt, error):
+                error.attempts = attempt
+                raise error from e
+            delay = policy.delay(attempt, error)
+            await asyncio.to_thread(_on_retry, provider_name, model_id, attempt, error, delay)
+            await asyncio.sleep(delay)
+            attempt += 1
+        else:
+            _record_health(breaker)
+            return result
+
+def _provider_failure(error):
+    """The result recorded for a call that failed for good, so the job shows why"""
+    attempts = getattr(error, "attempts", 1)
+    suffix = f" (after {attempts} attempts)" if attempts > 1 else ""
+    logger.error(f"{error}{suffix}")
+    if isinstance(error, circuit_breaker.CircuitOpenError):
+        # Not the item's fault: the job waits for the provider and tries it again
+        return {"error": str(error), "circuit_open": True}
+    return {"error": f"{error}{suffix}"}
+
+def _complete_call(provider_name, model_name, model_id, story_id, question_id, payload, sampling,
+                   response_content, full_response_json, prompt_id, run_id, cache_key=None, cached=False,
+                   defer_save=False):
+    """
+    Remember a fresh completion in the cache (if applicable) and persist the prompt/response.
+
+    With defer_save the prompt/response row is not written here; the returned dict carries
+    it as "record" (keyword arguments for save_prompt_and_response) for a batched writer.
+    """
+    payload_json = json.dumps(payload)
+    if cache_key and not cached:
+        response_cache_service.store_response(
+            cache_key, provider_name, model_name, payload_json, response_content, full_response_json
         )
 
-        return {"response_id": response_id, "response": response_content}
+    record = dict(
+        model_id=model_id,
+        story_id=story_id,
+        question_id=question_id,
+        payload_json=payload_json,
+        response_content=response_content,
+        full_response_json=full_response_json,
+        prompt_id=prompt_id,
+        run_id=run_id,
+        **sampling
+    )
+    if defer_save:
+        return {"record": record, "response": response_content, "cached": cached}
 
-    except APIError as e:
-        logger.error(f"Groq API Error: {e.status_code} - {e.json_body}")
-        return None
-    except Exception as e:
-        logger.exception("Unexpected error in call_LLM_GROQ")
-        return None
+    response_id = save_prompt_and_response(**record)
+    return {"response_id": response_id, "response": response_content, "cached": cached}
+
+async def close_async_clients():
+    """Close the pooled provider clients belonging to the running event loop"""
+    await providers.close_async_clients()
+
+async def call_llm_async(provider_name, story, question, story_id, question_id, model_name, model_id, prompt_id=None, run_id=None, use_cache=True, defer_save=False, on_token=None, endpoint=None, **parameters):
+    """
+    Async counterpart of call_llm; must be awaited inside an app context.
+
+    With defer_save the prompt/response is returned as a "record" for the caller to
+    write in bulk (see ResponseWriter) instead of being saved straight away.
+
+    With on_token the completion is streamed from the provider and on_token(text) is
+    called with the text received so far as it grows ("" again if the call is retried).
+    The final content is saved exactly as for a non-streamed call.
+    """
+    logger.info(f"Async LLM call: {provider_name}/{model_name} with story_id={story_id}, question_id={question_id}")
+    provider = providers.get_provider(provider_name)
+
+    # Callers that prefetched the prompt's story and question pass them in; the
+    # response still belongs to the original prompt either way
+    if prompt_id and (story is None or question is None):
+        prompt_id, story, question, parameters = _load_prompt_for_rerun(prompt_id)
 
-def call_LLM_HF(story, question, story_id, question_id, model_name, model_id, prompt_id=None, run_id = None, **parameters):
     try:
-        temperature = float(_get_param("temperature", parameters))
-        max_tokens  = int(_get_param("max_tokens",  parameters))
-        top_p       = float(_get_param("top_p",      parameters))
-        payload = {
-            "inputs": f"Read my story: {story} now respond to these queries about it: {question}",
-            "parameters": {
-                "temperature": temperature,
-                "max_new_tokens": max_tokens,
-                "top_p": top_p
-            }
-        }
+        payload, sampling = provider.build_payload(story, question, model_name, parameters)
+        if provider.requires_endpoint and not endpoint:
+            endpoint = await asyncio.to_thread(get_endpoint_by_model_id, model_id)
+
+        # SQLite reads/writes stay synchronous; to_thread keeps them off the event loop
+        # (and carries the app context across with the copied contextvars)
+        cache_key, cached = await asyncio.to_thread(_lookup_cache, provider, payload, sampling, use_cache, endpoint)
+        if cached:
+            response_content = cached["response_content"]
+            full_response_json = cached["full_response"]
+        elif on_token is not None:
+            response_content, full_response_json = await _call_with_retry_async(
+                provider.name, model_id, lambda: provider.stream_async(model_name, payload, on_token, endpoint)
+            )
+        else:
+            response_content, full_response_json = await _call_with_retry_async(
+                provider.name, model_id, lambda: provider.complete_async(model_name, payload, endpoint)
+            )
 
-        for key, value in parameters.items():
-            if key not in ['temperature', 'max_tokens', 'top_p']:
-                payload["parameters"][key] = value
-
-        url = f"https://api.huggingface.co/models/{model_name}/generate"
-        headers = {"Authorization": f"Bearer {Config.HF_API_KEY}"}
-        response = requests.post(url, headers=headers, json=payload)
-
-        if response.status_code != 200:
-            logger.error(f"HF API error: {response.status_code} - {response.text}")
-            return None
-
-        response_json = response.json()
-        response_content = response_json.get("generated_text", "")
-        full_response_json = json.dumps(response_json)
-
-        response_id = save_prompt_and_response(
-            model_id=model_id,
-            temperature=temperature,
-            max_tokens=max_tokens,
-            top_p=top_p,
-            story_id=story_id,
-            question_id=question_id,
-            payload_json=json.dumps(payload),
-            response_content=response_content,
-            full_response_json=full_response_json,
-            prompt_id=prompt_id,
-            run_id=run_id
+        return await asyncio.to_thread(
+            _complete_call,
+            provider.name, model_name, model_id, story_id, question_id, payload, sampling,
+            response_content, full_response_json, prompt_id, run_id,
+            cache_key=cache_key, cached=bool(cached), defer_save=defer_save
         )
 
-        return {"response_id": response_id, "response": response_content}
-
+    except retry_policy.ProviderError as e:
+        return _provider_failure(e)
     except Exception as e:
-        logger.exception("Unexpected error calling HF")
+        logger.exception(f"Unexpected error calling {provider.name} (async)")
         return None
 
+async def call_llm_batch_async(provider_name, items, model_name, model_id, run_id=None, use_cache=True, endpoint=None,
+                               batch_id=None, on_submitted=None, is_active=None, poll_interval=None, **parameters):
+    """
+    Send a whole job as one provider batch (upload, poll, download); must be awaited
+    inside an app context.
+
+    Args:
+        items: {key: (story_id, question_id, story, question)}
+        batch_id: A batch already submitted for these items, to wait for instead of
+            submitting a new one (a job picked up again after its worker stopped)
+        on_submitted: Called with the new batch id once the provider has accepted it
+        is_active: Polled while waiting; once it returns False the batch is cancelled
+        poll_interval: Seconds between status checks (PROVIDER_BATCH_POLL_INTERVAL_SEC)
+
+    Returns:
+        {key: result} for the items that finished, each shaped like call_llm_async's
+        defer_save result ("record" for a ResponseWriter) or {"error": ...}. Items
+        answered from the cache aren't sent. Nothing is returned for items left
+        unanswered by a cancelled job.
+    """
+    provider = providers.get_provider(provider_name)
+    if not provider.supports_batch_api:
+        raise ValueError(f"Provider {provider.name} has no batch API")
+    if provider.requires_endpoint and not endpoint:
+        endpoint = await asyncio.to_thread(get_endpoint_by_model_id, model_id)
+    if poll_interval is None:
+        poll_interval = _config().get("PROVIDER_BATCH_POLL_INTERVAL_SEC", 30)
+
+    results = {}
+    pending = {}  # custom_id -> (key, story_id, question_id, payload, sampling, cache_key)
+    for key, (story_id, question_id, story, question) in items.items():
+        payload, sampling = provider.build_payload(story, question, model_name, parameters)
+        cache_key, cached = await asyncio.to_thread(_lookup_cache, provider, payload, sampling, use_cache, endpoint)
+        if cached:
+            results[key] = await asyncio.to_thread(
+                _complete_call,
+                provider.name, model_name, model_id, story_id, question_id, payload, sampling,
+                cached["response_content"], cached["full_response"], None, run_id,
+                cache_key=cache_key, cached=True, defer_save=True
+            )
+        else:
+            pending[str(key)] = (key, story_id, question_id, payload, sampling, cache_key)
+    if not pending:
+        return results
+
+    try:
+        if batch_id is None:
+            batch_id = await _call_with_retry_async(
+                provider.name, model_id,
+                lambda: provider.submit_batch(model_name, {custom_id: p[3] for custom_id, p in pending.items()}, endpoint)
+            )
+            logger.info(f"Submitted {len(pending)} requests to {provider.name} as batch {batch_id}")
+            if on_submitted is not None:
+                on_submitted(batch_id)
+
+        while True:
+            state = await _call_with_retry_async(provider.name, model_id, lambda: provider.get_batch(batch_id, endpoint))
+            if state["done"]:
+                break
+            if is_active is not None and not is_active():
+                logger.info(f"Cancelling {provider.name} batch {batch_id}")
+                try:
+                    await provider.cancel_batch(batch_id, endpoint)
+                except Exception:
+                    logger.exception(f"Could not cancel {provider.name} batch {batch_id}")
+                return results
+            logger.info(f"{provider.name} batch {batch_id} {state['status']}: "
+                        f"{state['completed']}/{state['total']} done, {state['failed']} failed")
+            await asyncio.sleep(poll_interval)
+
+        outcomes = await _call_with_retry_async(
+            provider.name, model_id, lambda: provider.fetch_batch_results(batch_id, endpoint)
+        )
+    except retry_policy.ProviderError as e:
+        failure = _provider_failure(e)
+        results.update((key, failure) for key, *_ in pending.values())
+        return results
+
+    logger.info(f"{provider.name} batch {batch_id} {state['status']} with {len(outcomes)} results")
+    for custom_id, (key, story_id, question_id, payload, sampling, cache_key) in pending.items():
+        outcome = outcomes.get(custom_id)
+        if outcome is None:
+            results[key] = {"error": f"{provider.name} batch {batch_id} ended {state['status']} without running this item"}
+        elif isinstance(outcome, Exception):
+            results[key] = _provider_failure(outcome)
+        else:
+            response_content, full_response_json = outcome
+            results[key] = await asyncio.to_thread(
+                _complete_call,
+                provider.name, model_name, model_id, story_id, question_id, payload, sampling,
+                response_content, full_response_json, None, run_id,
+                cache_key=cache_key, cached=False, defer_save=True
+            )
+    return results
 
 
 def save_prompt_and_response(model_id, temperature, max_tokens, top_p, story_id, question_id, 
@@ -314,4 +602,49 @@ def save_prompt_and_response(model_id, temperature, max_tokens, top_p, story_id,
         )
         session.add(response_entry)
         session.commit()
-        return response_entry.response_id
\ No newline at end of file
+        return response_entry.response_id
+
+
+def save_prompts_and_responses(records):
+    """
+    Persist many prompt/response pairs in a single transaction.
+
+    Args:
+        records: Dicts of save_prompt_and_response keyword arguments
+
+    Returns:
+        The new response_ids, in the same order as records
+    """
+    with session_scope() as session:
+        new_prompts = {}
+        for index, record in enumerate(records):
+            if record["prompt_id"] is None:
+                new_prompts[index] = Prompt(
+                    model_id=record["model_id"],
+                    temperature=record["temperature"],
+                    max_tokens=record["max_tokens"],
+                    top_p=record["top_p"],
+                    story_id=record["story_id"],
+                    question_id=record["question_id"],
+                    payload=record["payload_json"]
+                )
+        # One flush per table lets SQLAlchemy batch the INSERTs and hand back the new keys
+        session.add_all(new_prompts.values())
+        session.flush()
+
+        responses = []
+        for index, record in enumerate(records):
+            if index in new_prompts:
+                prompt_id = new_prompts[index].prompt_id
+            else:
+                prompt_id = int(record["prompt_id"])
+            responses.append(Response(
+                prompt_id=prompt_id,
+                response_content=record["response_content"],
+                full_response=record["full_response_json"],
+                run_id=record["run_id"],
+            ))
+        session.add_all(responses)
+        session.flush()
+        logger.info(f"Saved {len(responses)} prompt/response pairs in one transaction")
+        return [response.response_id for response in responses]
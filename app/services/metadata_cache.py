@@ -0,0 +1,134 @@
+import logging
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload
+
+from app import session_scope
+from app.models import Model, Question, Story
+from app.services import providers
+
+logger = logging.getLogger(__name__)
+
+
+def rate_limits_for(requests_per_minute, tokens_per_minute, request_delay):
+    """
+    Requests/tokens-per-minute budgets for a model. Models without an explicit
+    requests_per_minute fall back to the rate implied by their request_delay.
+    """
+    if not requests_per_minute and request_delay and request_delay > 0:
+        requests_per_minute = 60.0 / request_delay
+    return {"requests_per_minute": requests_per_minute, "tokens_per_minute": tokens_per_minute}
+
+
+@dataclass(frozen=True)
+class ModelInfo:
+    model_id: int
+    name: str
+    provider_name: str
+    request_delay: float
+    max_concurrency: Optional[int]
+    requests_per_minute: Optional[float]
+    tokens_per_minute: Optional[int]
+    endpoint: Optional[str] = None
+
+    @property
+    def rate_limits(self) -> Dict:
+        return rate_limits_for(self.requests_per_minute, self.tokens_per_minute, self.request_delay)
+
+
+@dataclass(frozen=True)
+class QuestionInfo:
+    question_id: int
+    content: str
+
+
+class MetadataCache:
+    """
+    Model/provider/question metadata and story texts for one job, each loaded at most once.
+
+    A job resolves what it needs up front instead of re-reading the same rows for
+    every item. Edits made while the job runs apply from the next job on.
+    """
+
+    def __init__(self):
+        self._models: Dict[int, Optional[ModelInfo]] = {}
+        self._questions: Dict[int, Optional[QuestionInfo]] = {}
+        self._stories: Dict[int, Optional[str]] = {}
+
+    def load(self, model_ids: Iterable[int] = (), question_ids: Iterable[int] = ()) -> "MetadataCache":
+        """Load any of model_ids / question_ids not cached yet, in a single session"""
+        model_ids = {int(i) for i in model_ids if i is not None} - self._models.keys()
+        question_ids = {int(i) for i in question_ids if i is not None} - self._questions.keys()
+        if not model_ids and not question_ids:
+            return self
+
+        with session_scope() as session:
+            if model_ids:
+                models = session.execute(
+                    select(Model).options(joinedload(Model.provider)).where(Model.model_id.in_(model_ids))
+                ).scalars().all()
+                for model in models:
+                    self._models[model.model_id] = ModelInfo(
+                        model_id=model.model_id,
+                        name=model.name,
+                        # Registered name, so "Groq" and "groq" share one breaker and budget
+                        provider_name=providers.canonical_name(model.provider.provider_name),
+                        request_delay=model.request_delay or 0,
+                        max_concurrency=model.max_concurrency,
+                        requests_per_minute=model.requests_per_minute,
+                        tokens_per_minute=model.tokens_per_minute,
+                        endpoint=model.endpoint,
+                    )
+            if question_ids:
+                questions = session.execute(
+                    select(Question).where(Question.question_id.in_(question_ids))
+                ).scalars().all()
+                for question in questions:
+                    self._questions[question.question_id] = QuestionInfo(question.question_id, question.content)
+
+        # Remember misses too, so a deleted row isn't looked up again for every item
+        for model_id in model_ids:
+            self._models.setdefault(model_id, None)
+        for question_id in question_ids:
+            self._questions.setdefault(question_id, None)
+        return self
+
+    def model(self, model_id: int) -> Optional[ModelInfo]:
+        if model_id is None:
+            return None
+        if int(model_id) not in self._models:
+            self.load(model_ids=[model_id])
+        return self._models[int(model_id)]
+
+    def question(self, question_id: int) -> Optional[QuestionInfo]:
+        if question_id is None:
+            return None
+        if int(question_id) not in self._questions:
+            self.load(question_ids=[question_id])
+        return self._questions[int(question_id)]
+
+    def load_stories(self, story_ids: Iterable[int], chunk_size: int = 500) -> "MetadataCache":
+        """Load the text of every story in story_ids not cached yet, chunk_size ids per IN query"""
+        missing = sorted({int(i) for i in story_ids if i is not None} - self._stories.keys())
+        if not missing:
+            return self
+        chunk_size = max(1, int(chunk_size))
+        with session_scope() as session:
+            for start in range(0, len(missing), chunk_size):
+                chunk = missing[start:start + chunk_size]
+                rows = session.execute(select(Story.story_id, Story.content).where(Story.story_id.in_(chunk)))
+                self._stories.update((story_id, content) for story_id, content in rows)
+        for story_id in missing:
+            self._stories.setdefault(story_id, None)
+        logger.debug(f"Prefetched {len(missing)} stories in {-(-len(missing) // chunk_size)} queries")
+        return self
+
+    def story(self, story_id: int) -> Optional[str]:
+        """The story's text, or None if it doesn't exist"""
+        if story_id is None:
+            return None
+        if int(story_id) not in self._stories:
+            self.load_stories([story_id])
+        return self._stories[int(story_id)]
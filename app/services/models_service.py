@@ -8,6 +8,7 @@ from sqlalchemy.exc import SQLAlchemyError
 
 from app import db, session_scope
 from app.models import Model, Provider
+from app.services import providers
 from config import Config
 
 
@@ -43,6 +44,9 @@ def get_all_models() -> List[Dict[str, Any]]:
             'provider': provider_name,
             'endpoint': model.endpoint,
             'request_delay': model.request_delay,
+            'max_concurrency': model.max_concurrency,
+            'requests_per_minute': model.requests_per_minute,
+            'tokens_per_minute': model.tokens_per_minute,
             'parameters': parameters,  # Include parsed parameters
             'raw_parameters': model.parameters  # Include raw JSON string 
         }
@@ -110,7 +114,10 @@ def create_model(
     provider_id: str, 
     endpoint: str, 
     request_delay: float,
-    parameters: List[Dict[str, Any]]
+    parameters: List[Dict[str, Any]],
+    max_concurrency: Optional[int] = None,
+    requests_per_minute: Optional[float] = None,
+    tokens_per_minute: Optional[int] = None
 ) -> Model:
     """
     Create a new model in the database.
@@ -121,6 +128,9 @@ def create_model(
         endpoint: API endpoint URL
         request_delay: Delay between requests
         parameters: List of parameter configurations
+        max_concurrency: Maximum in-flight calls per job (None uses the configured default)
+        requests_per_minute: Shared request budget (None falls back to request_delay)
+        tokens_per_minute: Shared token budget (None means unlimited)
         
     Returns:
         The newly created Model object
@@ -137,7 +147,10 @@ def create_model(
             provider_id=provider_id,
             endpoint=endpoint,
             request_delay=request_delay,
-            parameters=parameters_json
+            parameters=parameters_json,
+            max_concurrency=max_concurrency,
+            requests_per_minute=requests_per_minute,
+            tokens_per_minute=tokens_per_minute
         )
         
         session.add(model)
@@ -156,7 +169,10 @@ def update_model(
     provider_id: str, 
     endpoint: str, 
     request_delay: float,
-    parameters: List[Dict[str, Any]]
+    parameters: List[Dict[str, Any]],
+    max_concurrency: Optional[int] = None,
+    requests_per_minute: Optional[float] = None,
+    tokens_per_minute: Optional[int] = None
 ) -> Dict[str, Any]:
     """
     Update an existing model in the database.
@@ -168,6 +184,9 @@ def update_model(
         endpoint: New API endpoint URL
         request_delay: New delay between requests
         parameters: New list of parameter configurations
+        max_concurrency: New maximum in-flight calls per job (None uses the configured default)
+        requests_per_minute: New shared request budget (None falls back to request_delay)
+        tokens_per_minute: New shared token budget (None means unlimited)
         
     Returns:
         The id and the name of the updated model
@@ -188,6 +207,9 @@ def update_model(
         model.endpoint = endpoint
         model.request_delay = request_delay
         model.parameters = parameters_json
+        model.max_concurrency = max_concurrency
+        model.requests_per_minute = requests_per_minute
+        model.tokens_per_minute = tokens_per_minute
         
         # The commit is handled by the session_scope context manager
         model_name = model.name
@@ -285,17 +307,22 @@ def process_parameter_form_data(form_data) -> List[Dict[str, Any]]:
     return parameters
 
 
-def ensure_groq_provider():
+def ensure_groq_provider() -> int:
     """
-    Ensure that the Groq provider exists in the database.
+    Ensure that a Groq provider exists in the database.
+
+    Any spelling the provider registry maps to Groq ("groq", "Groq") counts.
+
+    Returns:
+        The Groq provider's ID
     """
     with session_scope() as session:
-        provider = session.query(Provider).filter_by(provider_name="Groq").first()
+        provider = next(
+            (p for p in session.query(Provider).all() if providers.canonical_name(p.provider_name) == "groq"),
+            None
+        )
         if not provider:
-            provider = Provider(
-                provider_name="Groq",
-                api_type="rest",
-                api_base="https://api.groq.com/openai/v1", 
-                description="Provider for Groq LLM API"
-            )
-            session.add(provider)
\ No newline at end of file
+            provider = Provider(provider_name="groq")
+            session.add(provider)
+            session.flush()
+        return provider.provider_id
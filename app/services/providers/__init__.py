@@ -0,0 +1,144 @@
+"""
+LLM provider registry.
+
+A model's Provider.provider_name selects the LLMProvider that serves it. Names are
+matched case-insensitively against each provider's name and aliases, so the seeded
+"groq"/"huggingface" rows and older "Groq"/"hf" rows all resolve.
+
+Built-in providers are registered below. Others can be registered in code with
+register_provider, or shipped as a package exposing an entry point in the
+"automated_prompting.providers" group that points at an LLMProvider subclass (or
+instance):
+
+    [project.entry-points."automated_prompting.providers"]
+    my_provider = "my_package.providers:MyProvider"
+"""
+import logging
+import threading
+from importlib.metadata import entry_points
+from typing import Dict, List, Optional
+
+from app.services.providers.base import LLMProvider, close_async_clients
+from app.services.providers.groq import GroqProvider
+from app.services.providers.huggingface import HuggingFaceProvider
+from app.services.providers.mock import MockProvider
+from app.services.providers.openai_compatible import OpenAICompatibleProvider
+
+logger = logging.getLogger(__name__)
+
+ENTRY_POINT_GROUP = "automated_prompting.providers"
+
+_providers: Dict[str, LLMProvider] = {}  # canonical name -> provider
+_names: Dict[str, str] = {}  # lower-cased name or alias -> canonical name
+_lock = threading.Lock()
+_entry_points_loaded = False
+
+
+def _key(name: str) -> str:
+    return str(name).strip().lower()
+
+
+def register_provider(provider, replace: bool = False) -> LLMProvider:
+    """
+    Register an LLMProvider (an instance, or a class to instantiate) under its name
+    and aliases. Registering a name that is taken raises ValueError unless replace=True.
+    """
+    if isinstance(provider, type):
+        provider = provider()
+    if not isinstance(provider, LLMProvider) or not provider.name:
+        raise ValueError(f"Not a named LLMProvider: {provider!r}")
+
+    keys = {_key(provider.name), *(_key(alias) for alias in provider.aliases)}
+    with _lock:
+        taken = {key for key in keys if key in _names and _names[key] != provider.name}
+        if taken and not replace:
+            raise ValueError(f"Provider name already registered: {', '.join(sorted(taken))}")
+        _providers[provider.name] = provider
+        for key in keys:
+            _names[key] = provider.name
+    return provider
+
+
+def unregister_provider(name: str) -> None:
+    """Remove a provider and its aliases (used by tests)"""
+    with _lock:
+        canonical = _names.get(_key(name))
+        _providers.pop(canonical, None)
+        for key in [key for key, value in _names.items() if value == canonical]:
+            del _names[key]
+
+
+def _load_entry_points() -> None:
+    """Register providers advertised by installed packages, once"""
+    global _entry_points_loaded
+    if _entry_points_loaded:
+        return
+    _entry_points_loaded = True
+    for entry_point in entry_points(group=ENTRY_POINT_GROUP):
+        try:
+            register_provider(entry_point.load())
+            logger.info(f"Registered LLM provider from entry point {entry_point.name}")
+        except Exception:
+            logger.exception(f"Could not load LLM provider entry point {entry_point.name}")
+
+
+def find_provider(name: Optional[str]) -> Optional[LLMProvider]:
+    """The provider registered under name (or one of its aliases), or None"""
+    if not name:
+        return None
+    _load_entry_points()
+    canonical = _names.get(_key(name))
+    return _providers.get(canonical) if canonical else None
+
+
+def get_provider(name: Optional[str]) -> LLMProvider:
+    """
+    The provider registered under name (or one of its aliases).
+
+    Raises:
+        ValueError: if no provider is registered under that name
+    """
+    provider = find_provider(name)
+    if provider is None:
+        raise ValueError(f"Unknown provider: {name}")
+    return provider
+
+
+def canonical_name(name: Optional[str]) -> Optional[str]:
+    """The registered name for name, or name itself if no provider claims it"""
+    provider = find_provider(name)
+    return provider.name if provider else name
+
+
+def provider_names() -> List[str]:
+    _load_entry_points()
+    return sorted(_providers)
+
+
+def rate_limit_budgets(configured: Optional[Dict] = None) -> Dict[str, Dict]:
+    """
+    Provider-wide rate limit budgets: each provider's rate_limit_hints, overridden
+    by any budget configured for it in PROVIDER_RATE_LIMITS.
+    """
+    _load_entry_points()
+    budgets = {name: dict(provider.rate_limit_hints) for name, provider in _providers.items()
+               if provider.rate_limit_hints}
+    for name, budget in (configured or {}).items():
+        budgets[canonical_name(name)] = budget
+    return budgets
+
+
+for _provider in (GroqProvider, HuggingFaceProvider, MockProvider, OpenAICompatibleProvider):
+    register_provider(_provider)
+
+__all__ = [
+    "LLMProvider",
+    "canonical_name",
+    "close_async_clients",
+    "find_provider",
+    "get_provider",
+    "provider_names",
+    "rate_limit_budgets",
+    "register_provider",
+    "unregister_provider",
+]
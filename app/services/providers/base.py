@@ -0,0 +1,181 @@
+import asyncio
+import logging
+import weakref
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+SYSTEM_DEFAULTS = Config.SYSTEM_DEFAULTS
+
+_async_clients = weakref.WeakKeyDictionary()  # event loop -> {provider name: client}
+
+
+def get_param(name: str, provided: dict) -> Any:
+    """
+    Hybrid parameter resolver that prioritizes caller-supplied values.
+    Args:
+        name: Parameter name to retrieve
+        provided: Dictionary of provided parameters
+
+    Returns:
+        Parameter value from provided dict, or from defaults if missing
+
+    Logs a warning when falling back to defaults.
+    """
+
+    if name in provided:
+        return provided[name]
+
+    # Check if we have a system default before trying to use it
+    if name not in SYSTEM_DEFAULTS:
+        logger.error(f"Parameter {name} not found in provided dict or SYSTEM_DEFAULTS")
+        raise KeyError(f"Parameter {name} not found")
+
+    # Loud but non-fatal signal.
+    logger.warning(
+        "Parameter %s missing from request; "
+        "falling back to SYSTEM_DEFAULTS[\"%s\"].default=%r",
+        name, name, SYSTEM_DEFAULTS[name]["default"],
+    )
+    return SYSTEM_DEFAULTS[name]["default"]
+
+
+def resolve_sampling(parameters: dict) -> Dict[str, Any]:
+    """The sampling parameters every saved Prompt records"""
+    return {
+        "temperature": float(get_param("temperature", parameters)),
+        "max_tokens": int(get_param("max_tokens", parameters)),
+        "top_p": float(get_param("top_p", parameters)),
+    }
+
+
+def prompt_text(story: str, question: str) -> str:
+    return f"Read my story: {story} now respond to these queries about it: {question}"
+
+
+def new_http_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=Config.LLM_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=Config.LLM_HTTP_MAX_KEEPALIVE,
+        ),
+        timeout=Config.LLM_HTTP_TIMEOUT,
+    )
+
+
+async def close_async_clients():
+    """Close the pooled clients belonging to the running event loop"""
+    clients = _async_clients.pop(asyncio.get_running_loop(), {})
+    for name, client in clients.items():
+        try:
+            if isinstance(client, httpx.AsyncClient):
+                await client.aclose()
+            else:
+                await client.close()
+        except Exception:
+            logger.exception(f"Error closing async client for provider {name}")
+
+
+class LLMProvider:
+    """
+    One LLM backend, registered under `name` (and any `aliases`) and selected by a
+    model's Provider.provider_name.
+
+    Implementations turn a story/question into a request payload and send it. Caching,
+    retries, the circuit breaker, rate limiting and saving are handled by llm_service
+    for every provider alike, so implementations just raise on failure (ideally a
+    retry_policy.ProviderError, otherwise an exception retry_policy understands).
+
+    Capabilities:
+        supports_streaming: stream_async yields tokens as they arrive
+        supports_batch_api: implements submit_batch / get_batch / fetch_batch_results /
+            cancel_batch against the provider's batch endpoint
+        rate_limit_hints: default provider-wide budgets ({"requests_per_minute": ...,
+            "tokens_per_minute": ...}), used unless PROVIDER_RATE_LIMITS sets one
+        requires_endpoint: calls need the model's endpoint (Model.endpoint)
+    """
+
+    name: str = None
+    aliases: Tuple[str, ...] = ()
+    supports_streaming = False
+    supports_batch_api = False
+    rate_limit_hints: Dict[str, Any] = {}
+    requires_endpoint = False
+
+    def build_payload(self, story: str, question: str, model_name: str, parameters: dict) -> Tuple[dict, dict]:
+        """Returns (payload, sampling): the request body and the sampling parameters to save"""
+        raise NotImplementedError
+
+    def complete(self, model_name: str, payload: dict, endpoint: Optional[str] = None) -> Tuple[str, str]:
+        """Send payload to the model and return (response_content, full_response_json)"""
+        raise NotImplementedError
+
+    async def complete_async(self, model_name: str, payload: dict, endpoint: Optional[str] = None) -> Tuple[str, str]:
+        """Async complete; providers without an async client run complete in a thread"""
+        return await asyncio.to_thread(self.complete, model_name, payload, endpoint)
+
+    async def stream_async(self, model_name: str, payload: dict, on_token,
+                           endpoint: Optional[str] = None) -> Tuple[str, str]:
+        """
+        Like complete_async, calling on_token(text so far) as the response grows.
+        Providers that can't stream report the whole response at once.
+        """
+        on_token("")
+        content, full_response_json = await self.complete_async(model_name, payload, endpoint)
+        on_token(content)
+        return content, full_response_json
+
+    async def complete_batch_async(self, model_name: str, payloads: List[dict],
+                                   endpoint: Optional[str] = None) -> List:
+        """
+        Send many payloads as concurrent individual calls. Returns, in order,
+        (response_content, full_response_json) or the exception each call raised.
+        """
+        return await asyncio.gather(
+            *(self.complete_async(model_name, payload, endpoint) for payload in payloads), return_exceptions=True
+        )
+
+    # -- provider batch API (supports_batch_api): a whole job is submitted at once,
+    # polled until the provider has finished it, then downloaded
+
+    async def submit_batch(self, model_name: str, requests: Dict[str, dict], endpoint: Optional[str] = None) -> str:
+        """Submit {custom_id: payload} as one batch. Returns the provider's batch id."""
+        raise NotImplementedError(f"{self.name} has no batch API")
+
+    async def get_batch(self, batch_id: str, endpoint: Optional[str] = None) -> Dict[str, Any]:
+        """The batch's state: {"status", "done", "total", "completed", "failed"}"""
+        raise NotImplementedError(f"{self.name} has no batch API")
+
+    async def fetch_batch_results(self, batch_id: str, endpoint: Optional[str] = None) -> Dict[str, Any]:
+        """
+        A finished batch's results: {custom_id: (response_content, full_response_json)
+        or the ProviderError that item failed with}. Items the provider never ran
+        (e.g. the batch expired) are missing.
+        """
+        raise NotImplementedError(f"{self.name} has no batch API")
+
+    async def cancel_batch(self, batch_id: str, endpoint: Optional[str] = None) -> None:
+        raise NotImplementedError(f"{self.name} has no batch API")
+
+    # -- client pooling: one client per provider (and purpose) per event loop (an httpx
+    # client can't be shared across loops), so concurrent calls reuse keep-alive connections
+
+    def new_async_client(self, purpose: Optional[str] = None):
+        return new_http_client()
+
+    def async_client(self, purpose: Optional[str] = None):
+        """This provider's pooled async client on the running event loop"""
+        key = self.name if purpose is None else f"{self.name}:{purpose}"
+        clients = _async_clients.setdefault(asyncio.get_running_loop(), {})
+        client = clients.get(key)
+        if client is None:
+            client = clients[key] = self.new_async_client(purpose)
+            logger.info(f"Opened pooled async client {key}")
+        return client
+
+    def __repr__(self):
+        return f"<{type(self).__name__} {self.name}>"
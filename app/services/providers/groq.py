@@ -0,0 +1,86 @@
+import json
+
+from groq import AsyncGroq, Groq
+
+from app.services.providers import base
+from app.services.providers.openai_batch import OpenAIBatchMixin
+from config import Config
+
+
+class GroqProvider(OpenAIBatchMixin, base.LLMProvider):
+    """Groq's OpenAI-style chat completions and batch APIs"""
+
+    name = "groq"
+    supports_streaming = True
+    batch_base_url = "https://api.groq.com/openai/v1"
+
+    def __init__(self, api_key=None):
+        self.api_key = api_key or Config.GROQ_API_KEY
+        self._client = None
+
+    def build_payload(self, story, question, model_name, parameters):
+        sampling = base.resolve_sampling(parameters)
+        payload = {
+            "model": model_name,
+            "messages": [
+                {"role": "user", "content": base.prompt_text(story, question)}
+            ],
+            "temperature": sampling["temperature"],
+            "max_tokens": sampling["max_tokens"],
+            "top_p": sampling["top_p"],
+            "stream": False,
+            "stop": None
+        }
+
+        for key, value in parameters.items():
+            if key not in payload:
+                payload[key] = value
+
+        return payload, sampling
+
+    @property
+    def client(self):
+        # Retries are handled by llm_service (so they can back off the shared rate limiter)
+        if self._client is None:
+            self._client = Groq(api_key=self.api_key, max_retries=0)
+        return self._client
+
+    def new_async_client(self, purpose=None):
+        if purpose == "batch":
+            return base.new_http_client()
+        return AsyncGroq(api_key=self.api_key, http_client=base.new_http_client(), max_retries=0)
+
+    def batch_headers(self):
+        return {"Authorization": f"Bearer {self.api_key}"}
+
+    def complete(self, model_name, payload, endpoint=None):
+        completion = self.client.chat.completions.create(**payload)
+        return completion.choices[0].message.content, json.dumps(completion, default=lambda o: o.__dict__)
+
+    async def complete_async(self, model_name, payload, endpoint=None):
+        completion = await self.async_client().chat.completions.create(**payload)
+        return completion.choices[0].message.content, json.dumps(completion, default=lambda o: o.__dict__)
+
+    async def stream_async(self, model_name, payload, on_token, endpoint=None):
+        stream = await self.async_client().chat.completions.create(**dict(payload, stream=True))
+        on_token("")
+        parts = []
+        last_chunk = None
+        async for chunk in stream:
+            last_chunk = chunk
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                parts.append(delta)
+                on_token("".join(parts))
+        content = "".join(parts)
+
+        # Shaped like a non-streamed completion so saved responses look the same either way
+        full_response = {"choices": [{"index": 0, "message": {"role": "assistant", "content": content}}], "stream": True}
+        if last_chunk is not None:
+            full_response.update(id=last_chunk.id, model=last_chunk.model, created=last_chunk.created)
+            if last_chunk.choices:
+                full_response["choices"][0]["finish_reason"] = last_chunk.choices[0].finish_reason
+            x_groq = getattr(last_chunk, "x_groq", None)
+            if x_groq is not None and getattr(x_groq, "usage", None) is not None:
+                full_response["usage"] = x_groq.usage
+        return content, json.dumps(full_response, default=lambda o: o.__dict__)
@@ -0,0 +1,88 @@
+import json
+
+import requests
+
+from app.services import retry_policy
+from app.services.providers import base
+from config import Config
+
+
+class HuggingFaceProvider(base.LLMProvider):
+    """Hugging Face text-generation endpoints (generate / generate_stream)"""
+
+    name = "hf"
+    aliases = ("huggingface", "hugging face")
+    supports_streaming = True
+
+    def __init__(self, api_key=None, base_url="https://api.huggingface.co/models"):
+        self.api_key = api_key
+        self.base_url = base_url
+        self._session = None
+
+    def build_payload(self, story, question, model_name, parameters):
+        sampling = base.resolve_sampling(parameters)
+        payload = {
+            "inputs": base.prompt_text(story, question),
+            "parameters": {
+                "temperature": sampling["temperature"],
+                "max_new_tokens": sampling["max_tokens"],
+                "top_p": sampling["top_p"]
+            }
+        }
+
+        for key, value in parameters.items():
+            if key not in ['temperature', 'max_tokens', 'top_p']:
+                payload["parameters"][key] = value
+
+        return payload, sampling
+
+    def url(self, model_name, stream=False):
+        return f"{self.base_url}/{model_name}/{'generate_stream' if stream else 'generate'}"
+
+    def headers(self):
+        return {"Authorization": f"Bearer {self.api_key or Config.HF_API_KEY}"}
+
+    @property
+    def session(self):
+        # Shared session so consecutive calls reuse the same keep-alive connection
+        if self._session is None:
+            self._session = requests.Session()
+        return self._session
+
+    def complete(self, model_name, payload, endpoint=None):
+        response = self.session.post(self.url(model_name), headers=self.headers(), json=payload)
+        if response.status_code != 200:
+            raise retry_policy.from_response(self.name, response.status_code, response.headers, response.text)
+        response_json = response.json()
+        return response_json.get("generated_text", ""), json.dumps(response_json)
+
+    async def complete_async(self, model_name, payload, endpoint=None):
+        response = await self.async_client().post(self.url(model_name), headers=self.headers(), json=payload)
+        if response.status_code != 200:
+            raise retry_policy.from_response(self.name, response.status_code, response.headers, response.text)
+        response_json = response.json()
+        return response_json.get("generated_text", ""), json.dumps(response_json)
+
+    async def stream_async(self, model_name, payload, on_token, endpoint=None):
+        """Server-sent events, one token per event, the last one carrying generated_text"""
+        async with self.async_client().stream(
+            "POST", self.url(model_name, stream=True), headers=self.headers(), json=payload
+        ) as response:
+            if response.status_code != 200:
+                body = (await response.aread()).decode(errors="replace")
+                raise retry_policy.from_response(self.name, response.status_code, response.headers, body)
+            on_token("")
+            parts = []
+            final_event = None
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                event = json.loads(line[len("data:"):])
+                token = event.get("token") or {}
+                if not token.get("special"):
+                    parts.append(token.get("text", ""))
+                    on_token("".join(parts))
+                if event.get("generated_text") is not None:
+                    final_event = event
+        content = final_event["generated_text"] if final_event else "".join(parts)
+        return content, json.dumps(final_event or {"generated_text": content})
@@ -0,0 +1,216 @@
+"""
+Offline provider that fakes completions, for load testing the pipeline without
+network access or API spend.
+
+A mock model is configured through its endpoint's query string, e.g.
+
+    mock://?latency_ms=300&latency_sigma=0.5&error_rate=0.02&rate_limit_rate=0.05&response_tokens=200&seed=7
+
+    latency_ms       median latency of a call (default 200)
+    latency_sigma    spread of the log-normal latency distribution; 0 = fixed (default 0.5)
+    error_rate       share of calls failing with a retryable 503 (default 0)
+    rate_limit_rate  share of calls answered with a 429 (default 0)
+    retry_after_sec  Retry-After sent with those 429s (default 1)
+    response_tokens  words in each completion, capped by max_tokens (default 100)
+    seed             changes every outcome below (default 0)
+
+It also fakes a batch API: a submitted batch finishes latency_ms after submission and
+each item then succeeds or fails as a single call would.
+
+Outcomes are deterministic: a call's latency, fault and text depend only on the
+seed, the payload and how many times that payload has been sent before, so a
+benchmark replays identically however its calls interleave.
+"""
+import asyncio
+import hashlib
+import json
+import math
+import random
+import itertools
+import threading
+import time
+from collections import Counter
+from urllib.parse import parse_qsl, urlsplit
+
+from app.services import retry_policy
+from app.services.providers import base
+
+DEFAULT_SETTINGS = {
+    "latency_ms": 200.0,
+    "latency_sigma": 0.5,
+    "error_rate": 0.0,
+    "rate_limit_rate": 0.0,
+    "retry_after_sec": 1.0,
+    "response_tokens": 100,
+    "seed": 0,
+}
+
+_WORDS = (
+    "the cat sat on a mat while story readers asked what happened next and why "
+    "it was quiet in the garden before rain fell over small houses near river"
+).split()
+
+
+def parse_settings(endpoint):
+    """DEFAULT_SETTINGS overridden by the query string of endpoint (unknown keys are ignored)"""
+    settings = dict(DEFAULT_SETTINGS)
+    if not endpoint:
+        return settings
+    query = urlsplit(endpoint).query if "?" in endpoint else endpoint
+    for key, value in parse_qsl(query):
+        if key in settings:
+            cast = int if isinstance(settings[key], int) else float
+            settings[key] = cast(float(value))
+    return settings
+
+
+class MockProvider(base.LLMProvider):
+    """Synthetic completions with configurable latency, error rate, 429s and size"""
+
+    name = "mock"
+    aliases = ("mock provider", "fake")
+    supports_streaming = True
+    supports_batch_api = True
+    requires_endpoint = True  # the settings live there
+
+    def __init__(self):
+        self._sent = Counter()  # payload digest -> times sent
+        self._batches = {}  # batch id -> {"requests", "endpoint", "ready_at", "status"}
+        self._batch_ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def reset(self):
+        """Forget how often each payload was sent and every batch (used by tests and benchmarks)"""
+        with self._lock:
+            self._sent.clear()
+            self._batches.clear()
+
+    def build_payload(self, story, question, model_name, parameters):
+        sampling = base.resolve_sampling(parameters)
+        payload = {
+            "model": model_name,
+            "messages": [
+                {"role": "user", "content": base.prompt_text(story, question)}
+            ],
+            "temperature": sampling["temperature"],
+            "max_tokens": sampling["max_tokens"],
+            "top_p": sampling["top_p"]
+        }
+
+        for key, value in parameters.items():
+            if key not in payload:
+                payload[key] = value
+
+        return payload, sampling
+
+    def _plan(self, payload, endpoint):
+        """Decide this call's latency (seconds), fault (an exception or None) and text"""
+        settings = parse_settings(endpoint)
+        digest = hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+        with self._lock:
+            attempt = self._sent[digest]
+            self._sent[digest] += 1
+        rng = random.Random(f"{settings['seed']}:{digest}:{attempt}")
+
+        latency = settings["latency_ms"] / 1000.0
+        if settings["latency_sigma"] > 0:
+            latency *= math.exp(rng.gauss(0, settings["latency_sigma"]))
+
+        roll = rng.random()
+        fault = None
+        if roll < settings["rate_limit_rate"]:
+            fault = retry_policy.ProviderError(
+                "mock provider error 429: rate limited", provider=self.name, status_code=429,
+                retryable=True, retry_after=settings["retry_after_sec"],
+            )
+        elif roll < settings["rate_limit_rate"] + settings["error_rate"]:
+            fault = retry_policy.ProviderError(
+                "mock provider error 503: injected failure", provider=self.name, status_code=503, retryable=True,
+            )
+
+        # The text depends on the payload alone, so retries and cache hits agree
+        text_rng = random.Random(f"{settings['seed']}:{digest}")
+        size = max(1, min(int(settings["response_tokens"]), int(payload.get("max_tokens") or 10**9)))
+        text = " ".join(text_rng.choice(_WORDS) for _ in range(size))
+        return latency, fault, text
+
+    def _response(self, payload, text, stream=False):
+        prompt = payload["messages"][0]["content"]
+        full_response = {
+            "id": f"mock-{hashlib.sha1(text.encode()).hexdigest()[:12]}",
+            "model": payload["model"],
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(text.split())},
+        }
+        if stream:
+            full_response["stream"] = True
+        return text, json.dumps(full_response)
+
+    def complete(self, model_name, payload, endpoint=None):
+        latency, fault, text = self._plan(payload, endpoint)
+        time.sleep(latency)
+        if fault is not None:
+            raise fault
+        return self._response(payload, text)
+
+    async def complete_async(self, model_name, payload, endpoint=None):
+        latency, fault, text = self._plan(payload, endpoint)
+        await asyncio.sleep(latency)
+        if fault is not None:
+            raise fault
+        return self._response(payload, text)
+
+    async def stream_async(self, model_name, payload, on_token, endpoint=None):
+        """Half the latency before the first token, the rest spread over the words"""
+        latency, fault, text = self._plan(payload, endpoint)
+        await asyncio.sleep(latency / 2)
+        if fault is not None:
+            raise fault
+        on_token("")
+        words = text.split(" ")
+        for i in range(len(words)):
+            await asyncio.sleep(latency / 2 / len(words))
+            on_token(" ".join(words[:i + 1]))
+        return self._response(payload, text, stream=True)
+
+    async def submit_batch(self, model_name, requests, endpoint=None):
+        settings = parse_settings(endpoint)
+        with self._lock:
+            batch_id = f"mock_batch_{next(self._batch_ids)}"
+            self._batches[batch_id] = {
+                "requests": dict(requests),
+                "ready_at": time.monotonic() + settings["latency_ms"] / 1000.0,
+                "status": "in_progress",
+            }
+        return batch_id
+
+    def _batch(self, batch_id):
+        batch = self._batches.get(batch_id)
+        if batch is None:
+            raise retry_policy.ProviderError(f"mock provider error 404: no batch {batch_id}", provider=self.name,
+                                             status_code=404)
+        if batch["status"] == "in_progress" and time.monotonic() >= batch["ready_at"]:
+            batch["status"] = "completed"
+        return batch
+
+    async def get_batch(self, batch_id, endpoint=None):
+        batch = self._batch(batch_id)
+        total = len(batch["requests"])
+        done = batch["status"] != "in_progress"
+        return {"status": batch["status"], "done": done, "total": total,
+                "completed": total if batch["status"] == "completed" else 0, "failed": 0}
+
+    async def fetch_batch_results(self, batch_id, endpoint=None):
+        batch = self._batch(batch_id)
+        if batch["status"] != "completed":
+            return {}
+        results = {}
+        for custom_id, payload in batch["requests"].items():
+            _, fault, text = self._plan(payload, endpoint)
+            results[custom_id] = fault if fault is not None else self._response(payload, text)
+        return results
+
+    async def cancel_batch(self, batch_id, endpoint=None):
+        batch = self._batch(batch_id)
+        if batch["status"] == "in_progress":
+            batch["status"] = "cancelled"
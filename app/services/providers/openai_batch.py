@@ -0,0 +1,89 @@
+import json
+
+from app.services import retry_policy
+
+# Batch states after which the provider won't run any more of the batch
+FINISHED_STATES = ("completed", "failed", "expired", "cancelled")
+
+
+class OpenAIBatchMixin:
+    """
+    The OpenAI-style batch API (as offered by Groq): the requests are uploaded as a
+    JSONL file, a batch is created from it, and once it has finished its output and
+    error files are downloaded. Providers set batch_base_url and batch_headers().
+    """
+
+    supports_batch_api = True
+    batch_base_url = None
+    completion_window = "24h"
+    batch_endpoint = "/v1/chat/completions"
+
+    def batch_headers(self):
+        return {}
+
+    async def _batch_request(self, method, path, **kwargs):
+        response = await self.async_client("batch").request(
+            method, f"{self.batch_base_url}{path}", headers=self.batch_headers(), **kwargs
+        )
+        if response.status_code != 200:
+            raise retry_policy.from_response(self.name, response.status_code, response.headers, response.text)
+        return response
+
+    async def submit_batch(self, model_name, requests, endpoint=None):
+        lines = "\n".join(
+            json.dumps({"custom_id": str(custom_id), "method": "POST", "url": self.batch_endpoint, "body": payload})
+            for custom_id, payload in requests.items()
+        )
+        upload = await self._batch_request(
+            "POST", "/files", data={"purpose": "batch"},
+            files={"file": ("batch.jsonl", lines.encode("utf-8"), "application/jsonl")},
+        )
+        batch = await self._batch_request("POST", "/batches", json={
+            "input_file_id": upload.json()["id"],
+            "endpoint": self.batch_endpoint,
+            "completion_window": self.completion_window,
+        })
+        return batch.json()["id"]
+
+    async def get_batch(self, batch_id, endpoint=None):
+        batch = (await self._batch_request("GET", f"/batches/{batch_id}")).json()
+        counts = batch.get("request_counts") or {}
+        return {
+            "status": batch.get("status"),
+            "done": batch.get("status") in FINISHED_STATES,
+            "total": counts.get("total", 0),
+            "completed": counts.get("completed", 0),
+            "failed": counts.get("failed", 0),
+            "output_file_id": batch.get("output_file_id"),
+            "error_file_id": batch.get("error_file_id"),
+        }
+
+    async def fetch_batch_results(self, batch_id, endpoint=None):
+        state = await self.get_batch(batch_id)
+        results = {}
+        for file_id in (state["output_file_id"], state["error_file_id"]):
+            if not file_id:
+                continue
+            content = (await self._batch_request("GET", f"/files/{file_id}/content")).text
+            for line in content.splitlines():
+                if line.strip():
+                    entry = json.loads(line)
+                    results[entry["custom_id"]] = self._batch_result(entry)
+        return results
+
+    def _batch_result(self, entry):
+        """One output line as (content, full_response_json), or the ProviderError it failed with"""
+        response = entry.get("response") or {}
+        status_code = response.get("status_code")
+        body = response.get("body") or {}
+        if status_code == 200 and not entry.get("error"):
+            return body["choices"][0]["message"]["content"], json.dumps(body)
+        error = entry.get("error") or body.get("error") or {}
+        message = error.get("message") if isinstance(error, dict) else str(error)
+        return retry_policy.ProviderError(
+            f"{self.name} batch item error {status_code}: {message}", provider=self.name,
+            status_code=status_code, retryable=status_code in retry_policy.RETRYABLE_STATUS_CODES,
+        )
+
+    async def cancel_batch(self, batch_id, endpoint=None):
+        await self._batch_request("POST", f"/batches/{batch_id}/cancel")
@@ -0,0 +1,98 @@
+import json
+
+import requests
+
+from app.services import retry_policy
+from app.services.providers import base
+
+
+class OpenAICompatibleProvider(base.LLMProvider):
+    """
+    Any server exposing the OpenAI chat completions API (vLLM, Ollama, LM Studio,
+    llama.cpp server...). The model's endpoint is the server's base URL, e.g.
+    http://localhost:8000/v1.
+    """
+
+    name = "openai_compatible"
+    aliases = ("openai-compatible", "openai compatible", "local")
+    supports_streaming = True
+    requires_endpoint = True
+
+    def __init__(self, api_key=None):
+        self.api_key = api_key
+
+    def build_payload(self, story, question, model_name, parameters):
+        sampling = base.resolve_sampling(parameters)
+        payload = {
+            "model": model_name,
+            "messages": [
+                {"role": "user", "content": base.prompt_text(story, question)}
+            ],
+            "temperature": sampling["temperature"],
+            "max_tokens": sampling["max_tokens"],
+            "top_p": sampling["top_p"],
+            "stream": False
+        }
+
+        for key, value in parameters.items():
+            if key not in payload:
+                payload[key] = value
+
+        return payload, sampling
+
+    def url(self, endpoint):
+        if not endpoint:
+            raise retry_policy.ProviderError(f"{self.name} models need an endpoint", provider=self.name)
+        return f"{endpoint.rstrip('/')}/chat/completions"
+
+    def headers(self):
+        return {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+
+    async def complete_async(self, model_name, payload, endpoint=None):
+        response = await self.async_client().post(self.url(endpoint), headers=self.headers(), json=payload)
+        if response.status_code != 200:
+            raise retry_policy.from_response(self.name, response.status_code, response.headers, response.text)
+        response_json = response.json()
+        return response_json["choices"][0]["message"]["content"], json.dumps(response_json)
+
+    def complete(self, model_name, payload, endpoint=None):
+        response = requests.post(self.url(endpoint), headers=self.headers(), json=payload)
+        if response.status_code != 200:
+            raise retry_policy.from_response(self.name, response.status_code, response.headers, response.text)
+        response_json = response.json()
+        return response_json["choices"][0]["message"]["content"], json.dumps(response_json)
+
+    async def stream_async(self, model_name, payload, on_token, endpoint=None):
+        """Server-sent chat.completion.chunk events, ending with "data: [DONE]" """
+        async with self.async_client().stream(
+            "POST", self.url(endpoint), headers=self.headers(), json=dict(payload, stream=True)
+        ) as response:
+            if response.status_code != 200:
+                body = (await response.aread()).decode(errors="replace")
+                raise retry_policy.from_response(self.name, response.status_code, response.headers, body)
+            on_token("")
+            parts = []
+            last_chunk = {}
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                last_chunk = json.loads(data)
+                choices = last_chunk.get("choices") or [{}]
+                delta = (choices[0].get("delta") or {}).get("content")
+                if delta:
+                    parts.append(delta)
+                    on_token("".join(parts))
+        content = "".join(parts)
+
+        # Shaped like a non-streamed completion so saved responses look the same either way
+        choice = {"index": 0, "message": {"role": "assistant", "content": content}}
+        if last_chunk.get("choices"):
+            choice["finish_reason"] = last_chunk["choices"][0].get("finish_reason")
+        full_response = {"id": last_chunk.get("id"), "model": last_chunk.get("model"),
+                         "choices": [choice], "stream": True}
+        if last_chunk.get("usage"):
+            full_response["usage"] = last_chunk["usage"]
+        return content, json.dumps(full_response)
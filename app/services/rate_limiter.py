@@ -0,0 +1,160 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+class TokenBucket:
+    """
+    A token bucket refilled continuously at rate_per_minute / 60 per second.
+
+    Callers reserve capacity up front and the bucket is allowed to go into debt,
+    so concurrent callers are queued in arrival order: each one is told how long
+    to wait before its reservation is covered.
+    """
+
+    def __init__(self, rate_per_minute: float, burst_seconds: float = 1.0):
+        self.rate_per_minute = float(rate_per_minute)
+        self.rate = self.rate_per_minute / 60.0
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float, now: float) -> float:
+        """Take amount from the bucket and return the seconds to wait before using it"""
+        self._refill(now)
+        self.tokens -= float(amount)
+        # A request larger than the bucket only waits until a full bucket would cover
+        # it; the rest stays as debt for the callers after it to wait out
+        overflow = max(0.0, float(amount) - self.capacity)
+        return max(0.0, -(self.tokens + overflow) / self.rate)
+
+    def drain(self, seconds: float, now: float) -> None:
+        """Push the bucket into debt so nothing is released for the next `seconds`"""
+        self._refill(now)
+        self.tokens = min(self.tokens, -seconds * self.rate)
+
+
+class RateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute budget for one model or provider.
+
+    Either budget may be None, in which case it is not enforced.
+    """
+
+    def __init__(self, requests_per_minute: Optional[float] = None,
+                 tokens_per_minute: Optional[float] = None, burst_seconds: float = 1.0):
+        self._lock = threading.Lock()
+        self.burst_seconds = burst_seconds
+        self.requests = None
+        self.tokens = None
+        self.paused_until = 0.0
+        self.configure(requests_per_minute, tokens_per_minute)
+
+    def configure(self, requests_per_minute: Optional[float], tokens_per_minute: Optional[float]) -> None:
+        """(Re)apply budgets, keeping existing bucket state when a budget hasn't changed"""
+        with self._lock:
+            self.requests = self._bucket_for(self.requests, requests_per_minute)
+            self.tokens = self._bucket_for(self.tokens, tokens_per_minute)
+
+    def _bucket_for(self, bucket: Optional[TokenBucket], rate_per_minute: Optional[float]) -> Optional[TokenBucket]:
+        if not rate_per_minute or rate_per_minute <= 0:
+            return None
+        if bucket is not None and bucket.rate_per_minute == float(rate_per_minute):
+            return bucket
+        return TokenBucket(rate_per_minute, self.burst_seconds)
+
+    def reserve(self, tokens: int = 0) -> float:
+        """Reserve one request (and `tokens` tokens) and return the seconds to wait"""
+        with self._lock:
+            now = time.monotonic()
+            wait = max(0.0, self.paused_until - now)
+            if self.requests is not None:
+                wait = max(wait, self.requests.reserve(1, now))
+            if self.tokens is not None and tokens:
+                wait = max(wait, self.tokens.reserve(tokens, now))
+            return wait
+
+    async def acquire(self, tokens: int = 0) -> None:
+        wait = self.reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def acquire_sync(self, tokens: int = 0) -> None:
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        """Hold back every caller sharing this limiter for `seconds` (e.g. after a 429)"""
+        with self._lock:
+            now = time.monotonic()
+            # Applies even without budgets, so unmetered models still back off
+            self.paused_until = max(self.paused_until, now + seconds)
+            if self.requests is not None:
+                self.requests.drain(seconds, now)
+            if self.tokens is not None:
+                self.tokens.drain(seconds, now)
+
+
+def get_limiter(key: str, requests_per_minute: Optional[float] = None,
+                tokens_per_minute: Optional[float] = None, burst_seconds: float = 1.0) -> RateLimiter:
+    """
+    Get the process-wide limiter for `key`, creating it on first use.
+
+    Budgets passed in are applied each time, so edits to a model's limits take
+    effect on the next call without losing the bucket's current state.
+    """
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = RateLimiter(requests_per_minute, tokens_per_minute, burst_seconds)
+            _limiters[key] = limiter
+            logger.info(f"Created rate limiter {key}: rpm={requests_per_minute}, tpm={tokens_per_minute}")
+            return limiter
+    limiter.configure(requests_per_minute, tokens_per_minute)
+    return limiter
+
+
+def limiters_for_model(model_id: int, provider_name: Optional[str], limits: Dict,
+                       provider_limits: Optional[Dict] = None, burst_seconds: float = 1.0) -> List[RateLimiter]:
+    """
+    The limiters a call to `model_id` must pass: the model's own budget plus the
+    provider-wide budget if one is configured for `provider_name`.
+    """
+    limiters = [get_limiter(
+        f"model:{model_id}",
+        limits.get("requests_per_minute"),
+        limits.get("tokens_per_minute"),
+        burst_seconds,
+    )]
+    provider_budget = (provider_limits or {}).get(provider_name) if provider_name else None
+    if provider_budget:
+        limiters.append(get_limiter(
+            f"provider:{provider_name}",
+            provider_budget.get("requests_per_minute"),
+            provider_budget.get("tokens_per_minute"),
+            burst_seconds,
+        ))
+    return limiters
+
+
+def estimate_tokens(prompt_text: str, max_tokens: Optional[int] = None) -> int:
+    """Rough token cost of a call: ~4 characters per prompt token plus the completion budget"""
+    return len(prompt_text or "") // 4 + int(max_tokens or 0)
+
+
+def reset_limiters() -> None:
+    """Forget all limiter state (used by tests)"""
+    with _limiters_lock:
+        _limiters.clear()
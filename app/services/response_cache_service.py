@@ -0,0 +1,131 @@
+import datetime
+import hashlib
+import json
+import logging
+import threading
+
+from flask import current_app
+from sqlalchemy import delete, func, select
+
+from app import session_scope
+from app.models import ResponseCache
+
+logger = logging.getLogger(__name__)
+
+_stores_since_evict = 0
+_evict_lock = threading.Lock()
+
+
+def _now():
+    return datetime.datetime.utcnow()
+
+
+def make_cache_key(provider_name, payload):
+    """
+    Content address for a request: a sha256 over the provider and the exact payload
+    sent (model, rendered prompt and every sampling parameter).
+    """
+    canonical = json.dumps({"provider": provider_name, "payload": payload}, sort_keys=True, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def should_use_cache(sampling, use_cache=True):
+    """
+    Whether a call may be served from / stored in the cache.
+
+    Caching is opt-in (LLM_CACHE_ENABLED), can be bypassed per run (use_cache=False)
+    and by default only applies to deterministic (temperature 0) requests.
+    """
+    config = current_app.config
+    if not use_cache or not config.get("LLM_CACHE_ENABLED", False):
+        return False
+    if config.get("LLM_CACHE_DETERMINISTIC_ONLY", True):
+        return float(sampling.get("temperature") or 0) == 0
+    return True
+
+
+def get_cached_response(cache_key):
+    """Return the cached response for cache_key, or None if missing or expired"""
+    max_age = current_app.config.get("LLM_CACHE_MAX_AGE_SEC")
+    with session_scope() as session:
+        entry = session.get(ResponseCache, cache_key)
+        if entry is None:
+            return None
+        now = _now()
+        if max_age and (now - entry.created_at).total_seconds() > max_age:
+            session.delete(entry)
+            return None
+        entry.last_used_at = now
+        entry.hit_count = (entry.hit_count or 0) + 1
+        logger.info(f"Response cache hit {cache_key[:12]} ({entry.model_name})")
+        return {
+            "response_content": entry.response_content,
+            "full_response": entry.full_response,
+        }
+
+
+def store_response(cache_key, provider_name, model_name, payload_json, response_content, full_response_json):
+    """Insert or refresh a cache entry, evicting old entries every so often"""
+    global _stores_since_evict
+    now = _now()
+    with session_scope() as session:
+        entry = session.get(ResponseCache, cache_key)
+        if entry is None:
+            entry = ResponseCache(cache_key=cache_key, hit_count=0, created_at=now)
+            session.add(entry)
+        entry.provider_name = provider_name
+        entry.model_name = model_name
+        entry.payload = payload_json
+        entry.response_content = response_content
+        entry.full_response = full_response_json
+        entry.created_at = now
+        entry.last_used_at = now
+
+    with _evict_lock:
+        _stores_since_evict += 1
+        due = _stores_since_evict >= current_app.config.get("LLM_CACHE_EVICT_EVERY", 100)
+        if due:
+            _stores_since_evict = 0
+    if due:
+        evict()
+
+
+def evict(max_entries=None, max_age_sec=None):
+    """
+    Drop entries older than max_age_sec, then the least recently used entries
+    beyond max_entries. Defaults come from LLM_CACHE_MAX_ENTRIES / LLM_CACHE_MAX_AGE_SEC.
+
+    Returns:
+        Number of entries removed
+    """
+    config = current_app.config
+    max_entries = max_entries if max_entries is not None else config.get("LLM_CACHE_MAX_ENTRIES")
+    max_age_sec = max_age_sec if max_age_sec is not None else config.get("LLM_CACHE_MAX_AGE_SEC")
+    removed = 0
+    with session_scope() as session:
+        if max_age_sec:
+            cutoff = _now() - datetime.timedelta(seconds=max_age_sec)
+            result = session.execute(delete(ResponseCache).where(ResponseCache.created_at < cutoff))
+            removed += result.rowcount or 0
+        if max_entries is not None:
+            count = session.execute(select(func.count()).select_from(ResponseCache)).scalar()
+            overflow = count - max_entries
+            if overflow > 0:
+                oldest = (
+                    select(ResponseCache.cache_key)
+                    .order_by(ResponseCache.last_used_at.asc())
+                    .limit(overflow)
+                )
+                result = session.execute(
+                    delete(ResponseCache).where(ResponseCache.cache_key.in_(oldest))
+                )
+                removed += result.rowcount or 0
+    if removed:
+        logger.info(f"Evicted {removed} response cache entries")
+    return removed
+
+
+def clear():
+    """Remove every cached response"""
+    with session_scope() as session:
+        session.execute(delete(ResponseCache))
@@ -36,15 +36,16 @@ def update_response_flag_and_notes(response_id, flagged_for_review, review_notes
         return False, f'Error updating response: {str(e)}'
 
 def get_response_ids_for_run(session, async_service):
-    """Get response IDs for the current run from async_service or session."""
+    """Get response IDs for the current run from async_service (or the job store) or session."""
     response_ids = []
     job_id = session.get('job_id')
-    if job_id and job_id in async_service.processing_jobs:
-        job = async_service.processing_jobs[job_id]
+    # Persisted jobs are read from the job store, as a worker process may have run them
+    job = async_service.get_job_status(job_id) if job_id else None
+    if job:
         for result_data in job["results"].values():
-            if isinstance(result_data, dict) and "response_id" in result_data:
+            if isinstance(result_data, dict) and result_data.get("response_id"):
                 response_ids.append(str(result_data["response_id"]))
-        job["response_ids"] = response_ids
+        async_service.set_job_response_ids(job_id, response_ids)
         if response_ids:
             session['response_ids'] = response_ids
     if not response_ids:
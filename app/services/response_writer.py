@@ -0,0 +1,126 @@
+import asyncio
+import logging
+
+from app.services import job_events
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseWriter:
+    """
+    Write-behind queue for a job's prompt/response rows.
+
+    Completed calls are submitted as records (see llm_service._complete_call with
+    defer_save) and written with llm_service.save_prompts_and_responses in one
+    transaction per batch. A batch is flushed when it reaches batch_size rows or when
+    its oldest row has waited flush_interval_ms; close() flushes whatever is left and
+    must be awaited when the job finishes or is cancelled.
+
+    Lives on the event loop that runs the job; the database work itself happens in a
+    worker thread so the loop keeps dispatching calls while a batch is written.
+
+    Given a job_id, every entry also carries the job item it finishes, and the job
+    store's item statuses and progress are updated with the same batch.
+    """
+
+    def __init__(self, app, batch_size=None, flush_interval_ms=None, job_id=None):
+        self.app = app
+        self.job_id = job_id
+        self.job_status = None  # stored job status as of the last flush
+        self.batch_size = max(1, int(batch_size or app.config.get("RESPONSE_WRITE_BATCH_SIZE", 50)))
+        interval_ms = flush_interval_ms if flush_interval_ms is not None else app.config.get("RESPONSE_WRITE_FLUSH_MS", 200)
+        self.flush_interval = max(0, interval_ms) / 1000.0
+        self.batches_written = 0
+        self.rows_written = 0
+        self._pending = []  # (item_key, record, response_id, error, on_saved, on_error)
+        self._flush_lock = asyncio.Lock()
+        self._timer = None
+        self._timer_task = None
+        self._closed = False
+
+    async def submit(self, record, on_saved=None, on_error=None, item_key=None):
+        """
+        Queue one record. on_saved(response_id) / on_error(exception) are called on
+        the event loop once the batch containing the record has been written.
+        item_key may be a list of job items that all share the record's response.
+        """
+        await self._enqueue((item_key, record, None, None, on_saved, on_error))
+
+    async def submit_outcome(self, item_key, response_id=None, error=None):
+        """Queue a job item that finished without a deferred record (already saved, or failed)"""
+        if self.job_id is None:
+            return
+        await self._enqueue((item_key, None, response_id, error, None, None))
+
+    async def _enqueue(self, entry):
+        if self._closed:
+            raise RuntimeError("ResponseWriter is closed")
+        self._pending.append(entry)
+        if len(self._pending) >= self.batch_size:
+            await self.flush()
+        elif self._timer is None:
+            loop = asyncio.get_running_loop()
+            self._timer = loop.call_later(self.flush_interval, self._flush_on_timer)
+
+    def _flush_on_timer(self):
+        self._timer = None
+        self._timer_task = asyncio.ensure_future(self.flush())
+
+    async def flush(self):
+        """Write everything queued so far"""
+        async with self._flush_lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            batch, self._pending = self._pending, []
+            if not batch:
+                return
+
+            try:
+                response_ids = await asyncio.to_thread(self._write, batch)
+            except Exception as e:
+                logger.exception(f"Failed to write a batch of {len(batch)} responses")
+                for *_, on_error in batch:
+                    if on_error:
+                        on_error(e)
+                return
+
+            self.batches_written += 1
+            if self.job_id is not None:
+                job_events.publish(self.job_id)  # the job store's progress just moved
+            self.rows_written += sum(1 for entry in batch if entry[1] is not None)
+            for (_, _, _, _, on_saved, _), response_id in zip(batch, response_ids):
+                if on_saved and response_id is not None:
+                    on_saved(response_id)
+
+    def _write(self, batch):
+        """Save the batch's records, then its job item outcomes. Returns a response_id per entry."""
+        from app.services import job_store, llm_service  # Import here to avoid circular imports
+        with self.app.app_context():
+            records = [record for _, record, *_ in batch if record is not None]
+            saved_ids = iter(llm_service.save_prompts_and_responses(records) if records else [])
+            response_ids = [
+                next(saved_ids) if record is not None else response_id
+                for _, record, response_id, *_ in batch
+            ]
+
+            if self.job_id is not None:
+                outcomes = [
+                    {"item_key": key, "response_id": response_id, "error": error}
+                    for (item_key, _, _, error, _, _), response_id in zip(batch, response_ids)
+                    if item_key is not None
+                    for key in (item_key if isinstance(item_key, list) else [item_key])
+                ]
+                try:
+                    self.job_status = job_store.record_outcomes(self.job_id, outcomes)
+                except Exception:
+                    # The responses themselves are saved; only the job's bookkeeping lags
+                    logger.exception(f"Could not record item outcomes for job {self.job_id}")
+            return response_ids
+
+    async def close(self):
+        """Flush the remaining rows and stop accepting new ones. Safe to call twice."""
+        self._closed = True
+        await self.flush()
+        if self._timer_task is not None and not self._timer_task.done():
+            await self._timer_task
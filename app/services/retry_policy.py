@@ -0,0 +1,147 @@
+import email.utils
+import logging
+import random
+import re
+import time
+from typing import Mapping, Optional
+
+import httpx
+import requests
+from groq import APIConnectionError, APIStatusError
+
+logger = logging.getLogger(__name__)
+
+# Statuses worth trying again: timeouts, conflicts, rate limits and server-side failures.
+# Anything else (bad request, auth, unknown model...) fails the same way every time.
+RETRYABLE_STATUS_CODES = {408, 409, 425, 429, 500, 502, 503, 504}
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+class ProviderError(Exception):
+    """
+    A failed provider call.
+
+    retryable says whether the same request may succeed later; retry_after is the
+    wait (seconds) the provider asked for, if it said.
+    """
+
+    def __init__(self, message, provider=None, status_code=None, retryable=False, retry_after=None):
+        super().__init__(message)
+        self.provider = provider
+        self.status_code = status_code
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+    @property
+    def rate_limited(self):
+        return self.status_code == 429
+
+
+def _parse_duration(value):
+    """Seconds in a header value such as "7", "1.5", "120ms" or Groq's "2m59.56s" """
+    value = str(value).strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if parts and "".join(number + unit for number, unit in parts) == value:
+        return sum(float(number) * _DURATION_UNITS[unit] for number, unit in parts)
+    # Retry-After may also be an HTTP date
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+def parse_retry_after(headers: Optional[Mapping]) -> Optional[float]:
+    """
+    The wait a response asks for, from Retry-After (seconds or date), retry-after-ms or
+    the x-ratelimit-reset-* headers Groq sends with a 429. None if there is none.
+    """
+    if not headers:
+        return None
+    headers = {str(name).lower(): value for name, value in headers.items()}
+    if "retry-after-ms" in headers:
+        seconds = _parse_duration(f"{headers['retry-after-ms']}ms")
+        if seconds is not None:
+            return seconds
+    if "retry-after" in headers:
+        seconds = _parse_duration(headers["retry-after"])
+        if seconds is not None:
+            return seconds
+    resets = [
+        _parse_duration(headers[name])
+        for name in ("x-ratelimit-reset-requests", "x-ratelimit-reset-tokens")
+        if name in headers
+    ]
+    resets = [seconds for seconds in resets if seconds is not None]
+    return max(resets) if resets else None
+
+
+def from_response(provider, status_code, headers=None, body=None):
+    """ProviderError for an HTTP error response"""
+    detail = str(body)[:500] if body else ""
+    return ProviderError(
+        f"{provider} API error {status_code}: {detail}".rstrip(": "),
+        provider=provider,
+        status_code=status_code,
+        retryable=status_code in RETRYABLE_STATUS_CODES,
+        retry_after=parse_retry_after(headers),
+    )
+
+
+def from_exception(provider, exc):
+    """ProviderError for an exception raised while calling a provider"""
+    if isinstance(exc, ProviderError):
+        return exc
+    if isinstance(exc, APIStatusError):
+        response = getattr(exc, "response", None)
+        return from_response(
+            provider, exc.status_code,
+            headers=getattr(response, "headers", None),
+            body=getattr(exc, "body", None) or getattr(exc, "message", None),
+        )
+    if isinstance(exc, (APIConnectionError, httpx.TransportError, requests.ConnectionError, requests.Timeout)):
+        # Includes timeouts: the request may never have reached the provider
+        return ProviderError(f"{provider} connection error: {exc}", provider=provider, retryable=True)
+    return ProviderError(f"{provider} call failed: {exc}", provider=provider, retryable=False)
+
+
+class RetryPolicy:
+    """
+    How often and how long to wait before retrying a failed provider call.
+
+    Waits use exponential backoff with full jitter (a random wait up to
+    base_delay * 2^(attempt-1), capped at max_delay) so concurrent callers that failed
+    together don't retry together. A wait the provider asked for via Retry-After is
+    used instead, up to max_retry_after.
+    """
+
+    def __init__(self, max_attempts=4, base_delay=1.0, max_delay=30.0, max_retry_after=120.0):
+        self.max_attempts = max(1, int(max_attempts))
+        self.base_delay = float(base_delay)
+        self.max_delay = float(max_delay)
+        self.max_retry_after = float(max_retry_after)
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            max_attempts=config.get("LLM_RETRY_MAX_ATTEMPTS", 4),
+            base_delay=config.get("LLM_RETRY_BASE_DELAY_SEC", 1.0),
+            max_delay=config.get("LLM_RETRY_MAX_DELAY_SEC", 30.0),
+            max_retry_after=config.get("LLM_RETRY_MAX_RETRY_AFTER_SEC", 120.0),
+        )
+
+    def should_retry(self, attempt, error):
+        """Whether to try again after `attempt` (1-based) failed with `error`"""
+        return error.retryable and attempt < self.max_attempts
+
+    def delay(self, attempt, error=None):
+        """Seconds to wait before the attempt after `attempt`"""
+        if error is not None and error.retry_after is not None:
+            return min(error.retry_after, self.max_retry_after)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
@@ -1,14 +1,24 @@
 import itertools
+import json
+import logging
+import math
+import random
 import re
+import sys
+import uuid
 
-from flask import abort
-from sqlalchemy import select
+from flask import abort, current_app
+from sqlalchemy import or_, select
 
-from app import db
-from app.models import Field, Story, StoryCategory, Template, Word
+from app import db, session_scope
+from app.models import Field, Generation, Story, StoryCategory, Template, Word
 
 from ..services import story_service
 
+logger = logging.getLogger(__name__)
+
+_GENERATION_ID = re.compile(r"^[0-9a-f]{32}$")
+
 
 def get_all_templates():
     return db.session.execute(select(Template)).scalars().all()
@@ -47,9 +57,60 @@ def add_template(content):
     db.session.commit()
     return new_template.template_id
 
+PLACEHOLDER = re.compile(r'\{(.*?)\}')
+
+class CompiledTemplate:
+    """
+    A template parsed once into its literal text and placeholder slots, so a story
+    is rendered in one pass rather than by rescanning the text once per field.
+    A placeholder used more than once (e.g. {number}) fills every slot it appears in.
+    """
+
+    __slots__ = ("content", "segments", "slots", "field_names")
+
+    def __init__(self, content):
+        self.content = content
+        pieces = PLACEHOLDER.split(content)
+        self.segments = pieces[0::2]  # literal text around the placeholders (one more than slots)
+        self.slots = pieces[1::2]     # field name of each placeholder, in order
+        self.field_names = list(dict.fromkeys(self.slots))
+
+    def renderer(self, field_names):
+        """
+        A function rendering a tuple of values ordered like field_names. Placeholders
+        for fields not in field_names are left as they are.
+
+        The segments and slots are joined into a positional format string, so each
+        story is a single str.format call.
+        """
+        positions = {name: index for index, name in enumerate(field_names)}
+
+        def literal(text):
+            return text.replace("{", "{{").replace("}", "}}")
+
+        pattern = "".join(
+            literal(text) + (f"{{{positions[name]}}}" if name in positions else literal(f"{{{name}}}"))
+            for text, name in zip(self.segments, self.slots)
+        ) + literal(self.segments[-1])
+        return lambda values: pattern.format(*values)
+
+    def render(self, values_by_field):
+        """The template filled from a {field name: value} dict"""
+        names = list(values_by_field)
+        return self.renderer(names)(tuple(values_by_field.values()))
+
+_compiled_templates = {}  # template_id -> CompiledTemplate
+
+def compile_template(template):
+    """The template's CompiledTemplate, parsed once per template_id (and again if its text changes)"""
+    compiled = _compiled_templates.get(template.template_id)
+    if compiled is None or compiled.content != template.content:
+        compiled = _compiled_templates[template.template_id] = CompiledTemplate(template.content)
+    return compiled
+
 def get_template_fields(template_id):
     template = get_template_by_id( template_id)
-    field_names = re.findall(r'\{(.*?)\}', template.content)
+    field_names = compile_template(template).field_names
     fields = {}
     missing_fields = []
     for field_name in field_names:
@@ -129,66 +190,289 @@ def delete_word_from_field(field_name, word):
     print(f"Successfully removed word '{word}' from field '{field_name}'")
     return True
 
+def iter_permutations(fields):
+    """Lazily yield every permutation of field values, in field order"""
+    return itertools.product(*fields.values())
+
+def count_permutations(fields):
+    """How many stories a set of field values generates"""
+    return math.prod(len(values) for values in fields.values())
+
 def generate_permutations(fields):
-    """Generate all possible permutations of field values."""
-    field_names = list(fields.keys())
-    return list(itertools.product(*(fields[field] for field in field_names)))
+    """Generate all possible permutations of field values (as a list; template_filler streams them instead)."""
+    return list(iter_permutations(fields))
+
+# --- Choosing which permutations to generate --------------------------------
+# "all" is the full cartesian product. The other modes pick a subset without
+# enumerating it: permutations are numbered in itertools.product order and
+# decoded from their index.
+
+GENERATION_MODES = ("all", "random", "latin_hypercube", "pairwise")
+
+def decode_permutation(fields, index):
+    """The index-th permutation in iter_permutations order (a mixed-radix number, last field fastest)"""
+    values = []
+    for field_values in reversed(list(fields.values())):
+        index, digit = divmod(index, len(field_values))
+        values.append(field_values[digit])
+    return tuple(reversed(values))
+
+def sample_permutations(fields, sample_size, seed=None):
+    """sample_size distinct permutations chosen uniformly at random"""
+    total = count_permutations(fields)
+    sample_size = min(sample_size, total)
+    rng = random.Random(seed)
+    if total <= sys.maxsize:
+        indexes = rng.sample(range(total), sample_size)
+    else:
+        # range() can't be that long; draw until we have enough distinct ones
+        chosen = {}
+        while len(chosen) < sample_size:
+            chosen.setdefault(rng.randrange(total), None)
+        indexes = list(chosen)
+    return (decode_permutation(fields, index) for index in indexes)
+
+def latin_hypercube_permutations(fields, sample_size, seed=None):
+    """
+    sample_size permutations spreading every field's values evenly: each field's
+    values are split into sample_size strata (or repeated evenly, if there are fewer
+    values than samples), one value is drawn from each stratum, and each field's
+    draws are shuffled independently. Repeated combinations are only generated once.
+    """
+    rng = random.Random(seed)
+    sample_size = min(sample_size, count_permutations(fields))
+    columns = []
+    for field_values in fields.values():
+        size = len(field_values)
+        column = []
+        for stratum in range(sample_size):
+            low = stratum * size // sample_size
+            high = max(low + 1, (stratum + 1) * size // sample_size)
+            column.append(field_values[rng.randrange(low, high)])
+        rng.shuffle(column)
+        columns.append(column)
+    return iter(dict.fromkeys(zip(*columns)))
+
+def pairwise_permutations(fields):
+    """
+    Permutations covering every pair of values of every two fields at least once
+    (all-pairs), built greedily: each new permutation starts from a pair that isn't
+    covered yet and picks the remaining values that cover the most new pairs.
+    """
+    value_lists = list(fields.values())
+    if len(value_lists) < 2:
+        return list(iter_permutations(fields))
+    sizes = [len(values) for values in value_lists]
+    uncovered = {
+        (i, a, j, b)
+        for i, j in itertools.combinations(range(len(sizes)), 2)
+        for a in range(sizes[i]) for b in range(sizes[j])
+    }
+    rows = []
+    while uncovered:
+        i, a, j, b = min(uncovered)
+        row = {i: a, j: b}
+        for field in range(len(sizes)):
+            if field in row:
+                continue
+            row[field] = max(
+                range(sizes[field]),
+                key=lambda value: sum(
+                    (min(other, field), row[other] if other < field else value,
+                     max(other, field), value if other < field else row[other]) in uncovered
+                    for other in row
+                ),
+            )
+        uncovered -= {
+            (i, row[i], j, row[j]) for i, j in itertools.combinations(range(len(sizes)), 2)
+        }
+        rows.append(tuple(value_lists[field][row[field]] for field in range(len(sizes))))
+    return rows
+
+def select_permutations(fields, mode="all", sample_size=None, seed=None):
+    """
+    The permutations a generation mode produces, and how many there are.
+
+    Returns:
+        (permutations, count): a lazy iterable (a list for pairwise) and its length
+
+    Raises:
+        ValueError: For an unknown mode, or a sampling mode without a positive sample_size
+    """
+    total = count_permutations(fields)
+    if mode == "all":
+        return iter_permutations(fields), total
+    if mode == "pairwise":
+        rows = pairwise_permutations(fields)
+        return rows, len(rows)
+    if mode not in GENERATION_MODES:
+        raise ValueError(f"Unknown generation mode: {mode}")
+    if not sample_size or sample_size < 1:
+        raise ValueError("Choose how many stories to sample")
+    if mode == "random":
+        return sample_permutations(fields, sample_size, seed), min(sample_size, total)
+    rows = list(latin_hypercube_permutations(fields, sample_size, seed))
+    return rows, len(rows)
 
-def template_filler(template, template_id, field_data=None, category_ids=None):
+def preview_generation(template_id, field_data=None, mode="all", sample_size=None):
     """
-    Fill the template with permutations of field values.
-    Optionally assign categories to the generated stories.
+    How many permutations the fields have, how many stories a mode would generate, and the cap
+
+    Raises:
+        ValueError: If a field has no values or the mode or sample size is invalid
+    """
+    fields = resolve_template_fields(template_id, field_data)
+    _, count = select_permutations(fields, mode, sample_size)
+    return {
+        "total_permutations": count_permutations(fields),
+        "stories": count,
+        "max_stories": current_app.config.get("STORY_GENERATION_MAX_STORIES"),
+    }
+
+def resolve_template_fields(template_id, field_data=None, interactive=False):
+    """
+    The values to fill each of the template's fields with: field_data where given,
+    else the field's words.
+
+    Raises:
+        ValueError: If a field has no values. With interactive (command-line use) the
+            user is asked to type them instead.
     """
     fields, missing_fields = get_template_fields(template_id)
-    
-    # If field_data is provided from the form, use it to fill in missing fields
-    if field_data:
-        print(f"Using field data from form: {field_data}")
-        # Use field_data for all fields (both existing and missing)
-        for field in list(fields.keys()) + missing_fields:
-            if field in field_data and field_data[field]:
-                fields[field] = field_data[field]
-                print(f"Setting field '{field}' with values: {field_data[field]}")
-            elif field in missing_fields:
-                # If a field is missing and not in field_data, use a default
-                fields[field] = ["[No value provided]"]
-                print(f"No value for missing field '{field}', using default")
-    else:
+
+    for field, values in (field_data or {}).items():
+        if field in fields or field in missing_fields:
+            fields[field] = values
+    empty = [field for field in list(fields) + missing_fields if not fields.get(field)]
+    logger.debug(f"Template {template_id} fields: {fields}, without values: {empty}")
+
+    if empty and interactive:
         # This is for command-line usage - testing
-        if missing_fields:
-            for field in missing_fields:
-                user_input = input(f"No sample data available for field '{field}'. Enter values (comma-separated): ")
-                fields[field] = [value.strip() for value in user_input.split(',')] if user_input else ["default"]
-
-    # Generate all permutations
-    permutations = generate_permutations(fields)
-    print(f"Generated {len(permutations)} permutations")
-
-    generated_stories_ids = []
-    for permutation in permutations:
-        story_content = template.content
-        for field, value in zip(fields.keys(), permutation):
-            story_content = story_content.replace(f"{{{field}}}", value)
-        
-        story_id = story_service.add_story(story_content, category_ids, template_id)     
-        
-        generated_stories_ids.append(story_id)
+        for field in empty:
+            user_input = input(f"No sample data available for field '{field}'. Enter values (comma-separated): ")
+            fields[field] = [value.strip() for value in user_input.split(',')] if user_input else ["default"]
+    elif empty:
+        raise ValueError(f"Add at least one word to: {', '.join(empty)}")
+    return fields
 
-    # One commit at the end is more efficient
-    db.session.commit()
+def template_filler(template, template_id, field_data=None, category_ids=None, chunk_size=None, on_progress=None,
+                    mode="all", sample_size=None, seed=None):
+    """
+    Fill the template with permutations of field values (all of them, or a sample
+    chosen by mode - see select_permutations). Optionally assign categories to the
+    generated stories.
+
+    Permutations are generated, rendered and saved a chunk at a time (one
+    transaction per STORY_GENERATION_CHUNK_SIZE stories), so large templates don't
+    hold every story in memory. on_progress(saved, total) is called after each chunk.
+
+    Without field_data (command-line use) the user is asked for the values of fields
+    that have no words.
+
+    Raises:
+        ValueError: If a field has no values, or more than STORY_GENERATION_MAX_STORIES
+            stories would be generated
+    """
+    fields = resolve_template_fields(template_id, field_data, interactive=field_data is None)
+    permutations, total = select_permutations(fields, mode, sample_size, seed)
+    max_stories = current_app.config.get("STORY_GENERATION_MAX_STORIES")
+    if max_stories and total > max_stories:
+        raise ValueError(f"This would generate {total:,} stories, more than the limit of {max_stories:,}. "
+                         f"Choose fewer words or sample the permutations.")
+    logger.info(f"Template {template_id}: generating {total} of {count_permutations(fields)} permutations ({mode})")
+
+    def report(saved):
+        logger.info(f"Template {template_id}: saved {saved}/{total} stories")
+        if on_progress:
+            on_progress(saved, total)
+
+    if on_progress:
+        on_progress(0, total)
+
+    render = compile_template(template).renderer(list(fields.keys()))
+    stories = (render(values) for values in permutations)
+    generated_stories_ids = story_service.add_stories(
+        stories, category_ids, template_id,
+        chunk_size=chunk_size or current_app.config.get("STORY_GENERATION_CHUNK_SIZE", 1000),
+        on_progress=report,
+    )
     print(f"Created {len(generated_stories_ids)} stories")
     return generated_stories_ids
 
-def generate_stories(template_id, field_data, category_ids=None):
-    """Generate stories from a template and field data, with optional categories"""
+def generate_stories(template_id, field_data, category_ids=None, mode="all", sample_size=None, seed=None,
+                     on_progress=None):
+    """Generate stories from a template and field data, with optional categories and sampling"""
     template = get_template_by_id( template_id)
     #don't need code below as get_template_by_id handles it with 404
     # if not template:
     #     raise ValueError(f"Template with ID {template_id} not found")
     
     # Use the existing template_filler function with category support
-    return template_filler(template, template_id, field_data, category_ids)
+    return template_filler(template, template_id, field_data, category_ids, on_progress=on_progress,
+                           mode=mode, sample_size=sample_size, seed=seed)
+
+def start_generation(template_id, generation_id=None):
+    """
+    Record a new generation run and return its id. The page submitting the run may
+    choose the id (so it can poll progress before the request returns); anything
+    other than an unused 32-digit hex id is replaced with a new one.
 
+    Runs are kept in the generation table (committed straight away, so the progress
+    route in any web process can see them) and the session only carries the id.
+    """
+    with session_scope() as session:
+        if not generation_id or not _GENERATION_ID.match(generation_id) or session.get(Generation, generation_id):
+            generation_id = uuid.uuid4().hex
+        session.add(Generation(generation_id=generation_id, template_id=int(template_id), status="running",
+                               saved=0, story_ranges="[]"))
+    return generation_id
+
+def update_generation(generation_id, **changes):
+    with session_scope() as session:
+        generation = session.get(Generation, generation_id)
+        if generation:
+            for name, value in changes.items():
+                setattr(generation, name, value)
+
+def finish_generation(generation_id, story_ids):
+    """Mark the run completed, remembering its stories as ranges of consecutive ids"""
+    ranges = []
+    for story_id in sorted(story_ids):
+        if ranges and story_id == ranges[-1][1] + 1:
+            ranges[-1][1] = story_id
+        else:
+            ranges.append([story_id, story_id])
+    update_generation(generation_id, status="completed", saved=len(story_ids), total=len(story_ids),
+                      story_ranges=json.dumps(ranges))
+
+def get_generation(generation_id):
+    """The generation run's progress as a dict, or None if it's unknown"""
+    with session_scope() as session:
+        generation = session.get(Generation, generation_id) if generation_id else None
+        if generation is None:
+            return None
+        return {
+            "template_id": generation.template_id,
+            "status": generation.status,
+            "saved": generation.saved,
+            "total": generation.total,
+            "story_ranges": json.loads(generation.story_ranges),
+            "error": generation.error,
+        }
+
+def get_generated_stories(generation_id, page=1, per_page=None):
+    """
+    A page of the stories a completed generation run created (a Flask-SQLAlchemy
+    Pagination), or None if the run is unknown
+    """
+    generation = get_generation(generation_id)
+    if generation is None:
+        return None
+    ranges = generation["story_ranges"] or [[0, -1]]  # a run with no stories matches nothing
+    stmt = (select(Story)
+            .where(or_(*(Story.story_id.between(first, last) for first, last in ranges)))
+            .order_by(Story.story_id))
+    return db.paginate(stmt, page=page, per_page=per_page or current_app.config["PER_PAGE"], error_out=False)
 
 def update_field_words(field_data):
     """Update field words based on user selection"""
@@ -1,6 +1,9 @@
+import itertools
+
 from app import db
 from app.models import Story, StoryCategory
 from flask import abort
+from sqlalchemy import insert
 
 def add_story(content, category_ids=None, template_id=None):
     story = Story(content=content, template_id=template_id)
@@ -12,6 +15,40 @@ def add_story(content, category_ids=None, template_id=None):
     db.session.commit()
     return story.story_id
 
+def add_stories(contents, category_ids=None, template_id=None, chunk_size=1000, on_progress=None):
+    """
+    Insert many stories (and their category links), chunk_size at a time with one
+    transaction per chunk. contents can be any iterable, e.g. a generator, so only
+    one chunk of story texts is held in memory at once.
+
+    Args:
+        on_progress: Called with the number of stories saved so far after each chunk
+
+    Returns:
+        The new story_ids, in the order of contents
+    """
+    category_ids = list(dict.fromkeys(category_ids or []))
+    story_ids = []
+    contents = iter(contents)
+    while True:
+        chunk = list(itertools.islice(contents, max(1, chunk_size)))
+        if not chunk:
+            break
+        new_ids = db.session.execute(
+            insert(Story).returning(Story.story_id, sort_by_parameter_order=True),
+            [{"content": content, "template_id": template_id} for content in chunk],
+        ).scalars().all()
+        if category_ids:
+            db.session.execute(insert(StoryCategory), [
+                {"story_id": story_id, "category_id": category_id}
+                for story_id in new_ids for category_id in category_ids
+            ])
+        db.session.commit()
+        story_ids.extend(new_ids)
+        if on_progress:
+            on_progress(len(story_ids))
+    return story_ids
+
 def add_story_with_categories(content, category_ids, new_category=None):
     from app.services import category_service  # Avoid circular import
     if new_category and new_category.strip():
@@ -124,12 +124,81 @@ function calculatePermutations() {
     let total = 1;
     Object.values(fieldData).forEach(words => total *= words.length);
     countEl.textContent = total.toLocaleString();
+    updateGenerationPreview();
 
     if (warningEl) {
         warningEl.style.display = total > 100 ? 'block' : 'none';
     }
 }
 
+let previewTimer = null;
+
+/**
+ * Asks the server how many stories the chosen generation mode would create
+ * (and whether that's over the limit), shortly after the last change
+ */
+function updateGenerationPreview() {
+    const form = document.getElementById('fields-form');
+    const previewEl = document.getElementById('generation-preview');
+    if (!form || !previewEl) return;
+
+    clearTimeout(previewTimer);
+    previewTimer = setTimeout(() => {
+        fetch(form.dataset.previewUrl, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({
+                template_id: form.querySelector('input[name="template_id"]').value,
+                field_data: fieldData,
+                generation_mode: document.getElementById('generation-mode').value,
+                sample_size: document.getElementById('sample-size').value,
+            }),
+        })
+            .then(response => response.json())
+            .then(data => {
+                if (!data.success) {
+                    previewEl.textContent = data.message;
+                    previewEl.className = 'mt-2 mb-0 text-warning';
+                    return;
+                }
+                const overLimit = data.max_stories && data.stories > data.max_stories;
+                previewEl.textContent = `${data.stories.toLocaleString()} of ${data.total_permutations.toLocaleString()} permutations will be generated`
+                    + (overLimit ? ` - more than the limit of ${data.max_stories.toLocaleString()}` : '');
+                previewEl.className = overLimit ? 'mt-2 mb-0 text-danger' : 'mt-2 mb-0 text-muted';
+            })
+            .catch(error => console.error('Could not preview generation:', error));
+    }, 300);
+}
+
+/**
+ * Shows how many stories have been saved while the generate request runs, by
+ * polling the run's progress under the id submitted with the form
+ */
+function trackGenerationProgress(form) {
+    const progressEl = document.getElementById('generation-progress');
+    const idInput = document.getElementById('generation-id');
+    if (!progressEl || !idInput) return;
+
+    const generationId = Array.from(crypto.getRandomValues(new Uint8Array(16)),
+                                    byte => byte.toString(16).padStart(2, '0')).join('');
+    idInput.value = generationId;
+    const url = form.dataset.progressUrl.replace('GENERATION_ID', generationId);
+    progressEl.textContent = 'Generating stories...';
+
+    const poll = () => {
+        fetch(url)
+            .then(response => response.json())
+            .then(data => {
+                if (data.success && data.total !== null) {
+                    progressEl.textContent = `Saved ${data.saved.toLocaleString()} of ${data.total.toLocaleString()} stories...`;
+                }
+                if (!data.success || data.status === 'running') setTimeout(poll, 500);
+            })
+            .catch(() => setTimeout(poll, 1000));
+    };
+    setTimeout(poll, 500);
+}
+
 /**
  * Associates a word with a field
  * @param {string} word - The word to associate
@@ -447,6 +516,18 @@ function initialize() {
         });
     });
 
+    ['generation-mode', 'sample-size'].forEach(id => {
+        const input = document.getElementById(id);
+        if (input) input.addEventListener('input', updateGenerationPreview);
+    });
+
+    const fieldsForm = document.getElementById('fields-form');
+    if (fieldsForm) {
+        fieldsForm.addEventListener('submit', e => {
+            if (e.submitter && e.submitter.name === 'generate') trackGenerationProgress(fieldsForm);
+        });
+    }
+
     initAddButtons();
     initClearButtons();
     setupDragDrop();
@@ -0,0 +1,180 @@
+"""
+Standalone job worker.
+
+Claims queued jobs from the job store and runs them with the same
+async_service.process_llm_requests code the web process uses, outside the web
+process. Run as many workers as you like (one event loop each, so one per core is
+a sensible ceiling); each claims jobs with a conditional UPDATE so a job only ever
+runs on one of them.
+
+Usage:
+    flask worker [--concurrency N] [--poll-interval SECONDS] [--exit-when-idle]
+    python -m app.worker [--concurrency N] [--poll-interval SECONDS] [--exit-when-idle]
+
+Set JOB_EXECUTION_MODE=worker for the web process so it queues jobs instead of
+running them itself.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import socket
+import time
+import uuid
+
+import click
+
+logger = logging.getLogger(__name__)
+
+
+class Worker:
+    """Runs up to max_jobs claimed jobs at once on its own event loop"""
+
+    def __init__(self, app, max_jobs=None, poll_interval=None, worker_id=None):
+        config = app.config
+        self.app = app
+        self.max_jobs = max(1, int(max_jobs or config.get("WORKER_MAX_CONCURRENT_JOBS", 5)))
+        self.poll_interval = float(poll_interval if poll_interval is not None else config.get("WORKER_POLL_INTERVAL_SEC", 1.0))
+        self.heartbeat_interval = config.get("WORKER_HEARTBEAT_SEC", 15)
+        self.stale_after = config.get("WORKER_STALE_AFTER_SEC", 120)
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.jobs_run = 0
+        self._running = {}  # job_id -> task
+        self._stop = None
+
+    def stop(self):
+        """Stop claiming jobs; running jobs are interrupted and put back on the queue"""
+        if self._stop is not None:
+            self._stop.set()
+
+    async def run(self, exit_when_idle=False):
+        """Claim and run jobs until stop() is called (or, with exit_when_idle, the queue is empty)"""
+        from app.services import llm_service
+
+        self._stop = asyncio.Event()
+        last_heartbeat = 0.0
+        logger.info(f"Worker {self.worker_id} started (max {self.max_jobs} concurrent jobs)")
+        try:
+            while not self._stop.is_set():
+                if time.monotonic() - last_heartbeat >= self.heartbeat_interval:
+                    await asyncio.to_thread(self._heartbeat)
+                    last_heartbeat = time.monotonic()
+
+                claimed = await self._claim_jobs()
+                if exit_when_idle and not claimed and not self._running:
+                    break
+
+                try:
+                    await asyncio.wait_for(self._stop.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            await self._interrupt_running_jobs()
+            await llm_service.close_async_clients()
+            logger.info(f"Worker {self.worker_id} stopped after {self.jobs_run} job(s)")
+
+    async def _claim_jobs(self):
+        claimed = 0
+        while len(self._running) < self.max_jobs:
+            job_id = await asyncio.to_thread(self._claim)
+            if job_id is None:
+                break
+            self._running[job_id] = asyncio.create_task(self._run_job(job_id))
+            claimed += 1
+        return claimed
+
+    def _claim(self):
+        from app.services import job_store
+        with self.app.app_context():
+            config = self.app.config
+            return job_store.claim_next_job(
+                self.worker_id,
+                interactive_max_items=config.get("SCHEDULER_INTERACTIVE_MAX_ITEMS", 20),
+                aging_sec=config.get("SCHEDULER_AGING_SEC", 300),
+            )
+
+    def _heartbeat(self):
+        from app.services import job_store
+        with self.app.app_context():
+            job_store.heartbeat(self.worker_id, list(self._running))
+            job_store.requeue_stale_jobs(self.stale_after)
+
+    async def _run_job(self, job_id):
+        from app.services import async_service
+        try:
+            with self.app.app_context():
+                job = async_service.get_job(job_id)
+            if job is None:
+                logger.error(f"Claimed job {job_id} could not be loaded")
+                return
+            params = job["params"]
+            await async_service.process_llm_requests(
+                self.app,
+                job_id,
+                params.get("model_id"),
+                params.get("story_ids"),
+                params.get("question_id"),
+                params.get("parameters"),
+                keep_alive=0,
+            )
+            self.jobs_run += 1
+        finally:
+            self._running.pop(job_id, None)
+            async_service.forget_job(job_id)
+
+    async def _interrupt_running_jobs(self):
+        if not self._running:
+            return
+        from app.services import job_store
+        job_ids = list(self._running)
+        tasks = list(self._running.values())
+        for task in tasks:
+            task.cancel()
+        # Cancelled jobs still flush the results they already have
+        await asyncio.gather(*tasks, return_exceptions=True)
+        with self.app.app_context():
+            released = job_store.release_jobs(self.worker_id, job_ids)
+        logger.info(f"Worker {self.worker_id} put {released} unfinished job(s) back on the queue")
+
+
+def run_worker(app, concurrency=None, poll_interval=None, exit_when_idle=False):
+    """Run a worker in the current thread until it is stopped with SIGINT/SIGTERM"""
+    worker = Worker(app, max_jobs=concurrency, poll_interval=poll_interval)
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, worker.stop)
+            except (NotImplementedError, RuntimeError):
+                pass  # e.g. Windows; Ctrl+C still raises KeyboardInterrupt
+        await worker.run(exit_when_idle=exit_when_idle)
+
+    asyncio.run(main())
+    return worker
+
+
+@click.command('worker')
+@click.option('--concurrency', type=int, default=None, help='Jobs to run at once (default WORKER_MAX_CONCURRENT_JOBS).')
+@click.option('--poll-interval', type=float, default=None, help='Seconds between polls of the job queue.')
+@click.option('--exit-when-idle', is_flag=True, help='Exit once the queue is empty instead of waiting for more jobs.')
+def worker_command(concurrency, poll_interval, exit_when_idle):
+    """Run queued LLM jobs outside the web process."""
+    from flask import current_app
+    run_worker(current_app._get_current_object(), concurrency, poll_interval, exit_when_idle)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run queued LLM jobs outside the web process.")
+    parser.add_argument('--concurrency', type=int, default=None, help='Jobs to run at once (default WORKER_MAX_CONCURRENT_JOBS).')
+    parser.add_argument('--poll-interval', type=float, default=None, help='Seconds between polls of the job queue.')
+    parser.add_argument('--exit-when-idle', action='store_true', help='Exit once the queue is empty instead of waiting for more jobs.')
+    args = parser.parse_args(argv)
+
+    from app import create_app
+    run_worker(create_app(), args.concurrency, args.poll_interval, args.exit_when_idle)
+
+
+if __name__ == '__main__':
+    main()
@@ -21,6 +21,106 @@ class Config:
 
     # API key for accessing the LLMs
     GROQ_API_KEY = os.environ.get('GROQ_API_KEY')
+    HF_API_KEY = os.environ.get('HF_API_KEY')
+
+    # Connection pool for the async provider clients (one pool per provider)
+    LLM_HTTP_MAX_CONNECTIONS = int(os.environ.get('LLM_HTTP_MAX_CONNECTIONS', 100))
+    LLM_HTTP_MAX_KEEPALIVE = int(os.environ.get('LLM_HTTP_MAX_KEEPALIVE', 20))
+    LLM_HTTP_TIMEOUT = float(os.environ.get('LLM_HTTP_TIMEOUT', 60))
+
+    # Failed provider calls that may succeed later (429, 5xx, timeouts) are retried up to
+    # LLM_RETRY_MAX_ATTEMPTS times in total with jittered exponential backoff, or after the
+    # wait the provider asks for in Retry-After (capped at LLM_RETRY_MAX_RETRY_AFTER_SEC).
+    # A 429 also pauses the model's shared rate limiter so other jobs back off too.
+    LLM_RETRY_MAX_ATTEMPTS = int(os.environ.get('LLM_RETRY_MAX_ATTEMPTS', 4))
+    LLM_RETRY_BASE_DELAY_SEC = 1.0
+    LLM_RETRY_MAX_DELAY_SEC = 30.0
+    LLM_RETRY_MAX_RETRY_AFTER_SEC = 120.0
+
+    # Per-provider circuit breaker: once CIRCUIT_BREAKER_MIN_CALLS of the last
+    # CIRCUIT_BREAKER_WINDOW calls are in and CIRCUIT_BREAKER_FAILURE_RATE of them failed
+    # (5xx, timeouts, connection errors), calls to the provider stop for
+    # CIRCUIT_BREAKER_OPEN_SEC and its jobs show as "paused". Then a probe call decides
+    # whether to resume or stay open.
+    CIRCUIT_BREAKER_ENABLED = os.environ.get('CIRCUIT_BREAKER_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    CIRCUIT_BREAKER_FAILURE_RATE = 0.5
+    CIRCUIT_BREAKER_MIN_CALLS = 10
+    CIRCUIT_BREAKER_WINDOW = 20
+    CIRCUIT_BREAKER_OPEN_SEC = float(os.environ.get('CIRCUIT_BREAKER_OPEN_SEC', 30))
+    CIRCUIT_BREAKER_HALF_OPEN_PROBES = 1
+
+    # Default number of in-flight LLM calls per job when a model doesn't set max_concurrency.
+    # 1 keeps the original one-at-a-time behaviour.
+    DEFAULT_MAX_CONCURRENCY = int(os.environ.get('DEFAULT_MAX_CONCURRENCY', 1))
+
+    # Rate limits are enforced per model (Model.requests_per_minute / tokens_per_minute)
+    # and optionally per provider, e.g. {"groq": {"requests_per_minute": 30, "tokens_per_minute": 6000}}
+    PROVIDER_RATE_LIMITS = {}
+    # How many seconds' worth of budget may be spent in a single burst
+    RATE_LIMIT_BURST_SECONDS = 1.0
+
+    # Opt-in cache of provider responses keyed by a hash of the request payload.
+    # By default only deterministic (temperature 0) requests are cached.
+    LLM_CACHE_ENABLED = os.environ.get('LLM_CACHE_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+    LLM_CACHE_DETERMINISTIC_ONLY = True
+    LLM_CACHE_MAX_ENTRIES = 50000
+    LLM_CACHE_MAX_AGE_SEC = 30 * 24 * 3600
+    LLM_CACHE_EVICT_EVERY = 100  # run eviction after this many new entries
+
+    # Stories in a job with identical text are sent once and the answer shared.
+    # "deterministic" only does so at temperature 0 (sampled answers are independent
+    # draws), "always" or "off". Each story gets its own Prompt/Response copy ("copy")
+    # or every duplicate points at the one Response ("link").
+    JOB_DEDUP_PROMPTS = os.environ.get('JOB_DEDUP_PROMPTS', 'deterministic').lower()
+    JOB_DEDUP_FANOUT = os.environ.get('JOB_DEDUP_FANOUT', 'copy').lower()
+
+    # Largest grid a parameter sweep job may expand to (per model)
+    SWEEP_MAX_COMBINATIONS = int(os.environ.get('SWEEP_MAX_COMBINATIONS', 200))
+
+    # Jobs load all their story texts before dispatching, this many ids per IN query
+    # (kept well under SQLite's bound-parameter limit)
+    STORY_PREFETCH_CHUNK_SIZE = 500
+
+    # Stories generated from a template are inserted this many per transaction
+    STORY_GENERATION_CHUNK_SIZE = int(os.environ.get('STORY_GENERATION_CHUNK_SIZE', 1000))
+    # Refuse to generate more stories than this from one template in one go
+    STORY_GENERATION_MAX_STORIES = int(os.environ.get('STORY_GENERATION_MAX_STORIES', 100000))
+
+    # Job results are written behind in batches: a batch is flushed once it holds
+    # RESPONSE_WRITE_BATCH_SIZE rows or its oldest row is RESPONSE_WRITE_FLUSH_MS old.
+    RESPONSE_WRITE_BATCH_SIZE = int(os.environ.get('RESPONSE_WRITE_BATCH_SIZE', 50))
+    RESPONSE_WRITE_FLUSH_MS = int(os.environ.get('RESPONSE_WRITE_FLUSH_MS', 200))
+
+    # Inline jobs share the background event loop through a scheduler: at most
+    # MAX_CONCURRENT_JOBS run at once, at most MAX_CONCURRENT_JOBS_PER_MODEL on one model,
+    # and the rest wait. Jobs of up to SCHEDULER_INTERACTIVE_MAX_ITEMS calls go ahead of
+    # bigger ones (workers claim in the same order); a waiting job moves up every
+    # SCHEDULER_AGING_SEC so big jobs still get their turn. Ties go to the user and
+    # model with the fewest running jobs.
+    MAX_CONCURRENT_JOBS = int(os.environ.get('MAX_CONCURRENT_JOBS', 5))
+    MAX_CONCURRENT_JOBS_PER_MODEL = int(os.environ.get('MAX_CONCURRENT_JOBS_PER_MODEL', 3))
+    SCHEDULER_INTERACTIVE_MAX_ITEMS = 20
+    SCHEDULER_AGING_SEC = 300
+
+    # How jobs run: "inline" on the web process's background event loop, or "worker" where
+    # the web process only queues them in the job store for `flask worker` / `python -m app.worker`
+    JOB_EXECUTION_MODE = os.environ.get('JOB_EXECUTION_MODE', 'inline')
+    WORKER_MAX_CONCURRENT_JOBS = int(os.environ.get('WORKER_MAX_CONCURRENT_JOBS', 5))
+    WORKER_POLL_INTERVAL_SEC = float(os.environ.get('WORKER_POLL_INTERVAL_SEC', 1.0))
+    WORKER_HEARTBEAT_SEC = 15
+    WORKER_STALE_AFTER_SEC = 120  # a claimed job whose worker hasn't checked in for this long is requeued
+
+    # Progress streams wake when the job changes; otherwise they send a keep-alive every
+    # SSE_HEARTBEAT_SEC. Jobs running in another process are re-read every SSE_STORE_POLL_SEC.
+    # A stream ends after SSE_RECONNECT_SEC and the page opens a new one (background tabs
+    # wait until they are shown again), so open tabs don't hold server threads indefinitely.
+    SSE_HEARTBEAT_SEC = 15
+    SSE_STORE_POLL_SEC = 2.0
+    SSE_RECONNECT_SEC = 60
+    # Streaming jobs push partial responses to progress streams at most this often
+    STREAM_PUBLISH_INTERVAL_SEC = 0.25
+    # Jobs sent as a provider batch check on it this often (batches take minutes to hours)
+    PROVIDER_BATCH_POLL_INTERVAL_SEC = int(os.environ.get('PROVIDER_BATCH_POLL_INTERVAL_SEC', 30))
 
     PER_PAGE = 10  # Number of items per page for pagination (NEED TO GO THROUGH ROUTES TO APPLY!)
 
@@ -160,14 +160,16 @@ INSERT INTO word_field (word_id, field_id) VALUES
 INSERT_PROVIDER = """
 INSERT INTO provider (provider_id, provider_name) VALUES
 (1, 'groq'),
-(2, 'huggingface');
+(2, 'huggingface'),
+(3, 'mock');
 """
 
 INSERT_MODEL = """
 INSERT INTO model (model_id, name, provider_id, endpoint, request_delay, parameters) VALUES
 (1, 'llama-3.3-70b-versatile', 1, 'placeholder', 2.5, '{  "parameters": [    {      "name": "temperature",      "description": "Controls the randomness of the output. Lower values make the output more deterministic, while higher values increase creativity.",      "type": "float",      "default": 0.7,      "min_value": 0.0,      "max_value": 1.0    },    {      "name": "max_tokens",      "description": "The maximum number of tokens to generate in the response.",      "type": "integer",      "default": 1024,      "min_value": 1,      "max_value": 2048    },    {      "name": "top_p",      "description": "Controls nucleus sampling, where the model considers only the most likely tokens with cumulative probability up to `top_p`.",      "type": "float",      "default": 0.8,      "min_value": 0.0,      "max_value": 1.0    }  ]}'),
 (2, 'gemma2-9b-it', 1, 'placeholder', 2.5, '{  "parameters": [    {      "name": "temperature",      "description": "Controls the randomness of the output. Lower values make the output more deterministic, while higher values increase creativity.",      "type": "float",      "default": 0.7,      "min_value": 0.0,      "max_value": 1.0    },    {      "name": "max_tokens",      "description": "The maximum number of tokens to generate in the response.",      "type": "integer",      "default": 1024,      "min_value": 1,      "max_value": 2048    },    {      "name": "top_p",      "description": "Controls nucleus sampling, where the model considers only the most likely tokens with cumulative probability up to `top_p`.",      "type": "float",      "default": 0.8,      "min_value": 0.0,      "max_value": 1.0    }  ]}'),
-(3, 'deepseek-r1-distill-llama-70b', 1, 'placeholder', 2.5, '{  "parameters": [    {      "name": "temperature",      "description": "Controls the randomness of the output. Lower values make the output more deterministic, while higher values increase creativity.",      "type": "float",      "default": 0.7,      "min_value": 0.0,      "max_value": 1.0    },    {      "name": "max_tokens",      "description": "The maximum number of tokens to generate in the response.",      "type": "integer",      "default": 1024,      "min_value": 1,      "max_value": 2048    },    {      "name": "top_p",      "description": "Controls nucleus sampling, where the model considers only the most likely tokens with cumulative probability up to `top_p`.",      "type": "float",      "default": 0.8,      "min_value": 0.0,      "max_value": 1.0    }  ]}');
+(3, 'deepseek-r1-distill-llama-70b', 1, 'placeholder', 2.5, '{  "parameters": [    {      "name": "temperature",      "description": "Controls the randomness of the output. Lower values make the output more deterministic, while higher values increase creativity.",      "type": "float",      "default": 0.7,      "min_value": 0.0,      "max_value": 1.0    },    {      "name": "max_tokens",      "description": "The maximum number of tokens to generate in the response.",      "type": "integer",      "default": 1024,      "min_value": 1,      "max_value": 2048    },    {      "name": "top_p",      "description": "Controls nucleus sampling, where the model considers only the most likely tokens with cumulative probability up to `top_p`.",      "type": "float",      "default": 0.8,      "min_value": 0.0,      "max_value": 1.0    }  ]}'),
+(4, 'mock-llm', 3, 'mock://?latency_ms=200&latency_sigma=0.5&error_rate=0&rate_limit_rate=0&response_tokens=100', 0, '{  "parameters": [    {      "name": "temperature",      "description": "Controls the randomness of the output. Lower values make the output more deterministic, while higher values increase creativity.",      "type": "float",      "default": 0.7,      "min_value": 0.0,      "max_value": 1.0    },    {      "name": "max_tokens",      "description": "The maximum number of tokens to generate in the response.",      "type": "integer",      "default": 1024,      "min_value": 1,      "max_value": 2048    },    {      "name": "top_p",      "description": "Controls nucleus sampling, where the model considers only the most likely tokens with cumulative probability up to `top_p`.",      "type": "float",      "default": 0.8,      "min_value": 0.0,      "max_value": 1.0    }  ]}');
 """
 INSERT_STORIES = """
 INSERT INTO story (content, template_id) VALUES
@@ -186,9 +188,9 @@ INSERT INTO question (content) VALUES
 INSERT_TEMPLATE = """
 INSERT INTO template (template_id, content) VALUES
 (1, 'Once upon a time in {country}, there was a {character} who loved {object}. One day, while [verb]ing, they found something shiny and {adjective}.'),
-(2, '{name}'s {number} friends came for dinner and shared {number} {food}.'),
-(3, 'The walked into the {adjective} {place}. A {adjective} man walked up to them. "Give me your {object}s." he said.');
-(4, 'The {animal} ate a {large_object} and became a {job_title}.')
+(2, '{name}''s {number} friends came for dinner and shared {number} {food}.'),
+(3, 'The walked into the {adjective} {place}. A {adjective} man walked up to them. "Give me your {object}s." he said.'),
+(4, 'The {animal} ate a {large_object} and became a {job_title}.');
 """
 # Functions to create tables and add data
 def create_tables(connection):
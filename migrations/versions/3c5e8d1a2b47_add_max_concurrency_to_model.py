@@ -0,0 +1,24 @@
+"""Add max_concurrency to model table
+
+Revision ID: 3c5e8d1a2b47
+Revises: 97f07a01f4c9
+Create Date: 2026-10-18 09:12:04.117532
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '3c5e8d1a2b47'
+down_revision = '97f07a01f4c9'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Nullable so existing models keep the configured default (serial) behaviour
+    with op.batch_alter_table('model', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('max_concurrency', sa.Integer(), nullable=True))
+
+def downgrade():
+    with op.batch_alter_table('model', schema=None) as batch_op:
+        batch_op.drop_column('max_concurrency')
@@ -0,0 +1,26 @@
+"""Add requests_per_minute and tokens_per_minute to model table
+
+Revision ID: 8f41b0c6d9e2
+Revises: 3c5e8d1a2b47
+Create Date: 2026-10-18 10:03:51.482096
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '8f41b0c6d9e2'
+down_revision = '3c5e8d1a2b47'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Both nullable: existing models keep using request_delay until limits are set
+    with op.batch_alter_table('model', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('requests_per_minute', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('tokens_per_minute', sa.Integer(), nullable=True))
+
+def downgrade():
+    with op.batch_alter_table('model', schema=None) as batch_op:
+        batch_op.drop_column('tokens_per_minute')
+        batch_op.drop_column('requests_per_minute')
@@ -0,0 +1,35 @@
+"""Add response_cache table
+
+Revision ID: b7d2e94f1a60
+Revises: 8f41b0c6d9e2
+Create Date: 2026-10-18 11:20:37.604418
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'b7d2e94f1a60'
+down_revision = '8f41b0c6d9e2'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        'response_cache',
+        sa.Column('cache_key', sa.String(length=64), primary_key=True),
+        sa.Column('provider_name', sa.String(length=255), nullable=False),
+        sa.Column('model_name', sa.String(length=255), nullable=False),
+        sa.Column('payload', sa.Text(), nullable=False),
+        sa.Column('response_content', sa.Text(), nullable=False),
+        sa.Column('full_response', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+        sa.Column('last_used_at', sa.DateTime(), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+        sa.Column('hit_count', sa.Integer(), nullable=False, server_default='0')
+    )
+    # Eviction removes the least recently used entries first
+    op.create_index('ix_response_cache_last_used_at', 'response_cache', ['last_used_at'])
+
+def downgrade():
+    op.drop_index('ix_response_cache_last_used_at', table_name='response_cache')
+    op.drop_table('response_cache')
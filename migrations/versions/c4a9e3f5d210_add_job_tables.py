@@ -0,0 +1,54 @@
+"""Add job and job_item tables
+
+Revision ID: c4a9e3f5d210
+Revises: b7d2e94f1a60
+Create Date: 2026-10-18 12:05:12.311904
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'c4a9e3f5d210'
+down_revision = 'b7d2e94f1a60'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        'job',
+        sa.Column('job_id', sa.String(length=36), primary_key=True),
+        sa.Column('run_id', sa.Integer(), sa.ForeignKey('run.run_id', ondelete='SET NULL'), nullable=True),
+        sa.Column('model_id', sa.Integer(), nullable=True),
+        sa.Column('question_id', sa.Integer(), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=False, server_default='initializing'),
+        sa.Column('total', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('completed', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('progress', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('params', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False)
+    )
+    op.create_index('ix_job_status', 'job', ['status'])
+
+    op.create_table(
+        'job_item',
+        sa.Column('job_item_id', sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column('job_id', sa.String(length=36), sa.ForeignKey('job.job_id', ondelete='CASCADE'), nullable=False),
+        sa.Column('position', sa.Integer(), nullable=False),
+        sa.Column('item_key', sa.String(length=64), nullable=False),
+        sa.Column('story_id', sa.Integer(), nullable=True),
+        sa.Column('prompt_id', sa.Integer(), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=False, server_default='pending'),
+        sa.Column('response_id', sa.Integer(), sa.ForeignKey('response.response_id', ondelete='SET NULL'), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.UniqueConstraint('job_id', 'item_key', name='uq_job_item_job_id_item_key')
+    )
+    op.create_index('ix_job_item_job_id', 'job_item', ['job_id'])
+
+def downgrade():
+    op.drop_index('ix_job_item_job_id', table_name='job_item')
+    op.drop_table('job_item')
+    op.drop_index('ix_job_status', table_name='job')
+    op.drop_table('job')
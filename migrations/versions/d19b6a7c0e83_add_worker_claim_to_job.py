@@ -0,0 +1,25 @@
+"""Add worker claim columns to job
+
+Revision ID: d19b6a7c0e83
+Revises: c4a9e3f5d210
+Create Date: 2026-10-18 13:02:44.918276
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'd19b6a7c0e83'
+down_revision = 'c4a9e3f5d210'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    with op.batch_alter_table('job', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('claimed_by', sa.String(length=255), nullable=True))
+        batch_op.add_column(sa.Column('heartbeat_at', sa.DateTime(), nullable=True))
+
+def downgrade():
+    with op.batch_alter_table('job', schema=None) as batch_op:
+        batch_op.drop_column('heartbeat_at')
+        batch_op.drop_column('claimed_by')
@@ -0,0 +1,28 @@
+"""Add the offline mock provider
+
+Revision ID: e5b8f2a94c17
+Revises: d19b6a7c0e83
+Create Date: 2026-10-18 15:20:11.402913
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'e5b8f2a94c17'
+down_revision = 'd19b6a7c0e83'
+branch_labels = None
+depends_on = None
+
+provider = sa.table('provider', sa.column('provider_name', sa.String))
+
+def upgrade():
+    connection = op.get_bind()
+    exists = connection.execute(
+        sa.select(sa.func.count()).select_from(provider).where(sa.func.lower(provider.c.provider_name) == 'mock')
+    ).scalar()
+    if not exists:
+        op.bulk_insert(provider, [{'provider_name': 'mock'}])
+
+def downgrade():
+    op.execute(provider.delete().where(provider.c.provider_name == 'mock'))
@@ -0,0 +1,32 @@
+"""Add generation table
+
+Revision ID: f3c61d8e2a95
+Revises: e5b8f2a94c17
+Create Date: 2026-10-18 18:10:42.118305
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'f3c61d8e2a95'
+down_revision = 'e5b8f2a94c17'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        'generation',
+        sa.Column('generation_id', sa.String(length=32), primary_key=True),
+        sa.Column('template_id', sa.Integer(), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=False, server_default='running'),
+        sa.Column('saved', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('total', sa.Integer(), nullable=True),
+        sa.Column('story_ranges', sa.Text(), nullable=False, server_default='[]'),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False)
+    )
+
+def downgrade():
+    op.drop_table('generation')
@@ -0,0 +1,207 @@
+"""
+End-to-end throughput benchmark for job execution.
+
+Runs story jobs through async_service.create_job -> process_llm_requests (on the
+service's own event loop, as the web app does) against the offline mock provider,
+and reports for each job size:
+
+    items/sec           stories completed per second of job wall time
+    overhead p50/p95    per-item time spent outside the provider call (ms): payload
+                        building, cache lookup, retries, saving, bookkeeping
+    commits             database commits during the job (and per item)
+    peak memory         peak Python heap while the job ran (tracemalloc)
+
+Usage (from the repository root):
+
+    python -m tests.benchmarks.bench_jobs                       # 10, 100, 1000, 10000 stories
+    python -m tests.benchmarks.bench_jobs --sizes 10 100 --latency-ms 50 --concurrency 20
+    python -m tests.benchmarks.bench_jobs --json baseline.json  # save a baseline
+    python -m tests.benchmarks.bench_jobs --compare baseline.json
+
+By default the provider answers instantly, so the numbers measure the engine itself.
+tracemalloc slows every run by a similar factor; compare runs made the same way.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from sqlalchemy import event, insert
+
+from tests.conftest import MockLLM
+
+DEFAULT_SIZES = (10, 100, 1000, 10000)
+QUESTION = "What happens in the story?"
+PARAMETERS = {"temperature": 0.7, "max_tokens": 64, "top_p": 0.9}
+
+
+def make_app(db_path, log_level=logging.WARNING):
+    from app import create_app, db
+
+    app = create_app({
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{db_path}",
+        "SQLALCHEMY_TRACK_MODIFICATIONS": False,
+        "SECRET_KEY": "benchmark",
+    })
+    # create_app logs everything at DEBUG; at 10,000 items that would be most of the work
+    logging.getLogger().setLevel(log_level)
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def seed(app, mock_llm, story_count, endpoint, concurrency):
+    """A mock model, a question and story_count stories. Returns (model_id, question_id, story_ids)."""
+    from app import db
+    from app.models import Question, Story
+
+    with app.app_context():
+        model = mock_llm.add_model(endpoint=endpoint, max_concurrency=concurrency)
+        question = Question(content=QUESTION)
+        db.session.add(question)
+        db.session.flush()
+        first_id = (db.session.query(db.func.max(Story.story_id)).scalar() or 0) + 1
+        db.session.execute(insert(Story), [
+            {"story_id": first_id + i, "content": f"Story {i}: a cat sat on a mat and watched the rain."}
+            for i in range(story_count)
+        ])
+        db.session.commit()
+        return model.model_id, question.question_id, list(range(first_id, first_id + story_count))
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+def run_job(app, mock_llm, model_id, story_ids, question_id, timeout=3600):
+    """Run one story job end to end and return its measurements"""
+    from app import db
+    from app.services import async_service
+
+    overheads = []
+    commits = 0
+    run_llm_call = async_service.run_llm_call
+
+    async def timed_call(*args, **kwargs):
+        spent = []
+        mock_llm.call_seconds.set(spent)
+        start = time.perf_counter()
+        try:
+            return await run_llm_call(*args, **kwargs)
+        finally:
+            overheads.append(time.perf_counter() - start - sum(spent))
+
+    def count_commit(connection):
+        nonlocal commits
+        commits += 1
+
+    with app.app_context():
+        engine = db.engine
+        job_id = async_service.create_job(model_id, story_ids, question_id, dict(PARAMETERS),
+                                          run_description="benchmark", bypass_cache=True)
+
+    async_service.run_llm_call = timed_call
+    mock_llm.install()
+    event.listen(engine, "commit", count_commit)
+    tracemalloc.start()
+    try:
+        start = time.perf_counter()
+        future = asyncio.run_coroutine_threadsafe(
+            async_service.process_llm_requests(app, job_id, model_id, story_ids, question_id,
+                                               dict(PARAMETERS), keep_alive=0),
+            async_service.get_event_loop(),
+        )
+        future.result(timeout)
+        elapsed = time.perf_counter() - start
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        event.remove(engine, "commit", count_commit)
+        async_service.run_llm_call = run_llm_call
+        mock_llm.uninstall()
+
+    with async_service.processing_jobs_lock:
+        job = async_service.processing_jobs.pop(job_id, {})
+    completed = job.get("completed", 0)
+    return {
+        "items": len(story_ids),
+        "completed": completed,
+        "status": job.get("status"),
+        "seconds": round(elapsed, 3),
+        "items_per_sec": round(completed / elapsed, 1) if elapsed else 0.0,
+        "overhead_p50_ms": round(_percentile(overheads, 50) * 1000, 3),
+        "overhead_p95_ms": round(_percentile(overheads, 95) * 1000, 3),
+        "commits": commits,
+        "commits_per_item": round(commits / max(1, len(story_ids)), 3),
+        "peak_memory_mb": round(peak_memory / 2**20, 2),
+    }
+
+
+def run_benchmark(app, sizes=DEFAULT_SIZES, latency_ms=0, error_rate=0.0, concurrency=50):
+    """Seed enough stories for the largest job, then run one job per size"""
+    endpoint = f"mock://?latency_ms={latency_ms}&latency_sigma={0.5 if latency_ms else 0}&error_rate={error_rate}"
+    app.config.update(LLM_RETRY_BASE_DELAY_SEC=0.001)
+    mock_llm = MockLLM(record_payloads=False)
+    model_id, question_id, story_ids = seed(app, mock_llm, max(sizes), endpoint, concurrency)
+    return [run_job(app, mock_llm, model_id, story_ids[:size], question_id) for size in sizes]
+
+
+def format_results(results, baseline=None):
+    columns = ("items", "seconds", "items_per_sec", "overhead_p50_ms", "overhead_p95_ms",
+               "commits", "commits_per_item", "peak_memory_mb")
+    by_size = {row["items"]: row for row in (baseline or [])}
+    lines = ["  ".join(f"{column:>16}" for column in columns)]
+    for row in results:
+        lines.append("  ".join(f"{row[column]:>16}" for column in columns))
+        before = by_size.get(row["items"])
+        if before:
+            changes = []
+            for column in columns[1:]:
+                if before.get(column):
+                    changes.append(f"{(row[column] - before[column]) / before[column]:>+15.1%}")
+                else:
+                    changes.append(f"{'-':>15}")
+            lines.append(f"{'vs baseline':>16}  " + "  ".join(f"{change:>16}" for change in changes))
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark job execution against the mock provider")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="stories per job")
+    parser.add_argument("--latency-ms", type=float, default=0, help="median simulated provider latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of provider calls failing with a 503")
+    parser.add_argument("--concurrency", type=int, default=50, help="the model's max_concurrency")
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--compare", help="show changes against results saved with --json")
+    args = parser.parse_args(argv)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+
+    db_fd, db_path = tempfile.mkstemp(suffix=".db")
+    os.close(db_fd)
+    try:
+        app = make_app(db_path)
+        results = run_benchmark(app, args.sizes, args.latency_ms, args.error_rate, args.concurrency)
+    finally:
+        os.unlink(db_path)
+
+    print(format_results(results, baseline))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"settings": vars(args), "results": results}, f, indent=2)
+    return 0 if all(row["completed"] == row["items"] for row in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,20 @@
+from app.services import async_service
+from tests.benchmarks import bench_jobs
+
+
+class TestJobBenchmark:
+    def test_small_run_reports_every_measurement(self, app):
+        results = bench_jobs.run_benchmark(app, sizes=(5, 10), latency_ms=1, concurrency=4)
+
+        assert [row["items"] for row in results] == [5, 10]
+        for row in results:
+            assert row["completed"] == row["items"]
+            assert row["status"] == "completed"
+            assert row["items_per_sec"] > 0
+            assert row["overhead_p95_ms"] >= row["overhead_p50_ms"] >= 0
+            assert row["commits"] > 0
+            assert row["peak_memory_mb"] > 0
+        assert not async_service.processing_jobs
+
+        report = bench_jobs.format_results(results, baseline=results)
+        assert report.count("vs baseline") == 2
@@ -1,9 +1,11 @@
 # This allows me to share fixtures (test data) across different files/modules (real python https://realpython.com/pytest-python-testing/)
 
+import contextvars
 import datetime
 import logging
 import os
 import tempfile
+import time
 
 import pytest
 from sqlalchemy import event, text
@@ -426,4 +428,71 @@ def dummy_job_exception():
     from app.services import async_service
     async_service.processing_jobs['job1'] = {"task": DummyTask(), "status": "running", "processing": True}
     yield
-    async_service.processing_jobs.clear()
\ No newline at end of file
+    async_service.processing_jobs.clear()
+
+class MockLLM:
+    """The offline mock provider, the Model rows that point at it and a record of its calls.
+
+    install() wraps the provider's complete_async so tests can see what was sent and how
+    many calls overlapped; uninstall() puts the provider back. Needs an app context.
+    """
+
+    def __init__(self, record_payloads=True):
+        from app.services import providers
+
+        self.provider = providers.get_provider("mock")
+        self.record_payloads = record_payloads
+        self.calls = []          # (model_name, payload) for every call answered
+        self.in_flight = []      # model names of the calls currently waiting on the mock
+        self.peak = 0            # most calls in flight at once
+        self.overlapped = set()  # every set of models that had calls in flight together
+        # Set this to a list in the calling context to collect each call's seconds
+        self.call_seconds = contextvars.ContextVar("mock_call_seconds", default=None)
+        self._provider_id = None
+
+    def add_model(self, name="mock-llm", endpoint="mock://?latency_ms=0", **columns):
+        if self._provider_id is None:
+            provider = Provider(provider_name="mock")
+            db.session.add(provider)
+            db.session.commit()
+            self._provider_id = provider.provider_id
+        columns.setdefault("request_delay", 0)
+        columns.setdefault("parameters", "{}")
+        model = Model(name=name, provider_id=self._provider_id, endpoint=endpoint, **columns)
+        db.session.add(model)
+        db.session.commit()
+        return model
+
+    def install(self):
+        self.provider.reset()
+        complete_async = self.provider.complete_async
+
+        async def recording(model_name, payload, endpoint=None):
+            if self.record_payloads:
+                self.calls.append((model_name, payload))
+            self.in_flight.append(model_name)
+            self.peak = max(self.peak, len(self.in_flight))
+            self.overlapped.add(frozenset(self.in_flight))
+            start = time.perf_counter()
+            try:
+                return await complete_async(model_name, payload, endpoint)
+            finally:
+                self.in_flight.remove(model_name)
+                spent = self.call_seconds.get()
+                if spent is not None:
+                    spent.append(time.perf_counter() - start)
+
+        self.provider.complete_async = recording
+        return self
+
+    def uninstall(self):
+        self.provider.__dict__.pop("complete_async", None)
+        self.provider.reset()
+
+
+@pytest.fixture
+def mock_llm(session):
+    """A MockLLM with its recorder installed for the test"""
+    mock = MockLLM().install()
+    yield mock
+    mock.uninstall()
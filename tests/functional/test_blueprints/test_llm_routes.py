@@ -0,0 +1,144 @@
+import threading
+import time
+
+import pytest
+
+from app.services import async_service
+
+
+@pytest.fixture(autouse=True)
+def clear_jobs():
+    yield
+    async_service.processing_jobs.clear()
+
+
+def test_progress_stream_wakes_on_completion(app, client, test_data):
+    app.config["SSE_HEARTBEAT_SEC"] = 30
+    app.config["SSE_STORE_POLL_SEC"] = 30
+    with app.app_context():
+        job_id = async_service.create_job(
+            test_data["ids"]["models"][0], test_data["ids"]["stories"][:2], test_data["ids"]["questions"][0], {}
+        )
+        async_service.set_job_status(job_id, "running")
+    # Pretend this process is running the job, so the stream relies on notifications
+    async_service.processing_jobs[job_id]["task"] = object()
+
+    def finish():
+        with app.app_context():
+            async_service.set_job_status(job_id, "completed")
+
+    threading.Timer(0.2, finish).start()
+    start = time.monotonic()
+    body = client.get(f"/llm/progress_stream/{job_id}").get_data(as_text=True)
+
+    assert time.monotonic() - start < 5
+    assert '"status": "completed"' in body
+    assert "keepalive" not in body
+
+
+def test_progress_stream_ends_for_the_page_to_reconnect(app, client, test_data):
+    app.config.update(SSE_HEARTBEAT_SEC=30, SSE_STORE_POLL_SEC=30, SSE_RECONNECT_SEC=0.3)
+    with app.app_context():
+        job_id = async_service.create_job(
+            test_data["ids"]["models"][0], test_data["ids"]["stories"][:2], test_data["ids"]["questions"][0], {}
+        )
+        async_service.set_job_status(job_id, "running")
+    async_service.processing_jobs[job_id]["task"] = object()
+
+    start = time.monotonic()
+    body = client.get(f"/llm/progress_stream/{job_id}").get_data(as_text=True)
+
+    assert time.monotonic() - start < 5
+    assert body.startswith("retry: ")
+    assert '"status": "reconnect"' in body
+
+
+def test_progress_stream_unknown_job(client):
+    response = client.get("/llm/progress_stream/not-a-job")
+    assert response.status_code == 404
+
+
+def test_comparing_models_creates_one_job_for_all_of_them(app, client, session, test_data):
+    from app.models import Model
+
+    model_ids = test_data["ids"]["models"][:2]
+    for model_id in model_ids:
+        session.get(Model, model_id).parameters = '{"parameters": []}'
+    session.commit()
+    with client.session_transaction() as browser:
+        browser["story_ids"] = [str(sid) for sid in test_data["ids"]["stories"][:3]]
+        browser["question_id"] = test_data["ids"]["questions"][0]
+
+    response = client.post("/llm/select_model", data={"compare": "1", "compare_model_ids": [str(m) for m in model_ids]})
+    assert response.headers["Location"].endswith("/llm/select_parameters")
+    client.post("/llm/select_parameters", data={"temperature": "0.5"})
+    client.get("/llm/loading")
+
+    with client.session_transaction() as browser:
+        job = async_service.processing_jobs[browser["job_id"]]
+    assert [variant["model_id"] for variant in job["params"]["variants"]] == model_ids
+    assert job["total"] == 6
+
+
+def test_parameter_sweep_creates_one_variant_per_grid_point(app, client, session, test_data):
+    from app.models import Model
+
+    model = session.get(Model, test_data["ids"]["models"][0])
+    model.parameters = '{"parameters": [{"name": "temperature", "type": "float", "default": 0.7, "min_value": 0, "max_value": 1}]}'
+    session.commit()
+    with client.session_transaction() as browser:
+        browser["story_ids"] = [str(sid) for sid in test_data["ids"]["stories"][:2]]
+        browser["question_id"] = test_data["ids"]["questions"][0]
+        browser["model_id"] = model.model_id
+
+    refused = client.post("/llm/select_parameters", data={"temperature": "0.5", "sweep_temperature": "0.5, 3"})
+    assert refused.headers["Location"].endswith("/llm/select_parameters")
+
+    client.post("/llm/select_parameters", data={"temperature": "0.5", "sweep_temperature": "0.2, 0.8"})
+    client.get("/llm/loading")
+
+    with client.session_transaction() as browser:
+        job = async_service.processing_jobs[browser["job_id"]]
+    assert [variant["parameters"]["temperature"] for variant in job["params"]["variants"]] == [0.2, 0.8]
+    assert job["total"] == 4
+
+
+def test_reloading_the_loading_page_does_not_requeue_a_claimed_job(app, client, test_data):
+    from app.services import job_store
+
+    app.config["JOB_EXECUTION_MODE"] = "worker"
+    with app.app_context():
+        job_id = async_service.create_job(
+            test_data["ids"]["models"][0], test_data["ids"]["stories"][:2], test_data["ids"]["questions"][0], {}
+        )
+
+    assert client.get(f"/llm/start_processing/{job_id}").get_json()["status"] == "queued"
+    with app.app_context():
+        assert job_store.claim_next_job("worker-a") == job_id
+
+    assert client.get(f"/llm/start_processing/{job_id}").get_json()["status"] == "running"
+    with app.app_context():
+        assert job_store.claim_next_job("worker-b") is None
+
+
+def test_a_job_started_by_another_web_process_is_not_started_again(app, client, session, test_data, monkeypatch):
+    from app.models import Job
+    from app.services import job_store
+
+    with app.app_context():
+        job_id = async_service.create_job(
+            test_data["ids"]["models"][0], test_data["ids"]["stories"][:2], test_data["ids"]["questions"][0], {}
+        )
+        assert job_store.claim_job(job_id, "web:other-host:1")
+        job_store.set_status(job_id, "running")
+    # This process only knows the job from the store
+    async_service.processing_jobs.clear()
+    monkeypatch.setattr(async_service, "run_scheduled_job",
+                        lambda *args, **kwargs: pytest.fail("the job was started a second time"))
+
+    body = client.get(f"/llm/start_processing/{job_id}").get_json()
+
+    assert body["status"] == "running"
+    assert session.get(Job, job_id).claimed_by == "web:other-host:1"
+    with app.app_context():
+        assert not job_store.claim_job(job_id, "web:this-host:2")
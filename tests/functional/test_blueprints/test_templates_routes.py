@@ -167,7 +167,7 @@ def test_generate_stories_post_new_category_success(client, templates_url_map, m
     mock_add_category = mocker.patch("app.services.category_service.add_category", return_value=123)
     # Patch generate_stories to capture category_ids
     called = {}
-    def fake_generate_stories(template_id_arg, field_data_arg, category_ids_arg=None):
+    def fake_generate_stories(template_id_arg, field_data_arg, category_ids_arg=None, **options):
         called["category_ids"] = category_ids_arg
         return [1]
     mocker.patch("app.services.story_builder_service.generate_stories", side_effect=fake_generate_stories)
@@ -266,17 +266,60 @@ def test_generate_stories_post_update_fields(client, templates_url_map, mocker,
     assert response.status_code == 200
     assert b"Fields updated successfully" in response.data
 
-def test_display_generated_stories(client, templates_url_map, mocker):
-    """Test GET /templates/display_generated_stories shows generated stories."""
+def test_display_generated_stories(client, templates_url_map, test_data):
+    """Test GET /templates/display_generated_stories pages the run's stories without copying their ids."""
+    from app.services import story_builder_service
+    template_id = test_data["ids"]["templates"][0]
+    story_ids = test_data["ids"]["stories"]
+    generation_id = story_builder_service.start_generation(template_id)
+    story_builder_service.finish_generation(generation_id, story_ids)
     with client.session_transaction() as sess:
-        sess["generated_story_ids"] = [1, 2]
-    mocker.patch(
-        "app.services.story_service.get_story_by_id",
-        side_effect=lambda sid: type("Story", (), {"id": sid, "content": f"Story {sid}"})()
-    )
+        sess["generation_id"] = generation_id
+
+    response = client.get(url_for(templates_url_map["display_generated_stories"], page=2, per_page=1))
+    assert response.status_code == 200
+    from app.models import Story
+    second_story = Story.query.get(sorted(story_ids)[1])
+    assert second_story.content.encode() in response.data
+    assert f"2 – 2 of {len(story_ids)} stories".encode() in response.data
+    with client.session_transaction() as sess:
+        assert "story_ids" not in sess
+        assert sess["template_ids"] == [str(template_id)]
+
+def test_display_generated_stories_unknown_run(client, templates_url_map):
+    """Test GET /templates/display_generated_stories warns when the run isn't known."""
+    with client.session_transaction() as sess:
+        sess["generation_id"] = "a" * 32
     response = client.get(url_for(templates_url_map["display_generated_stories"]))
     assert response.status_code == 200
-    assert b"Story 1" in response.data or b"Story 2" in response.data
+    assert b"no longer available" in response.data
+
+def test_generate_stories_keeps_only_a_generation_reference_in_the_session(client, templates_url_map, test_data):
+    """Test POST /generate_stories tracks the run in the database and reports its progress."""
+    template_id = str(test_data["ids"]["templates"][0])
+    generation_id = "b" * 32
+    with client.session_transaction() as sess:
+        sess["template_id"] = template_id
+    response = client.post(
+        url_for(templates_url_map["generate_stories"]),
+        data={
+            "generate": "1",
+            "field_data": json.dumps({"animal": ["cat", "dog"], "action": ["run"]}),
+            "template_id": template_id,
+            "generation_id": generation_id,
+        },
+    )
+    assert response.status_code == 302
+    with client.session_transaction() as sess:
+        assert sess["generation_id"] == generation_id
+        assert "generated_story_ids" not in sess
+
+    progress = client.get(url_for("templates.generation_progress", generation_id=generation_id)).get_json()
+    assert progress == {"success": True, "status": "completed", "saved": 2, "total": 2, "error": None}
+    assert client.get(url_for("templates.generation_progress", generation_id="c" * 32)).status_code == 404
+
+    response = client.get(url_for(templates_url_map["display_generated_stories"]))
+    assert b"This is a cat template with run." in response.data
 
 def test_add_word_ajax(client, templates_url_map, mocker):
     """Test POST /templates/add_word via AJAX."""
@@ -402,3 +445,48 @@ def test_generate_stories_get_sets_template_id_from_query(client, templates_url_
     with client.session_transaction() as sess:
         assert sess["template_id"] == template_id
 
+
+def test_preview_generation_reports_sampled_count(client, test_data):
+    """Test POST /templates/preview_generation sizes a sample without writing stories."""
+    template_id = test_data["ids"]["templates"][0]
+    response = client.post(
+        url_for("templates.preview_generation"),
+        json={
+            "template_id": template_id,
+            "field_data": {"animal": ["cat", "dog", "owl"], "action": ["run", "jump"]},
+            "generation_mode": "random",
+            "sample_size": "4",
+        },
+    )
+    data = response.get_json()
+    assert data["success"] is True
+    assert data["total_permutations"] == 6
+    assert data["stories"] == 4
+
+def test_preview_generation_rejects_unknown_mode(client, test_data):
+    """Test POST /templates/preview_generation returns 400 for an unknown mode."""
+    response = client.post(
+        url_for("templates.preview_generation"),
+        json={"template_id": test_data["ids"]["templates"][0], "generation_mode": "everything"},
+    )
+    assert response.status_code == 400
+    assert "Unknown generation mode" in response.get_json()["message"]
+
+def test_preview_generation_rejects_fields_without_words(client, test_data, monkeypatch):
+    """Test POST /templates/preview_generation returns 400 for empty fields instead of prompting."""
+    monkeypatch.setattr("builtins.input", lambda prompt: pytest.fail("input() called in a web request"))
+    response = client.post(
+        url_for("templates.preview_generation"),
+        json={"template_id": test_data["ids"]["templates"][0], "field_data": {"animal": [], "action": ["run"]}},
+    )
+    assert response.status_code == 400
+    assert "animal" in response.get_json()["message"]
+
+def test_preview_generation_rejects_non_numeric_sample_size(client, test_data):
+    """Test POST /templates/preview_generation returns 400 when the sample size isn't a number."""
+    response = client.post(
+        url_for("templates.preview_generation"),
+        json={"template_id": test_data["ids"]["templates"][0], "generation_mode": "random", "sample_size": "ten"},
+    )
+    assert response.status_code == 400
+    assert "Sample size" in response.get_json()["message"]
@@ -0,0 +1,17 @@
+import sqlite3
+
+import database
+
+
+class TestSeedScripts:
+    def test_tables_and_seed_data_load_into_a_fresh_database(self):
+        connection = sqlite3.connect(":memory:")
+        database.create_tables(connection)
+        database.insert_initial_data(connection)
+
+        models = dict(connection.execute("SELECT name, endpoint FROM model").fetchall())
+        assert models["mock-llm"].startswith("mock://")
+        assert connection.execute("SELECT COUNT(*) FROM provider").fetchone()[0] == 3
+        assert connection.execute("SELECT COUNT(*) FROM template").fetchone()[0] == 4
+        assert connection.execute("SELECT COUNT(*) FROM word_field").fetchone()[0] > 0
+        connection.close()
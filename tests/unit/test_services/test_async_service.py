@@ -0,0 +1,324 @@
+import asyncio
+
+import pytest
+
+from app.models import Model
+from app.services import async_service
+
+
+@pytest.fixture(autouse=True)
+def clear_jobs():
+    yield
+    async_service.processing_jobs.clear()
+
+
+class TestRunBounded:
+    def test_never_exceeds_max_concurrency(self):
+        in_flight = 0
+        peak = 0
+        seen = []
+
+        async def worker(index, item):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            seen.append(item)
+            in_flight -= 1
+
+        asyncio.run(async_service._run_bounded(list(range(20)), worker, 4))
+        assert peak == 4
+        assert sorted(seen) == list(range(20))
+
+    def test_serial_when_limit_is_one(self):
+        order = []
+
+        async def worker(index, item):
+            order.append(index)
+            await asyncio.sleep(0)
+
+        asyncio.run(async_service._run_bounded(["a", "b", "c"], worker, 1))
+        assert order == [0, 1, 2]
+
+
+class TestProcessStories:
+    def test_results_recorded_for_every_story(self, app, session, test_data, monkeypatch):
+        model_id = test_data["ids"]["models"][0]
+        model = session.get(Model, model_id)
+        model.request_delay = 0
+        model.max_concurrency = 3
+        session.commit()
+        story_ids = test_data["ids"]["stories"][:6]
+        question_id = test_data["ids"]["questions"][0]
+
+        job_id = async_service.create_job(model_id, story_ids, question_id, {})
+        async_service.processing_jobs[job_id]["status"] = "running"
+
+        in_flight = 0
+        peak = 0
+
+        async def fake_call(app, provider_name, story_content, question_content, story_id, *args, **kwargs):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return {"response_id": story_id * 10}
+
+        monkeypatch.setattr(async_service, "run_llm_call", fake_call)
+        asyncio.run(async_service.process_stories(app, job_id, model_id, story_ids, question_id, {}))
+
+        job = async_service.processing_jobs[job_id]
+        assert peak == 3
+        assert job["completed"] == len(story_ids)
+        assert job["progress"] == 100
+        assert job["results"] == {sid: {"response_id": sid * 10} for sid in story_ids}
+
+
+class TestCircuitBreaker:
+    def test_job_pauses_while_provider_circuit_is_open(self, app, session, test_data, monkeypatch):
+        from app.services import circuit_breaker, llm_service
+
+        circuit_breaker.reset_breakers()
+        app.config.update(CIRCUIT_BREAKER_MIN_CALLS=2, CIRCUIT_BREAKER_WINDOW=2, CIRCUIT_BREAKER_OPEN_SEC=0.3)
+        model_id = test_data["ids"]["models"][0]
+        model = session.get(Model, model_id)
+        model.request_delay = 0
+        model.max_concurrency = 2
+        session.commit()
+        story_ids = test_data["ids"]["stories"][:4]
+        question_id = test_data["ids"]["questions"][0]
+
+        with app.app_context():
+            breaker = llm_service.get_provider_breaker(llm_service.get_provider_name_by_model_id(model_id))
+        breaker.record_failure()
+        breaker.record_failure()
+        assert breaker.state == circuit_breaker.OPEN
+
+        job_id = async_service.create_job(model_id, story_ids, question_id, {})
+        async_service.processing_jobs[job_id]["status"] = "running"
+        statuses = []
+        set_job_status = async_service.set_job_status
+        monkeypatch.setattr(async_service, "set_job_status",
+                            lambda job_id, status, error=None: (statuses.append(status), set_job_status(job_id, status, error)))
+
+        async def fake_call(app, provider_name, story_content, question_content, story_id, *args, **kwargs):
+            # Mirrors llm_service: refused while open, a success closes a half-open breaker
+            if not breaker.allow():
+                return {"error": "circuit open", "circuit_open": True}
+            await asyncio.sleep(0.01)
+            breaker.record_success()
+            return {"response_id": story_id * 10}
+
+        monkeypatch.setattr(async_service, "run_llm_call", fake_call)
+        asyncio.run(async_service.process_stories(app, job_id, model_id, story_ids, question_id, {}))
+
+        job = async_service.processing_jobs[job_id]
+        assert statuses[:2] == ["paused", "running"]
+        assert job["results"] == {sid: {"response_id": sid * 10} for sid in story_ids}
+        circuit_breaker.reset_breakers()
+
+
+    def test_paused_job_notices_a_cancel_made_through_the_job_store(self, app, session, test_data):
+        import threading
+        import time
+
+        from app.services import circuit_breaker, job_store, llm_service
+
+        circuit_breaker.reset_breakers()
+        app.config.update(CIRCUIT_BREAKER_MIN_CALLS=2, CIRCUIT_BREAKER_WINDOW=2, CIRCUIT_BREAKER_OPEN_SEC=60)
+        model_id = test_data["ids"]["models"][0]
+        provider_name = llm_service.get_provider_name_by_model_id(model_id)
+        breaker = llm_service.get_provider_breaker(provider_name)
+        breaker.record_failure()
+        breaker.record_failure()
+        job_id = async_service.create_job(model_id, test_data["ids"]["stories"][:1], test_data["ids"]["questions"][0], {})
+
+        def cancel_elsewhere():
+            with app.app_context():
+                job_store.set_status(job_id, "cancelled")
+
+        threading.Timer(0.2, cancel_elsewhere).start()
+        start = time.monotonic()
+        assert asyncio.run(async_service._wait_for_provider(app, job_id, provider_name)) is False
+        assert time.monotonic() - start < 5
+        assert async_service.processing_jobs[job_id]["status"] == "cancelled"
+        circuit_breaker.reset_breakers()
+
+
+class TestStreamingPartials:
+    def test_partials_are_kept_until_the_item_finishes(self, app, session, test_data):
+        job_id = async_service.create_job(
+            test_data["ids"]["models"][0], test_data["ids"]["stories"][:2], test_data["ids"]["questions"][0], {},
+            stream=True,
+        )
+        job = async_service.processing_jobs[job_id]
+        on_token = async_service._stream_to_job(job, 7, publish_interval=0)
+
+        on_token("Once")
+        on_token("Once upon")
+        assert async_service.get_partials(job_id) == {7: "Once upon"}
+
+        async_service._record_result(job, 7, {"response_id": 1})
+        assert async_service.get_partials(job_id) == {}
+
+
+class TestDeduplication:
+    def _job(self, session, test_data, mock_llm):
+        from app.models import Story
+
+        model = mock_llm.add_model()
+        copies = [Story(content="The same story.") for _ in range(3)]
+        session.add_all(copies)
+        session.commit()
+        story_ids = [story.story_id for story in copies] + test_data["ids"]["stories"][:2]
+        return model, story_ids
+
+    def _run(self, app, model, story_ids, question_id, parameters):
+        job_id = async_service.create_job(model.model_id, story_ids, question_id, parameters)
+        async_service.processing_jobs[job_id]["status"] = "running"
+        asyncio.run(async_service.process_stories(app, job_id, model.model_id, story_ids, question_id, parameters))
+        return async_service.processing_jobs[job_id]
+
+    def test_identical_prompts_are_sent_once_and_copied(self, app, session, test_data, mock_llm):
+        from app.models import Response
+
+        model, story_ids = self._job(session, test_data, mock_llm)
+        parameters = {"temperature": 0, "max_tokens": 10, "top_p": 1}
+        job = self._run(app, model, story_ids, test_data["ids"]["questions"][0], parameters)
+
+        assert len(mock_llm.calls) == 3
+        assert job["completed"] == len(story_ids)
+        saved = session.query(Response).filter_by(run_id=job["run_id"]).all()
+        assert sorted(response.prompt.story_id for response in saved) == sorted(story_ids)
+        assert len({response.response_content for response in saved if response.prompt.story_id in story_ids[:3]}) == 1
+
+    def test_link_mode_shares_one_response(self, app, session, test_data, mock_llm):
+        model, story_ids = self._job(session, test_data, mock_llm)
+        app.config["JOB_DEDUP_FANOUT"] = "link"
+        parameters = {"temperature": 0, "max_tokens": 10, "top_p": 1}
+        job = self._run(app, model, story_ids, test_data["ids"]["questions"][0], parameters)
+
+        assert len(mock_llm.calls) == 3
+        assert len({job["results"][sid]["response_id"] for sid in story_ids[:3]}) == 1
+
+    def test_linked_duplicates_count_as_answered_when_resuming(self, app, session, test_data, mock_llm):
+        model, story_ids = self._job(session, test_data, mock_llm)
+        app.config["JOB_DEDUP_FANOUT"] = "link"
+        parameters = {"temperature": 0, "max_tokens": 10, "top_p": 1}
+        question_id = test_data["ids"]["questions"][0]
+        job_id = async_service.create_job(model.model_id, story_ids, question_id, parameters)
+        asyncio.run(async_service.process_llm_requests(app, job_id, model.model_id, story_ids, question_id, parameters,
+                                                       keep_alive=0))
+
+        assert len(mock_llm.calls) == 3
+        assert async_service.resume_run(async_service.processing_jobs[job_id]["run_id"]) == (None, 0)
+
+    def test_sampled_prompts_are_not_collapsed_by_default(self, app, session, test_data, mock_llm):
+        model, story_ids = self._job(session, test_data, mock_llm)
+        parameters = {"temperature": 0.7, "max_tokens": 10, "top_p": 1}
+        job = self._run(app, model, story_ids, test_data["ids"]["questions"][0], parameters)
+
+        assert len(mock_llm.calls) == len(story_ids)
+        assert job["completed"] == len(story_ids)
+
+
+class TestMultiModelJobs:
+    def test_every_story_goes_to_every_model_side_by_side(self, app, session, test_data, mock_llm):
+        from app.models import Response
+
+        models = [mock_llm.add_model(name, "mock://?latency_ms=20", max_concurrency=2) for name in ("mock-a", "mock-b")]
+        story_ids = test_data["ids"]["stories"][:4]
+        question_id = test_data["ids"]["questions"][0]
+        variants = async_service.model_variants([model.model_id for model in models],
+                                                {"temperature": 0.3, "max_tokens": 10, "top_p": 1})
+        job_id = async_service.create_job(None, story_ids, question_id, {}, variants=variants)
+
+        asyncio.run(async_service.process_llm_requests(app, job_id, None, story_ids, question_id, {}, keep_alive=0))
+
+        job = async_service.processing_jobs[job_id]
+        assert job["status"] == "completed"
+        assert job["total"] == job["completed"] == 8
+        assert set(job["results"]) == {f"{index}:{sid}" for index in (0, 1) for sid in story_ids}
+        saved = session.query(Response).filter_by(run_id=job["run_id"]).all()
+        assert sorted((r.prompt.model_id, r.prompt.story_id) for r in saved) == sorted(
+            (model.model_id, sid) for model in models for sid in story_ids
+        )
+        assert frozenset({"mock-a", "mock-b"}) in mock_llm.overlapped
+
+    def test_sweep_variants_share_the_models_concurrency(self, app, session, test_data, mock_llm):
+        from app.models import Response
+
+        model = mock_llm.add_model(endpoint="mock://?latency_ms=5", max_concurrency=2)
+        story_ids = test_data["ids"]["stories"][:4]
+        question_id = test_data["ids"]["questions"][0]
+        grid = [{"temperature": t, "max_tokens": 10, "top_p": 1} for t in (0.2, 0.5, 0.8)]
+        job_id = async_service.create_job(None, story_ids, question_id, {},
+                                          variants=async_service.model_variants([model.model_id], {}, grid))
+
+        asyncio.run(async_service.process_llm_requests(app, job_id, None, story_ids, question_id, {}, keep_alive=0))
+
+        job = async_service.processing_jobs[job_id]
+        assert job["completed"] == 12
+        assert mock_llm.peak == 2
+        saved = session.query(Response).filter_by(run_id=job["run_id"]).all()
+        assert sorted(r.prompt.temperature for r in saved) == sorted([0.2, 0.5, 0.8] * 4)
+
+
+class TestRerunJobs:
+    def test_rerun_responses_belong_to_the_original_prompts(self, app, session, test_data, mock_llm):
+        from app.models import Prompt, Response
+
+        model = mock_llm.add_model()
+        parameters = {"temperature": 0.2, "max_tokens": 10, "top_p": 1}
+        story_ids = test_data["ids"]["stories"][:3]
+        question_id = test_data["ids"]["questions"][0]
+        prompts = [Prompt(model_id=model.model_id, story_id=sid, question_id=question_id, payload="{}", **parameters)
+                   for sid in story_ids]
+        session.add_all(prompts)
+        session.commit()
+        prompt_count = session.query(Prompt).count()
+        prompts_data = [
+            {"prompt_id": prompt.prompt_id, "story_id": prompt.story_id, "model_id": model.model_id,
+             "question_id": question_id, "parameters": parameters}
+            for prompt in prompts
+        ]
+        job_id = async_service.create_job(model.model_id, [], question_id, parameters, prompts_data=prompts_data)
+
+        asyncio.run(async_service.process_llm_requests(app, job_id, model.model_id, [], question_id, parameters,
+                                                       keep_alive=0))
+
+        job = async_service.processing_jobs[job_id]
+        assert job["completed"] == len(prompts)
+        saved = session.query(Response).filter_by(run_id=job["run_id"]).all()
+        assert sorted(response.prompt_id for response in saved) == sorted(prompt.prompt_id for prompt in prompts)
+        assert session.query(Prompt).count() == prompt_count
+
+
+class TestScheduledJobs:
+    def test_finished_job_frees_its_slot_for_the_next_one(self, app, session, test_data, mock_llm, monkeypatch):
+        monkeypatch.setattr(async_service, "_scheduler", None)
+        app.config["MAX_CONCURRENT_JOBS"] = 1
+        model = mock_llm.add_model()
+        question_id = test_data["ids"]["questions"][0]
+        parameters = {"temperature": 0.2, "max_tokens": 10, "top_p": 1}
+        job_ids = [async_service.create_job(model.model_id, [sid], question_id, parameters)
+                   for sid in test_data["ids"]["stories"][:2]]
+
+        async def run_both():
+            tasks = [asyncio.create_task(async_service.run_scheduled_job(
+                app, job_id, model.model_id, [sid], question_id, parameters
+            )) for job_id, sid in zip(job_ids, test_data["ids"]["stories"][:2])]
+            try:
+                for _ in range(500):
+                    if all(async_service.processing_jobs[job_id]["status"] == "completed" for job_id in job_ids):
+                        return True
+                    await asyncio.sleep(0.01)
+                return False
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+        assert asyncio.run(run_both())
+        assert async_service.get_scheduler().stats()["running"] == 0
@@ -0,0 +1,58 @@
+import time
+
+import pytest
+
+from app.services import circuit_breaker
+from app.services.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+@pytest.fixture(autouse=True)
+def fresh_breakers():
+    circuit_breaker.reset_breakers()
+    yield
+    circuit_breaker.reset_breakers()
+
+
+class TestCircuitBreaker:
+    def test_opens_at_failure_rate_once_enough_calls(self):
+        breaker = CircuitBreaker("test", failure_rate=0.5, min_calls=4, window_size=4)
+        breaker.record_success()
+        breaker.record_failure()
+        breaker.record_failure()
+        assert breaker.state == CLOSED  # not enough calls yet
+        breaker.record_failure()
+        assert breaker.state == OPEN
+        assert not breaker.allow()
+        assert breaker.retry_in() > 0
+
+    def test_occasional_failures_keep_it_closed(self):
+        breaker = CircuitBreaker("test", failure_rate=0.6, min_calls=4, window_size=4)
+        for _ in range(10):
+            breaker.record_success()
+            breaker.record_success()
+            breaker.record_failure()
+        assert breaker.state == CLOSED
+
+    def test_half_open_probe_success_closes(self):
+        breaker = CircuitBreaker("test", min_calls=1, window_size=1, open_sec=0.05)
+        breaker.record_failure()
+        time.sleep(0.06)
+        assert breaker.state == HALF_OPEN
+        assert breaker.allow()
+        assert not breaker.allow()  # one probe at a time
+        breaker.record_success()
+        assert breaker.state == CLOSED and breaker.allow()
+
+    def test_half_open_probe_failure_reopens(self):
+        breaker = CircuitBreaker("test", min_calls=1, window_size=1, open_sec=0.05)
+        breaker.record_failure()
+        time.sleep(0.06)
+        assert breaker.allow()
+        breaker.record_failure()
+        assert breaker.state == OPEN
+
+    def test_get_breaker_is_shared_and_reconfigured(self):
+        first = circuit_breaker.get_breaker("groq", {"CIRCUIT_BREAKER_OPEN_SEC": 10})
+        second = circuit_breaker.get_breaker("groq", {"CIRCUIT_BREAKER_OPEN_SEC": 20})
+        assert first is second
+        assert first.open_sec == 20
@@ -0,0 +1,33 @@
+import threading
+import time
+
+from app.services import async_service, job_events
+
+
+class TestJobEvents:
+    def test_wait_wakes_on_publish(self):
+        seen = job_events.version("job-a")
+        threading.Timer(0.05, job_events.publish, args=("job-a",)).start()
+
+        start = time.monotonic()
+        new_version = job_events.wait_for_change("job-a", seen, timeout=5)
+
+        assert new_version == seen + 1
+        assert time.monotonic() - start < 1
+        job_events.forget("job-a")
+
+    def test_wait_times_out_without_changes(self):
+        job_events.publish("job-b")  # other jobs' changes don't wake job-b's waiters
+        seen = job_events.version("job-c")
+        assert job_events.wait_for_change("job-c", seen, timeout=0.05) == seen
+        job_events.forget("job-b")
+
+    def test_recorded_results_publish_progress(self, app, test_data):
+        with app.app_context():
+            job_id = async_service.create_job(
+                test_data["ids"]["models"][0], test_data["ids"]["stories"][:2], test_data["ids"]["questions"][0], {}
+            )
+        seen = job_events.version(job_id)
+        async_service._record_result(async_service.processing_jobs[job_id], test_data["ids"]["stories"][0], {"response_id": 1})
+        assert job_events.version(job_id) > seen
+        async_service.forget_job(job_id)
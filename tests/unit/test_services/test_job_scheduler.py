@@ -0,0 +1,113 @@
+import asyncio
+
+from app.services.job_scheduler import PRIORITY_BATCH, PRIORITY_INTERACTIVE, JobScheduler
+
+
+async def _hold(started, job_id, release):
+    started.append(job_id)
+    await release.wait()
+    return job_id
+
+
+async def _submit_all(scheduler, jobs, release):
+    """Start every (job_id, kwargs) job in order and return (started order, tasks)"""
+    started = []
+    tasks = []
+    for job_id, kwargs in jobs:
+        tasks.append(asyncio.create_task(
+            scheduler.run(job_id, lambda job_id=job_id: _hold(started, job_id, release), **kwargs)
+        ))
+        await asyncio.sleep(0)
+    return started, tasks
+
+
+class TestJobScheduler:
+    def test_priority_from_job_size(self):
+        scheduler = JobScheduler(interactive_max_items=20)
+        assert scheduler.priority_for(5) == PRIORITY_INTERACTIVE
+        assert scheduler.priority_for(500) == PRIORITY_BATCH
+
+    def test_limits_running_jobs(self):
+        async def scenario():
+            scheduler = JobScheduler(max_jobs=2)
+            release = asyncio.Event()
+            queued = []
+            started, tasks = await _submit_all(
+                scheduler,
+                [(f"job-{i}", {"on_queued": lambda i=i: queued.append(f"job-{i}")}) for i in range(4)],
+                release,
+            )
+            await asyncio.sleep(0)
+            assert started == ["job-0", "job-1"]
+            assert queued == ["job-2", "job-3"]
+            release.set()
+            assert await asyncio.gather(*tasks) == ["job-0", "job-1", "job-2", "job-3"]
+            assert scheduler.stats()["running"] == 0
+
+        asyncio.run(scenario())
+
+    def test_interactive_jobs_go_before_batch_jobs(self):
+        async def scenario():
+            scheduler = JobScheduler(max_jobs=1, interactive_max_items=10)
+            release = asyncio.Event()
+            started, tasks = await _submit_all(scheduler, [
+                ("first", {"total_items": 5}),
+                ("batch", {"total_items": 500}),
+                ("small", {"total_items": 5}),
+            ], release)
+            release.set()
+            await asyncio.gather(*tasks)
+            assert started == ["first", "small", "batch"]
+
+        asyncio.run(scenario())
+
+    def test_slots_are_shared_between_owners(self):
+        async def scenario():
+            scheduler = JobScheduler(max_jobs=2)
+            release = asyncio.Event()
+            started, tasks = await _submit_all(scheduler, [
+                ("a1", {"owner": "a"}),
+                ("a2", {"owner": "a"}),
+                ("a3", {"owner": "a"}),
+                ("b1", {"owner": "b"}),
+            ], release)
+            # a1 and a2 hold both slots; when a1 finishes, b goes before a's next job
+            tasks[0].cancel()
+            await asyncio.sleep(0)
+            await asyncio.sleep(0)
+            assert started == ["a1", "a2", "b1"]
+            release.set()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        asyncio.run(scenario())
+
+    def test_per_model_limit_lets_other_models_through(self):
+        async def scenario():
+            scheduler = JobScheduler(max_jobs=3, max_jobs_per_model=1)
+            release = asyncio.Event()
+            started, tasks = await _submit_all(scheduler, [
+                ("m1-a", {"model_id": 1}),
+                ("m1-b", {"model_id": 1}),
+                ("m2-a", {"model_id": 2}),
+            ], release)
+            await asyncio.sleep(0)
+            assert started == ["m1-a", "m2-a"]
+            release.set()
+            await asyncio.gather(*tasks)
+            assert started[-1] == "m1-b"
+
+        asyncio.run(scenario())
+
+    def test_cancelled_waiting_job_gives_up_its_place(self):
+        async def scenario():
+            scheduler = JobScheduler(max_jobs=1)
+            release = asyncio.Event()
+            started, tasks = await _submit_all(scheduler, [("running", {}), ("waiting", {})], release)
+            tasks[1].cancel()
+            await asyncio.sleep(0)
+            assert scheduler.stats() == {"running": 1, "waiting": 0, "max_jobs": 1}
+            release.set()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            assert started == ["running"]
+
+        asyncio.run(scenario())
@@ -0,0 +1,198 @@
+import asyncio
+import json
+
+import pytest
+
+from app.models import Job, JobItem
+from app.services import async_service, job_store, llm_service
+from app.services.response_writer import ResponseWriter
+
+
+@pytest.fixture(autouse=True)
+def clear_jobs():
+    yield
+    async_service.processing_jobs.clear()
+
+
+@pytest.fixture
+def story_job(app, test_data):
+    story_ids = test_data["ids"]["stories"][:3]
+    with app.app_context():
+        job_id = async_service.create_job(
+            test_data["ids"]["models"][0], story_ids, test_data["ids"]["questions"][0], {"temperature": 0.5}
+        )
+    return job_id, story_ids
+
+
+def answer(app, test_data, story_id, run_id, prompt_id=None, temperature=0.5, payload_json="{}"):
+    with app.app_context():
+        return llm_service.save_prompt_and_response(
+            model_id=test_data["ids"]["models"][0], temperature=temperature, max_tokens=100, top_p=0.9,
+            story_id=story_id, question_id=test_data["ids"]["questions"][0], payload_json=payload_json,
+            response_content="answer", full_response_json="{}", prompt_id=prompt_id, run_id=run_id
+        )
+
+
+class TestJobPersistence:
+    def test_create_job_persists_job_and_items(self, session, story_job):
+        job_id, story_ids = story_job
+        job = session.get(Job, job_id)
+        assert job.total == len(story_ids)
+        assert job.run_id == async_service.processing_jobs[job_id]["run_id"]
+        items = session.query(JobItem).filter_by(job_id=job_id).order_by(JobItem.position).all()
+        assert [item.story_id for item in items] == story_ids
+        assert all(item.status == "pending" for item in items)
+
+    def test_record_outcomes_updates_progress(self, app, test_data, story_job):
+        job_id, story_ids = story_job
+        response_id = test_data["ids"]["responses"][0]
+        with app.app_context():
+            job_store.record_outcomes(job_id, [
+                {"item_key": story_ids[0], "response_id": response_id},
+                {"item_key": story_ids[1], "error": "Empty response"},
+            ])
+            stored = job_store.get_job(job_id)
+
+        assert stored["completed"] == 2
+        assert stored["progress"] == 66
+        assert stored["results"][str(story_ids[0])] == {"response_id": response_id}
+        assert stored["results"][str(story_ids[1])] == {"error": "Empty response"}
+        assert stored["response_ids"] == [str(response_id)]
+
+    def test_status_is_visible_without_the_in_memory_job(self, app, story_job):
+        job_id, _ = story_job
+        async_service.processing_jobs.clear()
+        with app.app_context():
+            async_service.set_job_status(job_id, "running")
+            assert async_service.get_job_status(job_id, with_results=False)["status"] == "running"
+            assert async_service.cancel_job(job_id)
+            # A cancelled job isn't revived by a late status update
+            async_service.set_job_status(job_id, "completed")
+            assert job_store.get_status(job_id) == "cancelled"
+
+    def test_get_job_loads_only_unfinished_items(self, app, test_data, story_job):
+        job_id, story_ids = story_job
+        with app.app_context():
+            job_store.record_outcomes(job_id, [
+                {"item_key": story_ids[0], "response_id": test_data["ids"]["responses"][0]},
+            ])
+            async_service.processing_jobs.clear()
+            job = async_service.get_job(job_id)
+
+        assert job["params"]["story_ids"] == story_ids[1:]
+        assert job["completed"] == 1
+        assert job["resumed"]
+        assert async_service.processing_jobs[job_id] is job
+
+
+class TestWriterJobOutcomes:
+    def test_cancel_from_store_stops_the_job(self, app, test_data, story_job):
+        job_id, story_ids = story_job
+        job = async_service.processing_jobs[job_id]
+        job["status"] = "running"
+        with app.app_context():
+            job_store.set_status(job_id, "cancelled")
+
+        async def run():
+            writer = ResponseWriter(app, batch_size=1, job_id=job_id)
+            await async_service._handle_response(job, story_ids[0], {"error": "boom"}, writer)
+            await writer.close()
+
+        asyncio.run(run())
+        assert job["status"] == "cancelled"
+        assert not async_service._job_is_active(job_id)
+        with app.app_context():
+            assert job_store.get_job(job_id)["results"][str(story_ids[0])] == {"error": "boom"}
+
+
+class TestResumeRun:
+    def test_only_unanswered_stories_are_dispatched(self, app, test_data, story_job):
+        job_id, story_ids = story_job
+        run_id = async_service.processing_jobs[job_id]["run_id"]
+        answer(app, test_data, story_ids[0], run_id)
+        answer(app, test_data, story_ids[1], run_id, temperature=0.9)  # different sampling: still to do
+
+        with app.app_context():
+            new_job_id, remaining = async_service.resume_run(run_id)
+
+        new_job = async_service.processing_jobs[new_job_id]
+        assert remaining == 2
+        assert new_job["params"]["story_ids"] == story_ids[1:]
+        assert new_job["params"]["resumed_from"] == job_id
+        assert new_job["run_id"] == run_id
+
+    def test_resuming_a_resumed_run_uses_the_original_items(self, app, test_data, story_job):
+        job_id, story_ids = story_job
+        run_id = async_service.processing_jobs[job_id]["run_id"]
+        answer(app, test_data, story_ids[0], run_id)
+        with app.app_context():
+            async_service.resume_run(run_id)
+            for story_id in story_ids[1:]:
+                answer(app, test_data, story_id, run_id)
+            assert async_service.resume_run(run_id) == (None, 0)
+
+    def test_rerun_jobs_skip_prompts_with_a_response(self, app, test_data):
+        prompt_ids = test_data["ids"]["prompts"]
+        prompts_data = [
+            {"prompt_id": pid, "story_id": None, "model_id": test_data["ids"]["models"][0],
+             "question_id": test_data["ids"]["questions"][0], "parameters": {}}
+            for pid in prompt_ids
+        ]
+        with app.app_context():
+            job_id = async_service.create_job(
+                test_data["ids"]["models"][0], [], test_data["ids"]["questions"][0], {}, prompts_data=prompts_data
+            )
+            run_id = async_service.processing_jobs[job_id]["run_id"]
+            answer(app, test_data, test_data["ids"]["stories"][0], run_id, prompt_id=prompt_ids[0])
+
+            new_job_id, remaining = async_service.resume_run(run_id)
+
+        assert remaining == 1
+        assert [pd["prompt_id"] for pd in async_service.processing_jobs[new_job_id]["params"]["prompts_data"]] == prompt_ids[1:]
+
+    def test_run_without_a_job_cannot_be_resumed(self, app, test_data):
+        with app.app_context():
+            with pytest.raises(ValueError, match="no recorded job"):
+                async_service.resume_run(test_data["ids"]["runs"][0])
+
+    def test_multi_model_jobs_resume_each_model_separately(self, app, test_data):
+        story_ids = test_data["ids"]["stories"][:3]
+        model_ids = test_data["ids"]["models"][:2]
+        with app.app_context():
+            job_id = async_service.create_job(
+                None, story_ids, test_data["ids"]["questions"][0], {},
+                variants=async_service.model_variants(model_ids, {"temperature": 0.5})
+            )
+        run_id = async_service.processing_jobs[job_id]["run_id"]
+        answer(app, test_data, story_ids[0], run_id)  # answered by the first model only
+
+        with app.app_context():
+            new_job_id, remaining = async_service.resume_run(run_id)
+            items = job_store.pending_item_keys(new_job_id)
+
+        variants = async_service.processing_jobs[new_job_id]["params"]["variants"]
+        assert remaining == 5
+        assert [variant["story_ids"] for variant in variants] == [story_ids[1:], story_ids]
+        assert items == [f"0:{sid}" for sid in story_ids[1:]] + [f"1:{sid}" for sid in story_ids]
+
+    def test_sweep_points_differing_outside_sampling_are_resumed_separately(self, app, test_data):
+        story_ids = test_data["ids"]["stories"][:2]
+        parameter_sets = [{"temperature": 0.5, "frequency_penalty": value, "seed": 7} for value in (0, 1)]
+        with app.app_context():
+            job_id = async_service.create_job(
+                None, story_ids, test_data["ids"]["questions"][0], {},
+                variants=async_service.model_variants(test_data["ids"]["models"][:1], {}, parameter_sets)
+            )
+        run_id = async_service.processing_jobs[job_id]["run_id"]
+        # Same temperature, max_tokens and top_p for both points: only the payload tells them apart
+        answer(app, test_data, story_ids[0], run_id,
+               payload_json=json.dumps({"temperature": 0.5, "frequency_penalty": 0, "seed": 7}))
+        answer(app, test_data, story_ids[1], run_id,
+               payload_json=json.dumps({"temperature": 0.5, "frequency_penalty": 0, "seed": 8}))
+
+        with app.app_context():
+            new_job_id, remaining = async_service.resume_run(run_id)
+            items = job_store.pending_item_keys(new_job_id)
+
+        assert remaining == 3
+        assert items == [f"0:{story_ids[1]}"] + [f"1:{sid}" for sid in story_ids]
@@ -0,0 +1,246 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from app.models import Model, Response, Run
+from app.services import circuit_breaker, llm_service, providers, rate_limiter
+
+
+@pytest.fixture
+def hf_transport(monkeypatch):
+    """Route the pooled async HF client through an in-memory transport"""
+    requests_seen = []
+
+    def handler(request):
+        requests_seen.append(request)
+        return httpx.Response(200, json={"generated_text": "A cat story."})
+
+    monkeypatch.setattr(
+        providers.base, "new_http_client",
+        lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    )
+    return requests_seen
+
+
+class TestAsyncProviderPath:
+    def test_hf_async_call_saves_prompt_and_response(self, app, session, test_data, hf_transport):
+        run = Run(description="async run")
+        session.add(run)
+        session.commit()
+
+        async def call():
+            result = await llm_service.call_llm_async(
+                "hf", "story text", "question text",
+                test_data["ids"]["stories"][0], test_data["ids"]["questions"][0],
+                "some/model", test_data["ids"]["models"][0],
+                run_id=run.run_id, temperature=0.2, max_tokens=50, top_p=0.9
+            )
+            await llm_service.close_async_clients()
+            return result
+
+        with app.app_context():
+            result = asyncio.run(call())
+
+        assert result["response"] == "A cat story."
+        saved = session.get(Response, result["response_id"])
+        assert saved.run_id == run.run_id
+        assert saved.prompt.max_tokens == 50
+        sent = json.loads(hf_transport[0].content)
+        assert sent["parameters"]["max_new_tokens"] == 50
+
+    def test_clients_are_pooled_per_loop(self, hf_transport):
+        async def get_twice():
+            first = providers.get_provider("hf").async_client()
+            second = providers.get_provider("huggingface").async_client()
+            await llm_service.close_async_clients()
+            return first, second
+
+        first, second = asyncio.run(get_twice())
+        assert first is second
+
+    def test_unknown_provider_raises(self, app):
+        with app.app_context():
+            with pytest.raises(ValueError, match="Unknown provider"):
+                asyncio.run(llm_service.call_llm_async("nope", "s", "q", 1, 1, "m", 1))
+
+
+class TestResponseCache:
+    def _call(self, app, test_data, run_id, use_cache=True):
+        async def call():
+            result = await llm_service.call_llm_async(
+                "hf", "story text", "question text",
+                test_data["ids"]["stories"][0], test_data["ids"]["questions"][0],
+                "some/model", test_data["ids"]["models"][0],
+                run_id=run_id, use_cache=use_cache, temperature=0.0, max_tokens=50, top_p=0.9
+            )
+            await llm_service.close_async_clients()
+            return result
+
+        with app.app_context():
+            return asyncio.run(call())
+
+    def test_repeat_deterministic_call_is_served_from_cache(self, app, session, test_data, hf_transport):
+        app.config["LLM_CACHE_ENABLED"] = True
+        run_id = test_data["ids"]["runs"][0]
+
+        first = self._call(app, test_data, run_id)
+        second = self._call(app, test_data, run_id)
+
+        assert len(hf_transport) == 1
+        assert not first["cached"] and second["cached"]
+        assert second["response"] == first["response"]
+        assert second["response_id"] != first["response_id"]
+
+    def test_bypass_cache_always_calls_provider(self, app, session, test_data, hf_transport):
+        app.config["LLM_CACHE_ENABLED"] = True
+        run_id = test_data["ids"]["runs"][0]
+
+        self._call(app, test_data, run_id, use_cache=False)
+        self._call(app, test_data, run_id, use_cache=False)
+
+        assert len(hf_transport) == 2
+
+
+class TestRetries:
+    def _call(self, app, test_data, responses, **config):
+        """Call HF through a transport that answers with `responses` in turn"""
+        sent = []
+
+        def handler(request):
+            sent.append(request)
+            return responses[min(len(sent), len(responses)) - 1]
+
+        app.config.update(LLM_RETRY_BASE_DELAY_SEC=0.01, **config)
+        circuit_breaker.reset_breakers()
+
+        async def call():
+            result = await llm_service.call_llm_async(
+                "hf", "story text", "question text",
+                test_data["ids"]["stories"][0], test_data["ids"]["questions"][0],
+                "some/model", test_data["ids"]["models"][0],
+                run_id=test_data["ids"]["runs"][0], temperature=0.2, max_tokens=50, top_p=0.9
+            )
+            await llm_service.close_async_clients()
+            return result
+
+        with pytest.MonkeyPatch.context() as mp:
+            mp.setattr(
+                providers.base, "new_http_client",
+                lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            )
+            with app.app_context():
+                return asyncio.run(call()), sent
+
+    def test_rate_limited_call_is_retried_after_retry_after(self, app, session, test_data):
+        rate_limiter.reset_limiters()
+        responses = [
+            httpx.Response(429, headers={"retry-after-ms": "20"}, text="slow down"),
+            httpx.Response(200, json={"generated_text": "A cat story."}),
+        ]
+        result, sent = self._call(app, test_data, responses)
+
+        assert len(sent) == 2
+        assert result["response"] == "A cat story."
+        limiter = rate_limiter.get_limiter(f"model:{test_data['ids']['models'][0]}")
+        assert limiter.paused_until > 0
+
+    def test_fatal_error_is_not_retried(self, app, session, test_data):
+        result, sent = self._call(app, test_data, [httpx.Response(401, text="bad key")])
+
+        assert len(sent) == 1
+        assert "401" in result["error"]
+
+    def test_gives_up_after_max_attempts(self, app, session, test_data):
+        result, sent = self._call(app, test_data, [httpx.Response(503, text="busy")], LLM_RETRY_MAX_ATTEMPTS=3)
+
+        assert len(sent) == 3
+        assert "503" in result["error"] and "after 3 attempts" in result["error"]
+
+    def test_open_circuit_refuses_calls(self, app, session, test_data):
+        result, sent = self._call(
+            app, test_data, [httpx.Response(503, text="down")],
+            LLM_RETRY_MAX_ATTEMPTS=3, CIRCUIT_BREAKER_MIN_CALLS=2, CIRCUIT_BREAKER_WINDOW=2,
+        )
+
+        # The second failure trips the breaker, so the call is refused rather than failed
+        assert len(sent) == 2
+        assert result["circuit_open"]
+        circuit_breaker.reset_breakers()
+
+
+class TestStreaming:
+    def test_hf_stream_reports_partials_and_saves_final_text(self, app, session, test_data, monkeypatch):
+        events = [
+            {"token": {"text": "A cat", "special": False}},
+            {"token": {"text": " story.", "special": False}},
+            {"token": {"text": "</s>", "special": True}, "generated_text": "A cat story."},
+        ]
+        body = "".join(f"data:{json.dumps(event)}\n\n" for event in events)
+        sent = []
+
+        def handler(request):
+            sent.append(request)
+            return httpx.Response(200, text=body, headers={"content-type": "text/event-stream"})
+
+        monkeypatch.setattr(
+            providers.base, "new_http_client",
+            lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        )
+        partials = []
+
+        async def call():
+            result = await llm_service.call_llm_async(
+                "hf", "story text", "question text",
+                test_data["ids"]["stories"][0], test_data["ids"]["questions"][0],
+                "some/model", test_data["ids"]["models"][0],
+                run_id=test_data["ids"]["runs"][0], on_token=partials.append,
+                temperature=0.2, max_tokens=50, top_p=0.9
+            )
+            await llm_service.close_async_clients()
+            return result
+
+        with app.app_context():
+            result = asyncio.run(call())
+
+        assert sent[0].url.path.endswith("/generate_stream")
+        assert partials == ["", "A cat", "A cat story."]
+        assert result["response"] == "A cat story."
+        assert session.get(Response, result["response_id"]).response_content == "A cat story."
+
+
+class TestParameterSweep:
+    SCHEMA = json.dumps({"parameters": [
+        {"name": "temperature", "type": "float", "default": 0.7, "min_value": 0.0, "max_value": 1.0},
+        {"name": "max_tokens", "type": "integer", "default": 100, "min_value": 1, "max_value": 2048},
+    ]})
+
+    @pytest.fixture
+    def model_id(self, session, test_data):
+        model = session.get(Model, test_data["ids"]["models"][0])
+        model.parameters = self.SCHEMA
+        session.commit()
+        return model.model_id
+
+    def test_lists_and_ranges_expand_to_the_full_grid(self, app, model_id):
+        with app.app_context():
+            grid = llm_service.expand_parameter_sweep(
+                model_id, {"temperature": "0.7", "max_tokens": "100", "top_p": "0.9"},
+                {"temperature": "0:1:0.25", "max_tokens": "50, 100, 50", "top_p": ""}
+            )
+        assert len(grid) == 10
+        assert [p["temperature"] for p in grid[::2]] == [0.0, 0.25, 0.5, 0.75, 1.0]
+        assert {p["max_tokens"] for p in grid} == {50, 100}
+        assert all(p["top_p"] == "0.9" for p in grid)
+
+    @pytest.mark.parametrize("sweep, message", [
+        ({"temperature": "0, 1.5"}, "outside"),
+        ({"max_tokens": "a, b"}, "Could not read"),
+        ({"seed": "1, 2"}, "no parameter seed"),
+        ({"temperature": "0:1:0.01", "max_tokens": "1:100:1"}, "more than the limit"),
+    ])
+    def test_bad_sweeps_are_refused(self, app, model_id, sweep, message):
+        with app.app_context():
+            with pytest.raises(ValueError, match=message):
+                llm_service.expand_parameter_sweep(model_id, {}, sweep, max_combinations=200)
@@ -0,0 +1,51 @@
+from app.models import Model, Question, Story
+from app.services import metadata_cache
+from app.services.metadata_cache import MetadataCache
+
+
+class TestMetadataCache:
+    def test_each_row_is_loaded_once(self, app, session, test_data, monkeypatch):
+        sessions_opened = []
+        session_scope = metadata_cache.session_scope
+
+        def counting_scope():
+            sessions_opened.append(1)
+            return session_scope()
+
+        monkeypatch.setattr(metadata_cache, "session_scope", counting_scope)
+        model_id = test_data["ids"]["models"][0]
+        question_id = test_data["ids"]["questions"][0]
+
+        with app.app_context():
+            cache = MetadataCache().load(model_ids=[model_id], question_ids=[question_id])
+            for _ in range(5):
+                model = cache.model(model_id)
+                question = cache.question(question_id)
+
+        assert len(sessions_opened) == 1
+        stored = session.get(Model, model_id)
+        assert model.name == stored.name
+        assert model.provider_name == stored.provider.provider_name
+        assert question.content == session.get(Question, question_id).content
+
+    def test_missing_rows_are_remembered(self, app, session):
+        with app.app_context():
+            cache = MetadataCache()
+            assert cache.model(999999) is None
+            assert cache.question(999999) is None
+            assert 999999 in cache._models and 999999 in cache._questions
+
+    def test_rate_limits_fall_back_to_request_delay(self):
+        assert metadata_cache.rate_limits_for(None, 500, 2.0) == {"requests_per_minute": 30.0, "tokens_per_minute": 500}
+        assert metadata_cache.rate_limits_for(90, None, 2.0)["requests_per_minute"] == 90
+
+    def test_stories_are_prefetched_in_chunks(self, app, session, test_data, monkeypatch):
+        story_ids = test_data["ids"]["stories"][:5]
+        with app.app_context():
+            cache = MetadataCache().load_stories(story_ids + [999999], chunk_size=2)
+            # Served from memory from here on: no session needed
+            monkeypatch.setattr(metadata_cache, "session_scope", None)
+            contents = {sid: cache.story(sid) for sid in story_ids}
+
+        assert contents == {sid: session.get(Story, sid).content for sid in story_ids}
+        assert cache.story(999999) is None
@@ -0,0 +1,163 @@
+import asyncio
+import json
+
+import pytest
+
+from app.models import Response
+from app.services import async_service, circuit_breaker, providers, rate_limiter, retry_policy
+from app.services.providers import mock
+
+
+@pytest.fixture
+def mock_provider():
+    provider = providers.get_provider("mock")
+    provider.reset()
+    yield provider
+    provider.reset()
+
+
+def _payload(provider, story="story text", max_tokens=50):
+    payload, _ = provider.build_payload(story, "question text", "mock-llm",
+                                        {"temperature": 0.2, "max_tokens": max_tokens, "top_p": 0.9})
+    return payload
+
+
+class TestMockProvider:
+    def test_settings_come_from_the_endpoint_query_string(self):
+        settings = mock.parse_settings("mock://?latency_ms=5&error_rate=0.1&response_tokens=7&bogus=1")
+        assert settings["latency_ms"] == 5.0
+        assert settings["error_rate"] == 0.1
+        assert settings["response_tokens"] == 7
+        assert "bogus" not in settings
+        assert mock.parse_settings("placeholder") == mock.DEFAULT_SETTINGS
+
+    def test_outcomes_replay_identically(self, mock_provider):
+        endpoint = "mock://?latency_ms=1&error_rate=0.3&rate_limit_rate=0.2&seed=3"
+        payloads = [_payload(mock_provider, story=f"story {i}") for i in range(30)]
+
+        def run():
+            mock_provider.reset()
+            outcomes = []
+            for payload in payloads * 2:
+                latency, fault, text = mock_provider._plan(payload, endpoint)
+                outcomes.append((latency, fault.status_code if fault else None, text))
+            return outcomes
+
+        first = run()
+        assert first == run()
+        statuses = {status for _, status, _ in first}
+        assert statuses == {None, 429, 503}
+
+    def test_response_size_is_capped_by_max_tokens(self, mock_provider):
+        content, full_response = asyncio.run(mock_provider.complete_async(
+            "mock-llm", _payload(mock_provider, max_tokens=5), "mock://?latency_ms=0&response_tokens=40"
+        ))
+        assert len(content.split()) == 5
+        assert json.loads(full_response)["usage"]["completion_tokens"] == 5
+
+    def test_injected_429_carries_retry_after(self, mock_provider):
+        with pytest.raises(retry_policy.ProviderError) as raised:
+            mock_provider.complete("mock-llm", _payload(mock_provider), "latency_ms=0&rate_limit_rate=1&retry_after_sec=2")
+        assert raised.value.rate_limited
+        assert raised.value.retry_after == 2.0
+
+
+class TestMockPipeline:
+    def test_story_job_runs_end_to_end_offline(self, app, session, test_data, mock_llm):
+        model = mock_llm.add_model(endpoint="mock://?latency_ms=5&latency_sigma=0.5&error_rate=0.2&seed=1",
+                                   max_concurrency=4)
+        app.config.update(LLM_RETRY_MAX_ATTEMPTS=10, LLM_RETRY_BASE_DELAY_SEC=0.001, CIRCUIT_BREAKER_ENABLED=False)
+        rate_limiter.reset_limiters()
+        circuit_breaker.reset_breakers()
+
+        story_ids = test_data["ids"]["stories"]
+        question_id = test_data["ids"]["questions"][0]
+        parameters = {"temperature": 0.2, "max_tokens": 20, "top_p": 0.9}
+        job_id = async_service.create_job(model.model_id, story_ids, question_id, parameters)
+        async_service.processing_jobs[job_id]["status"] = "running"
+
+        asyncio.run(async_service.process_stories(app, job_id, model.model_id, story_ids, question_id, parameters))
+
+        job = async_service.processing_jobs.pop(job_id)
+        assert job["completed"] == len(story_ids)
+        saved = session.query(Response).filter_by(run_id=job["run_id"]).all()
+        assert len(saved) == len(story_ids)
+        assert all(len(response.response_content.split()) == 20 for response in saved)
+
+
+class TestMockBatch:
+    def test_batch_job_saves_results_and_remembers_the_batch(self, app, session, test_data, mock_llm):
+        from app.services import job_store
+
+        model = mock_llm.add_model(endpoint="mock://?latency_ms=5&error_rate=0.3&seed=2")
+        app.config.update(PROVIDER_BATCH_POLL_INTERVAL_SEC=0.01)
+        circuit_breaker.reset_breakers()
+        story_ids = test_data["ids"]["stories"]
+        question_id = test_data["ids"]["questions"][0]
+        parameters = {"temperature": 0.2, "max_tokens": 20, "top_p": 0.9}
+        job_id = async_service.create_job(model.model_id, story_ids, question_id, parameters, batch=True)
+
+        asyncio.run(async_service.process_llm_requests(
+            app, job_id, model.model_id, story_ids, question_id, parameters, keep_alive=0
+        ))
+
+        job = async_service.processing_jobs.pop(job_id)
+        assert job["status"] == "completed"
+        assert job["completed"] == len(story_ids)
+        saved = session.query(Response).filter_by(run_id=job["run_id"]).count()
+        errors = [result for result in job["results"].values() if "error" in result]
+        assert saved == len(story_ids) - len(errors)
+        assert all("503" in result["error"] for result in errors)
+        with app.app_context():
+            assert job_store.get_job(job_id)["params"]["provider_batch_id"].startswith("mock_batch_")
+
+    def test_cancel_through_the_job_store_stops_a_polling_batch(self, app, session, test_data, mock_llm):
+        import threading
+        import time
+
+        from app.services import job_store
+
+        model = mock_llm.add_model(endpoint="mock://?latency_ms=10000")
+        app.config.update(PROVIDER_BATCH_POLL_INTERVAL_SEC=0.01)
+        circuit_breaker.reset_breakers()
+        story_ids = test_data["ids"]["stories"][:3]
+        question_id = test_data["ids"]["questions"][0]
+        parameters = {"temperature": 0.2, "max_tokens": 20, "top_p": 0.9}
+        job_id = async_service.create_job(model.model_id, story_ids, question_id, parameters, batch=True)
+
+        def cancel_elsewhere():
+            # Another process only reaches the job store, not this process's memory
+            with app.app_context():
+                job_store.set_status(job_id, "cancelled")
+
+        threading.Timer(0.2, cancel_elsewhere).start()
+        start = time.monotonic()
+        asyncio.run(async_service.process_llm_requests(
+            app, job_id, model.model_id, story_ids, question_id, parameters, keep_alive=0
+        ))
+
+        assert time.monotonic() - start < 5
+        job = async_service.processing_jobs.pop(job_id)
+        assert job["status"] == "cancelled"
+        batch_id = job["params"]["provider_batch_id"]
+        assert mock_llm.provider._batches[batch_id]["status"] == "cancelled"
+
+    def test_cancelled_job_cancels_its_batch(self, app, session, test_data, mock_llm):
+        from app.services import llm_service
+
+        model = mock_llm.add_model(endpoint="mock://?latency_ms=10000")
+        submitted = []
+        items = {sid: (sid, 1, "story", "question") for sid in test_data["ids"]["stories"][:3]}
+
+        async def run():
+            return await llm_service.call_llm_batch_async(
+                "mock", items, "mock-llm", model.model_id, run_id=test_data["ids"]["runs"][0],
+                on_submitted=submitted.append, is_active=lambda: False, poll_interval=0.01,
+                temperature=0.2, max_tokens=20, top_p=0.9
+            )
+
+        with app.app_context():
+            results = asyncio.run(run())
+
+        assert results == {}
+        assert mock_llm.provider._batches[submitted[0]]["status"] == "cancelled"
@@ -0,0 +1,170 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from app.models import Model, Provider, Response
+from app.services import llm_service, models_service, providers
+
+
+class EchoProvider(providers.LLMProvider):
+    name = "echo"
+    aliases = ("Echo Server",)
+    rate_limit_hints = {"requests_per_minute": 600}
+
+    def build_payload(self, story, question, model_name, parameters):
+        sampling = providers.base.resolve_sampling(parameters)
+        return {"model": model_name, "prompt": f"{story} / {question}", **sampling}, sampling
+
+    def complete(self, model_name, payload, endpoint=None):
+        return payload["prompt"], json.dumps(payload)
+
+
+@pytest.fixture
+def echo_provider():
+    provider = providers.register_provider(EchoProvider)
+    yield provider
+    providers.unregister_provider("echo")
+
+
+class TestRegistry:
+    def test_names_are_matched_case_insensitively_with_aliases(self):
+        assert providers.get_provider("Groq") is providers.get_provider("groq")
+        assert providers.get_provider("huggingface") is providers.get_provider("hf")
+        assert providers.canonical_name("Hugging Face") == "hf"
+        assert providers.canonical_name("Test Provider") == "Test Provider"
+
+    def test_unknown_provider_raises(self):
+        with pytest.raises(ValueError, match="Unknown provider: nope"):
+            providers.get_provider("nope")
+
+    def test_taken_names_are_refused(self, echo_provider):
+        class Clash(EchoProvider):
+            name = "echo2"
+            aliases = ("echo server",)
+
+        with pytest.raises(ValueError, match="already registered"):
+            providers.register_provider(Clash)
+
+    def test_entry_point_providers_are_discovered(self, monkeypatch):
+        class FakeEntryPoint:
+            name = "echo"
+
+            def load(self):
+                return EchoProvider
+
+        monkeypatch.setattr(providers, "entry_points", lambda group: [FakeEntryPoint()])
+        monkeypatch.setattr(providers, "_entry_points_loaded", False)
+        try:
+            assert isinstance(providers.get_provider("echo server"), EchoProvider)
+        finally:
+            providers.unregister_provider("echo")
+
+    def test_configured_budgets_override_hints(self, echo_provider):
+        budgets = providers.rate_limit_budgets({"Groq": {"requests_per_minute": 30}})
+        assert budgets["echo"] == {"requests_per_minute": 600}
+        assert budgets["groq"] == {"requests_per_minute": 30}
+
+
+class TestDispatch:
+    def test_registered_provider_serves_calls(self, app, session, test_data, echo_provider):
+        with app.app_context():
+            result = llm_service.call_llm(
+                "Echo Server", "story text", "question text",
+                test_data["ids"]["stories"][0], test_data["ids"]["questions"][0],
+                "echo-1", test_data["ids"]["models"][0],
+                run_id=test_data["ids"]["runs"][0], temperature=0.2, max_tokens=50, top_p=0.9
+            )
+
+        assert result["response"] == "story text / question text"
+        assert session.get(Response, result["response_id"]).prompt.max_tokens == 50
+
+    def test_openai_compatible_calls_the_models_endpoint(self, app, session, test_data, monkeypatch):
+        sent = []
+
+        def handler(request):
+            sent.append(request)
+            return httpx.Response(200, json={"choices": [{"message": {"content": "A cat story."}}]})
+
+        monkeypatch.setattr(
+            providers.base, "new_http_client",
+            lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        )
+        model = session.get(Model, test_data["ids"]["models"][0])
+        model.endpoint = "http://localhost:8000/v1/"
+        session.commit()
+
+        async def call():
+            result = await llm_service.call_llm_async(
+                "local", "story text", "question text",
+                test_data["ids"]["stories"][0], test_data["ids"]["questions"][0],
+                "llama3", model.model_id,
+                run_id=test_data["ids"]["runs"][0], temperature=0.2, max_tokens=50, top_p=0.9
+            )
+            await llm_service.close_async_clients()
+            return result
+
+        with app.app_context():
+            result = asyncio.run(call())
+
+        assert result["response"] == "A cat story."
+        assert str(sent[0].url) == "http://localhost:8000/v1/chat/completions"
+        assert json.loads(sent[0].content)["model"] == "llama3"
+
+
+class TestEnsureGroqProvider:
+    def test_existing_row_is_reused_whatever_its_case(self, app, session):
+        session.add(Provider(provider_name="Groq"))
+        session.commit()
+        groq_id = session.query(Provider).filter_by(provider_name="Groq").one().provider_id
+
+        with app.app_context():
+            assert models_service.ensure_groq_provider() == groq_id
+        assert session.query(Provider).filter(Provider.provider_name.ilike("groq")).count() == 1
+
+
+class TestOpenAIBatch:
+    def test_groq_batch_is_uploaded_polled_and_downloaded(self, monkeypatch):
+        sent = []
+        output = "\n".join(json.dumps(line) for line in [
+            {"custom_id": "1", "response": {"status_code": 200, "body": {"choices": [{"message": {"content": "One."}}]}}},
+            {"custom_id": "2", "response": {"status_code": 400, "body": {"error": {"message": "bad request"}}}},
+        ])
+
+        def handler(request):
+            sent.append(request)
+            path = request.url.path
+            if path.endswith("/files"):
+                return httpx.Response(200, json={"id": "file_in"})
+            if path.endswith("/batches"):
+                return httpx.Response(200, json={"id": "batch_1", "status": "validating"})
+            if path.endswith("/batches/batch_1"):
+                return httpx.Response(200, json={"id": "batch_1", "status": "completed", "output_file_id": "file_out",
+                                                 "request_counts": {"total": 2, "completed": 1, "failed": 1}})
+            if path.endswith("/files/file_out/content"):
+                return httpx.Response(200, text=output)
+            return httpx.Response(404)
+
+        monkeypatch.setattr(
+            providers.base, "new_http_client",
+            lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        )
+        groq = providers.get_provider("groq")
+
+        async def run():
+            batch_id = await groq.submit_batch("llama", {"1": {"model": "llama"}, "2": {"model": "llama"}})
+            state = await groq.get_batch(batch_id)
+            results = await groq.fetch_batch_results(batch_id)
+            await llm_service.close_async_clients()
+            return batch_id, state, results
+
+        batch_id, state, results = asyncio.run(run())
+
+        assert batch_id == "batch_1"
+        assert state["done"] and state["failed"] == 1
+        uploaded = sent[0].content.decode()
+        assert '"custom_id": "1"' in uploaded and '"url": "/v1/chat/completions"' in uploaded
+        assert json.loads(sent[1].content)["input_file_id"] == "file_in"
+        assert results["1"][0] == "One."
+        assert results["2"].status_code == 400 and not results["2"].retryable
@@ -0,0 +1,69 @@
+import pytest
+
+from app.services import rate_limiter
+
+
+@pytest.fixture(autouse=True)
+def fresh_limiters():
+    rate_limiter.reset_limiters()
+    yield
+    rate_limiter.reset_limiters()
+
+
+class TestTokenBucket:
+    def test_reservations_queue_in_order(self):
+        bucket = rate_limiter.TokenBucket(rate_per_minute=60)  # 1 per second, burst of 1
+        assert bucket.reserve(1, now=bucket.updated) == 0
+        assert bucket.reserve(1, now=bucket.updated) == pytest.approx(1.0)
+        assert bucket.reserve(1, now=bucket.updated) == pytest.approx(2.0)
+
+    def test_refills_over_time(self):
+        bucket = rate_limiter.TokenBucket(rate_per_minute=60)
+        start = bucket.updated
+        bucket.reserve(1, now=start)
+        assert bucket.reserve(1, now=start + 1.0) == 0
+
+    def test_oversized_request_goes_once_the_bucket_is_full(self):
+        bucket = rate_limiter.TokenBucket(rate_per_minute=600)  # capacity 10
+        assert bucket.reserve(10_000, now=bucket.updated) == 0
+        assert bucket.reserve(10_000, now=bucket.updated) == pytest.approx(1000.0)
+
+
+class TestRateLimiter:
+    def test_unlimited_when_no_budgets(self):
+        limiter = rate_limiter.RateLimiter()
+        assert all(limiter.reserve(tokens=5000) == 0 for _ in range(100))
+
+    def test_token_budget_limits_large_requests(self):
+        limiter = rate_limiter.RateLimiter(tokens_per_minute=6000)  # 100 tokens/s, burst 100
+        assert limiter.reserve(tokens=100) == 0
+        assert limiter.reserve(tokens=100) == pytest.approx(1.0, abs=0.05)
+
+    def test_large_calls_are_held_to_the_token_budget(self):
+        limiter = rate_limiter.RateLimiter(tokens_per_minute=600)  # 10 tokens/s, burst 10
+        assert limiter.reserve(tokens=3000) == 0
+        # The 3000 tokens just sent use up the next five minutes of budget
+        assert limiter.reserve(tokens=10) == pytest.approx(300.0, abs=0.05)
+
+    def test_pause_holds_back_callers(self):
+        limiter = rate_limiter.RateLimiter(requests_per_minute=600)
+        limiter.pause(3)
+        assert limiter.reserve() >= 3
+
+    def test_get_limiter_is_shared_and_reconfigured(self):
+        first = rate_limiter.get_limiter("model:1", requests_per_minute=60)
+        second = rate_limiter.get_limiter("model:1", requests_per_minute=120)
+        assert first is second
+        assert first.requests.rate_per_minute == 120
+
+    def test_limiters_for_model_includes_provider_budget(self):
+        limiters = rate_limiter.limiters_for_model(
+            1, "groq", {"requests_per_minute": 30, "tokens_per_minute": None},
+            provider_limits={"groq": {"requests_per_minute": 100}},
+        )
+        assert len(limiters) == 2
+        assert rate_limiter.limiters_for_model(1, "hf", {}, provider_limits={"groq": {}}) == limiters[:1]
+
+
+def test_estimate_tokens():
+    assert rate_limiter.estimate_tokens("a" * 400, 100) == 200
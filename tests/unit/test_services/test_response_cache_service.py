@@ -0,0 +1,58 @@
+import datetime
+
+import pytest
+
+from app.models import ResponseCache
+from app.services import response_cache_service
+
+
+@pytest.fixture
+def cache_enabled(app):
+    app.config.update(LLM_CACHE_ENABLED=True, LLM_CACHE_DETERMINISTIC_ONLY=True)
+    yield app
+    app.config.update(LLM_CACHE_ENABLED=False)
+
+
+class TestResponseCacheService:
+    def test_cache_key_is_stable_and_payload_sensitive(self):
+        payload = {"model": "m", "temperature": 0, "messages": [{"role": "user", "content": "hi"}]}
+        reordered = {"messages": [{"role": "user", "content": "hi"}], "temperature": 0, "model": "m"}
+        key = response_cache_service.make_cache_key("groq", payload)
+        assert key == response_cache_service.make_cache_key("groq", reordered)
+        assert key != response_cache_service.make_cache_key("groq", {**payload, "temperature": 0.5})
+        assert key != response_cache_service.make_cache_key("hf", payload)
+
+    def test_should_use_cache(self, session, cache_enabled):
+        assert response_cache_service.should_use_cache({"temperature": 0.0})
+        assert not response_cache_service.should_use_cache({"temperature": 0.7})
+        assert not response_cache_service.should_use_cache({"temperature": 0.0}, use_cache=False)
+
+    def test_disabled_by_default(self, session):
+        assert not response_cache_service.should_use_cache({"temperature": 0.0})
+
+    def test_store_and_get(self, session, cache_enabled):
+        response_cache_service.store_response("k1", "groq", "m", "{}", "answer", "{\"raw\": 1}")
+        cached = response_cache_service.get_cached_response("k1")
+        assert cached == {"response_content": "answer", "full_response": "{\"raw\": 1}"}
+        assert session.get(ResponseCache, "k1").hit_count == 1
+        assert response_cache_service.get_cached_response("missing") is None
+
+    def test_expired_entries_are_not_returned(self, session, cache_enabled):
+        response_cache_service.store_response("old", "groq", "m", "{}", "answer", None)
+        entry = session.get(ResponseCache, "old")
+        entry.created_at = datetime.datetime.utcnow() - datetime.timedelta(days=365)
+        session.commit()
+        assert response_cache_service.get_cached_response("old") is None
+
+    def test_evict_keeps_most_recently_used(self, session, cache_enabled):
+        now = datetime.datetime.utcnow()
+        for i in range(5):
+            response_cache_service.store_response(f"k{i}", "groq", "m", "{}", f"a{i}", None)
+        for i in range(5):
+            session.get(ResponseCache, f"k{i}").last_used_at = now + datetime.timedelta(seconds=i)
+        session.commit()
+
+        removed = response_cache_service.evict(max_entries=2)
+        session.expire_all()
+        assert removed == 3
+        assert {e.cache_key for e in session.query(ResponseCache).all()} == {"k3", "k4"}
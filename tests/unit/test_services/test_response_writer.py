@@ -0,0 +1,130 @@
+import asyncio
+
+from app.models import Model, Prompt, Response
+from app.services import async_service, llm_service
+from app.services.response_writer import ResponseWriter
+
+
+def make_record(test_data, story_index=0, prompt_id=None, content="An answer"):
+    return dict(
+        model_id=test_data["ids"]["models"][0],
+        story_id=test_data["ids"]["stories"][story_index],
+        question_id=test_data["ids"]["questions"][0],
+        payload_json="{}",
+        response_content=content,
+        full_response_json="{}",
+        prompt_id=prompt_id,
+        run_id=test_data["ids"]["runs"][0],
+        temperature=0.5,
+        max_tokens=100,
+        top_p=0.9,
+    )
+
+
+class TestSavePromptsAndResponses:
+    def test_saves_new_and_existing_prompts_in_order(self, app, session, test_data):
+        existing_prompt = test_data["ids"]["prompts"][0]
+        records = [
+            make_record(test_data, 0, content="first"),
+            make_record(test_data, 0, prompt_id=existing_prompt, content="rerun"),
+            make_record(test_data, 1, content="third"),
+        ]
+        prompts_before = session.query(Prompt).count()
+
+        with app.app_context():
+            response_ids = llm_service.save_prompts_and_responses(records)
+
+        assert [session.get(Response, rid).response_content for rid in response_ids] == ["first", "rerun", "third"]
+        assert session.get(Response, response_ids[1]).prompt_id == existing_prompt
+        assert session.query(Prompt).count() == prompts_before + 2
+
+
+class TestResponseWriter:
+    def test_flushes_when_batch_is_full(self, app, session, test_data):
+        saved = []
+
+        async def write():
+            writer = ResponseWriter(app, batch_size=2, flush_interval_ms=10_000)
+            for i in range(4):
+                await writer.submit(make_record(test_data, i), on_saved=saved.append)
+            batches = writer.batches_written
+            await writer.close()
+            return batches
+
+        assert asyncio.run(write()) == 2
+        assert len(saved) == 4
+
+    def test_flushes_after_interval(self, app, session, test_data):
+        saved = []
+
+        async def write():
+            writer = ResponseWriter(app, batch_size=100, flush_interval_ms=10)
+            await writer.submit(make_record(test_data), on_saved=saved.append)
+            await asyncio.sleep(0.2)
+            return writer.rows_written
+
+        assert asyncio.run(write()) == 1
+        assert session.get(Response, saved[0]) is not None
+
+    def test_close_flushes_partial_batch(self, app, session, test_data):
+        saved = []
+
+        async def write():
+            writer = ResponseWriter(app, batch_size=100, flush_interval_ms=10_000)
+            await writer.submit(make_record(test_data), on_saved=saved.append)
+            await writer.close()
+            return writer.batches_written
+
+        assert asyncio.run(write()) == 1
+        assert len(saved) == 1
+
+    def test_failed_batch_reports_errors(self, app, session, test_data):
+        errors = []
+        bad = make_record(test_data)
+        bad["model_id"] = None  # violates NOT NULL
+
+        async def write():
+            writer = ResponseWriter(app, batch_size=100)
+            await writer.submit(bad, on_error=errors.append)
+            await writer.close()
+
+        asyncio.run(write())
+        assert len(errors) == 1
+
+
+class TestJobWriteBehind:
+    def test_deferred_results_are_written_and_recorded(self, app, session, test_data, monkeypatch):
+        model_id = test_data["ids"]["models"][0]
+        model = session.get(Model, model_id)
+        model.request_delay = 0
+        model.max_concurrency = 4
+        session.commit()
+        story_ids = test_data["ids"]["stories"][:5]
+
+        job_id = async_service.create_job(model_id, story_ids, test_data["ids"]["questions"][0], {})
+        async_service.processing_jobs[job_id]["status"] = "running"
+
+        async def fake_call(app, provider_name, story_content, question_content, story_id, *args, defer_save=False, **kwargs):
+            assert defer_save
+            index = test_data["ids"]["stories"].index(story_id)
+            return {"record": make_record(test_data, index, content=f"story {story_id}"), "response": "x"}
+
+        monkeypatch.setattr(async_service, "run_llm_call", fake_call)
+
+        async def run():
+            writer = ResponseWriter(app, batch_size=2)
+            await async_service.process_stories(
+                app, job_id, model_id, story_ids, test_data["ids"]["questions"][0], {}, writer=writer
+            )
+            await writer.close()
+            return writer.batches_written
+
+        try:
+            assert asyncio.run(run()) < len(story_ids)
+            job = async_service.processing_jobs[job_id]
+            assert job["completed"] == len(story_ids)
+            for story_id in story_ids:
+                saved = session.get(Response, job["results"][story_id]["response_id"])
+                assert saved.response_content == f"story {story_id}"
+        finally:
+            async_service.processing_jobs.clear()
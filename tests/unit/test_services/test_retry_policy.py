@@ -0,0 +1,45 @@
+import httpx
+import pytest
+
+from app.services.retry_policy import ProviderError, RetryPolicy, from_exception, parse_retry_after
+
+
+class TestParseRetryAfter:
+    @pytest.mark.parametrize("headers, expected", [
+        ({"Retry-After": "7"}, 7.0),
+        ({"retry-after-ms": "250"}, 0.25),
+        ({"x-ratelimit-reset-requests": "2m59.5s", "x-ratelimit-reset-tokens": "7.66s"}, 179.5),
+        ({"x-ratelimit-reset-tokens": "120ms"}, 0.12),
+        ({}, None),
+        ({"Retry-After": "soon"}, None),
+    ])
+    def test_header_formats(self, headers, expected):
+        assert parse_retry_after(headers) == (pytest.approx(expected) if expected is not None else None)
+
+    def test_http_date(self):
+        assert parse_retry_after({"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"}) == 0
+
+
+class TestRetryPolicy:
+    def test_only_retryable_errors_are_retried(self):
+        policy = RetryPolicy(max_attempts=3)
+        busy = ProviderError("busy", status_code=503, retryable=True)
+        assert policy.should_retry(1, busy) and policy.should_retry(2, busy)
+        assert not policy.should_retry(3, busy)
+        assert not policy.should_retry(1, ProviderError("bad request", status_code=400))
+
+    def test_backoff_is_jittered_and_capped(self):
+        policy = RetryPolicy(base_delay=1.0, max_delay=5.0)
+        delays = [policy.delay(attempt) for attempt in range(1, 10) for _ in range(20)]
+        assert all(0 <= delay <= 5.0 for delay in delays)
+        assert len(set(delays)) > 1
+
+    def test_provider_wait_is_honoured_up_to_cap(self):
+        policy = RetryPolicy(max_retry_after=60)
+        assert policy.delay(1, ProviderError("429", status_code=429, retryable=True, retry_after=12)) == 12
+        assert policy.delay(1, ProviderError("429", status_code=429, retryable=True, retry_after=600)) == 60
+
+    def test_connection_errors_are_retryable(self):
+        error = from_exception("hf", httpx.ConnectTimeout("timed out"))
+        assert error.retryable and error.status_code is None
+        assert not from_exception("hf", ValueError("bad json")).retryable
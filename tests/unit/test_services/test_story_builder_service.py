@@ -1,7 +1,9 @@
+import json
+
 import pytest
 import werkzeug
 from app.services import story_builder_service
-from app.models import Template, Story, Field, Word, StoryCategory, Category
+from app.models import Template, Story, Field, Word, StoryCategory, Category, Generation
 
 class TestStoryBuilderService:
 
@@ -195,16 +197,124 @@ class TestStoryBuilderService:
                 story_id=story_id, category_id=category_id).first()
             assert sc is not None
 
-    def test_template_filler_missing_field_with_no_words(self, session, test_data):
-        """Test template_filler uses default for a field with no words in DB."""
+    def test_template_filler_streams_permutations_in_chunks(self, session, test_data, monkeypatch):
+        """Permutations are rendered lazily and saved a chunk at a time, reporting progress."""
+        template = Template(content="The {colour} {animal} can {action}.")
+        session.add(template)
+        session.commit()
+        monkeypatch.setattr(story_builder_service, "generate_permutations",
+                            lambda fields: pytest.fail("permutations should not be materialised"))
+        field_data = {"colour": ["red", "blue"], "animal": ["cat", "dog", "owl"], "action": ["run", "fly"]}
+        progress = []
+
+        story_ids = story_builder_service.template_filler(
+            template, template.template_id, field_data, chunk_size=5,
+            on_progress=lambda saved, total: progress.append((saved, total))
+        )
+
+        assert progress == [(0, 12), (5, 12), (10, 12), (12, 12)]
+        contents = [session.get(Story, sid).content for sid in story_ids]
+        assert contents[0] == "The red cat can run."
+        assert contents[-1] == "The blue owl can fly."
+        assert len(set(contents)) == 12
+
+    def test_generation_runs_keep_their_stories_as_id_ranges(self, session, test_data):
+        """A finished generation run is stored with its stories as id ranges, not an id list."""
+        story_ids = test_data["ids"]["stories"]
+        generation_id = story_builder_service.start_generation(test_data["ids"]["templates"][0], "not-an-id")
+        assert len(generation_id) == 32
+        story_builder_service.update_generation(generation_id, saved=1, total=len(story_ids))
+        assert story_builder_service.get_generation(generation_id)["status"] == "running"
+
+        story_builder_service.finish_generation(generation_id, story_ids)
+
+        generation = story_builder_service.get_generation(generation_id)
+        assert generation["status"] == "completed"
+        assert generation["story_ranges"] == [[min(story_ids), max(story_ids)]]
+        assert session.get(Generation, generation_id).story_ranges == json.dumps([[min(story_ids), max(story_ids)]])
+        page = story_builder_service.get_generated_stories(generation_id, page=1, per_page=len(story_ids))
+        assert [story.story_id for story in page.items] == sorted(story_ids)
+        assert page.total == len(story_ids)
+        assert story_builder_service.get_generated_stories("unknown") is None
+
+    def test_decode_permutation_matches_product_order(self):
+        """Index decoding walks the permutations in the same order as the full product."""
+        fields = {"a": ["1", "2"], "b": ["x", "y", "z"], "c": ["p", "q"]}
+        assert [story_builder_service.decode_permutation(fields, i) for i in range(12)] == \
+            list(story_builder_service.iter_permutations(fields))
+
+    def test_random_sample_is_distinct_and_repeatable(self):
+        """Random sampling picks distinct permutations from a space too large to enumerate."""
+        fields = {f"f{i}": [str(v) for v in range(20)] for i in range(10)}  # 20**10 permutations
+        sample = list(story_builder_service.sample_permutations(fields, 50, seed=7))
+        assert len(set(sample)) == 50
+        assert sample == list(story_builder_service.sample_permutations(fields, 50, seed=7))
+
+    def test_latin_hypercube_covers_every_value_evenly(self):
+        """Every value of each field appears equally often when the sample is a multiple of its size."""
+        fields = {"colour": ["red", "green", "blue"], "size": [str(v) for v in range(6)]}
+        rows = list(story_builder_service.latin_hypercube_permutations(fields, 6, seed=3))
+        assert sorted(row[1] for row in rows) == fields["size"]
+        assert sorted(row[0] for row in rows) == sorted(fields["colour"] * 2)
+
+    def test_pairwise_covers_every_pair_with_fewer_stories(self):
+        """All-pairs generation covers each pair of values of every two fields."""
+        fields = {f"f{i}": [f"{i}-{v}" for v in range(4)] for i in range(4)}
+        rows = story_builder_service.pairwise_permutations(fields)
+        assert len(rows) < story_builder_service.count_permutations(fields)
+        for i in range(4):
+            for j in range(i + 1, 4):
+                assert {(row[i], row[j]) for row in rows} == {
+                    (a, b) for a in fields[f"f{i}"] for b in fields[f"f{j}"]
+                }
+
+    def test_template_filler_refuses_more_than_the_limit(self, app, session, test_data):
+        """Generation over STORY_GENERATION_MAX_STORIES is refused before anything is written."""
+        template_id = test_data["ids"]["templates"][0]
+        field_data = {"animal": ["cat", "dog", "owl"], "action": ["run", "jump"]}
+        app.config["STORY_GENERATION_MAX_STORIES"] = 5
+        before = session.query(Story).count()
+        with pytest.raises(ValueError, match="more than the limit"):
+            story_builder_service.generate_stories(template_id, field_data)
+        story_ids = story_builder_service.generate_stories(template_id, field_data, mode="random", sample_size=4, seed=1)
+        assert len(story_ids) == 4
+        assert session.query(Story).count() == before + 4
+
+    def test_compiled_template_fills_repeated_placeholders(self):
+        """A placeholder used twice is filled in both places; unknown ones are left alone."""
+        compiled = story_builder_service.CompiledTemplate(
+            "{name}'s {number} friends came for dinner and shared {number} {food}."
+        )
+        assert compiled.field_names == ["name", "number", "food"]
+        render = compiled.renderer(["food", "number", "name"])
+        assert render(("pie", "3", "Ann")) == "Ann's 3 friends came for dinner and shared 3 pie."
+        partial = story_builder_service.CompiledTemplate("{a} and {b} {").renderer(["a"])
+        assert partial(("x{0}",)) == "x{0} and {b} {"
+
+    def test_templates_are_compiled_once(self, session, test_data, monkeypatch):
+        """Field lookups reuse the template's compiled form; repeated placeholders are one field."""
+        template = Template(content="{name} had {number} cakes and ate {number}.")
+        session.add(template)
+        session.commit()
+        fields, missing = story_builder_service.get_template_fields(template.template_id)
+        assert missing == ["name", "number"]
+        monkeypatch.setattr(story_builder_service, "CompiledTemplate",
+                            lambda content: pytest.fail("template should not be parsed again"))
+        story_ids = story_builder_service.generate_stories(template.template_id, {"name": ["Ann"], "number": ["2", "5"]})
+        assert [session.get(Story, sid).content for sid in story_ids] == [
+            "Ann had 2 cakes and ate 2.", "Ann had 5 cakes and ate 5."
+        ]
+
+    def test_template_filler_missing_field_with_no_words(self, session, test_data, monkeypatch):
+        """Test template_filler refuses a field with no words rather than asking for input."""
         template_id = test_data["ids"]["templates"][2]  # template3
+        monkeypatch.setattr("builtins.input", lambda prompt: pytest.fail("input() called outside the CLI"))
         # Only provide object field data, omit 'no_words_field'
         field_data = {"object": ["table"]}
-        story_ids = story_builder_service.generate_stories(template_id, field_data)
-        for story_id in story_ids:
-            story = session.get(Story, story_id)
-            assert "[No value provided]" in story.content
-            assert "table" in story.content
+        stories_before = session.query(Story).count()
+        with pytest.raises(ValueError, match="no_words_field"):
+            story_builder_service.generate_stories(template_id, field_data)
+        assert session.query(Story).count() == stories_before
 
     def test_generate_stories_invalid_template(self, app):
         """Test generate_stories raises NotFound for missing template."""
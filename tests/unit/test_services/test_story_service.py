@@ -83,6 +83,16 @@ class TestStoryService:
     #     assert linked_category_ids == expected_ids
 
 
+    def test_add_stories_inserts_in_chunks(self, session, test_data):
+        """Stories from a generator are saved chunk by chunk, with their categories, in order."""
+        category_id = test_data["ids"]["categories"][0]
+        progress = []
+        contents = (f"Generated story {i}" for i in range(7))
+        story_ids = story_service.add_stories(contents, [category_id], chunk_size=3, on_progress=progress.append)
+        assert progress == [3, 6, 7]
+        assert [session.get(Story, sid).content for sid in story_ids] == [f"Generated story {i}" for i in range(7)]
+        assert session.query(StoryCategory).filter(StoryCategory.story_id.in_(story_ids)).count() == 7
+
     def test_get_all_stories(self, session, test_data):
         """Test retrieving all stories."""
         stories = story_service.get_all_stories()
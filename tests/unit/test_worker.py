@@ -0,0 +1,93 @@
+import asyncio
+import datetime
+
+import pytest
+
+from app.models import Job, Model, Response
+from app.services import async_service, job_store
+from app.worker import Worker
+
+
+@pytest.fixture(autouse=True)
+def clear_jobs():
+    yield
+    async_service.processing_jobs.clear()
+
+
+@pytest.fixture
+def queued_job(app, session, test_data):
+    model_id = test_data["ids"]["models"][0]
+    model = session.get(Model, model_id)
+    model.request_delay = 0
+    session.commit()
+    story_ids = test_data["ids"]["stories"][:3]
+    with app.app_context():
+        job_id = async_service.create_job(model_id, story_ids, test_data["ids"]["questions"][0], {})
+        assert async_service.enqueue_job(job_id)
+    # The web process that created the job is not the one that runs it
+    async_service.processing_jobs.clear()
+    return job_id, story_ids
+
+
+class TestClaims:
+    def test_a_job_is_claimed_once(self, app, queued_job):
+        job_id, _ = queued_job
+        with app.app_context():
+            assert job_store.claim_next_job("worker-a") == job_id
+            assert job_store.claim_next_job("worker-b") is None
+
+    def test_queueing_again_leaves_a_claimed_job_alone(self, app, session, queued_job):
+        job_id, _ = queued_job
+        with app.app_context():
+            assert job_store.claim_next_job("worker-a") == job_id
+            # The loading page was reloaded and asks for the job to be started again
+            assert async_service.enqueue_job(job_id) == "running"
+            assert job_store.claim_next_job("worker-b") is None
+            assert session.get(Job, job_id).claimed_by == "worker-a"
+
+    def test_stale_claims_are_requeued(self, app, session, queued_job):
+        job_id, _ = queued_job
+        with app.app_context():
+            job_store.claim_next_job("worker-a")
+            session.get(Job, job_id).heartbeat_at = datetime.datetime.utcnow() - datetime.timedelta(minutes=10)
+            session.commit()
+            assert job_store.requeue_stale_jobs(120) == 1
+            assert job_store.claim_next_job("worker-b") == job_id
+
+    def test_small_jobs_are_claimed_first(self, app, test_data, queued_job):
+        big_job_id, _ = queued_job
+        with app.app_context():
+            small_job_id = async_service.create_job(
+                test_data["ids"]["models"][0], test_data["ids"]["stories"][:1], test_data["ids"]["questions"][0], {}
+            )
+            async_service.enqueue_job(small_job_id)
+            assert job_store.claim_next_job("worker-a", interactive_max_items=1) == small_job_id
+            assert job_store.claim_next_job("worker-a", interactive_max_items=1) == big_job_id
+
+
+class TestWorker:
+    def test_runs_queued_jobs_to_completion(self, app, session, test_data, queued_job, monkeypatch):
+        job_id, story_ids = queued_job
+
+        async def fake_call(app, provider_name, story_content, question_content, story_id, question_id,
+                            model_name, model_id, run_id=None, defer_save=False, **kwargs):
+            record = dict(
+                model_id=model_id, story_id=story_id, question_id=question_id, payload_json="{}",
+                response_content=f"story {story_id}", full_response_json="{}", prompt_id=None,
+                run_id=run_id, temperature=0.5, max_tokens=100, top_p=0.9,
+            )
+            return {"record": record, "response": record["response_content"]}
+
+        monkeypatch.setattr(async_service, "run_llm_call", fake_call)
+
+        worker = Worker(app, max_jobs=2, poll_interval=0.01, worker_id="test-worker")
+        asyncio.run(worker.run(exit_when_idle=True))
+
+        assert worker.jobs_run == 1
+        assert job_id not in async_service.processing_jobs
+        with app.app_context():
+            stored = job_store.get_job(job_id)
+        assert stored["status"] == "completed"
+        assert stored["completed"] == len(story_ids)
+        contents = {session.get(Response, int(rid)).response_content for rid in stored["response_ids"]}
+        assert contents == {f"story {sid}" for sid in story_ids}